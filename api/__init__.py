@@ -1,4 +1,18 @@
 from .claude_client import claude_client, ClaudeClient, StreamWorker
 from .file_handler import file_handler, FileHandler
+from .usage_tracker import usage_tracker, UsageTracker
+from .blob_store import blob_store, BlobStore
+from .memory_index import memory_index, MemoryIndex
+from .glossary_matcher import glossary_matcher, GlossaryMatcher
+from .glossary_io import glossary_io, GlossaryIO
+from .term_miner import term_miner, TermMiner
+from .http_cache import http_cache, HttpCache
+from .web_fetcher import web_fetcher, WebFetcher
+from .piaotia_parser import piaotia_parser, PiaotiaParser
 
-__all__ = ['claude_client', 'ClaudeClient', 'StreamWorker', 'file_handler', 'FileHandler']
+__all__ = ['claude_client', 'ClaudeClient', 'StreamWorker', 'file_handler', 'FileHandler',
+           'usage_tracker', 'UsageTracker', 'blob_store', 'BlobStore',
+           'memory_index', 'MemoryIndex', 'glossary_matcher', 'GlossaryMatcher',
+           'glossary_io', 'GlossaryIO', 'term_miner', 'TermMiner',
+           'http_cache', 'HttpCache', 'web_fetcher', 'WebFetcher',
+           'piaotia_parser', 'PiaotiaParser']
@@ -0,0 +1,191 @@
+"""
+AnhMin Audio - Async Fetcher
+asyncio/aiohttp fetch engine for static sites: many pages on one event loop
+"""
+
+import asyncio
+import codecs
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from api.http_cache import http_cache
+from api.web_fetcher import DEFAULT_HEADERS, WebFetcher, get_host
+
+# Check if aiohttp is available
+AIOHTTP_AVAILABLE = False
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    pass
+
+
+class AsyncHostLimiter:
+    """Per-host concurrency and request spacing on one event loop."""
+
+    def __init__(self, max_concurrency: int, interval: float):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.interval = interval
+        self._next_slot = 0.0
+
+    async def wait(self):
+        """Wait until a request to the host may start."""
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def defer(self, seconds: float):
+        """Push the next slot back (e.g. after HTTP 429)."""
+        self._next_slot = max(self._next_slot, asyncio.get_running_loop().time() + seconds)
+
+
+class AsyncFetcher:
+    """
+    Fetch many pages concurrently with aiohttp.
+
+    All requests run as tasks on the caller's event loop; parsing and
+    HTTP cache access (sqlite, file I/O, zlib) run on a small thread
+    pool (PARSE_THREADS) so they never block downloads. Limits match
+    WebFetcher: at most max_per_host requests in flight per host,
+    started min_interval seconds apart. Bodies are read in chunks through an incremental
+    decoder. Each fetch_ordered() call has its own session and limiters.
+    """
+
+    MAX_CONNECTIONS = 32
+    CONNECT_TIMEOUT = 10
+    READ_TIMEOUT = 15  # max silence between chunks
+    TOTAL_TIMEOUT = 60
+    CHUNK_SIZE = 64 * 1024
+    PARSE_THREADS = 4  # parsing and cache I/O
+
+    MAX_RETRIES = WebFetcher.MAX_RETRIES
+    RETRY_DELAY = WebFetcher.RETRY_DELAY
+    BACKOFF_STATUSES = WebFetcher.BACKOFF_STATUSES
+
+    def __init__(self, max_per_host: int = None, min_interval: float = None):
+        self.max_per_host = max_per_host or WebFetcher.MAX_PER_HOST
+        self.min_interval = WebFetcher.MIN_INTERVAL if min_interval is None else min_interval
+
+    async def _read_text(self, response, encoding: str, raw: list = None) -> str:
+        """Read and decode a response body chunk by chunk (raw collects the bytes)."""
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        parts = []
+        async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+            if raw is not None:
+                raw.append(chunk)
+            parts.append(decoder.decode(chunk))
+        parts.append(decoder.decode(b'', final=True))
+        return ''.join(parts)
+
+    async def fetch_text(self, session, limiters: Dict[str, AsyncHostLimiter],
+                         url: str, encoding: str = None, ttl: float = None,
+                         executor: ThreadPoolExecutor = None) -> str:
+        """
+        GET a URL within its host's limits and return the decoded body.
+
+        ttl enables the HTTP cache as in WebFetcher.get(); cache calls run
+        on executor (default: the loop's default executor).
+        """
+        loop = asyncio.get_running_loop()
+        entry = None
+        headers = {}
+        if ttl is not None:
+            entry = await loop.run_in_executor(executor, http_cache.lookup, url)
+            if entry and http_cache.is_fresh(entry, ttl):
+                return await loop.run_in_executor(executor, self._cached_text, entry, encoding)
+            headers = http_cache.conditional_headers(entry)
+
+        host = get_host(url)
+        limiter = limiters.get(host)
+        if limiter is None:
+            limiter = limiters[host] = AsyncHostLimiter(self.max_per_host, self.min_interval)
+
+        async with limiter.semaphore:
+            await limiter.wait()
+            async with session.get(url, headers=headers) as response:
+                if response.status in self.BACKOFF_STATUSES:
+                    retry_after = response.headers.get('Retry-After', '')
+                    limiter.defer(float(retry_after) if retry_after.isdigit() else 5.0)
+                response.raise_for_status()
+
+                if response.status == 304 and entry:
+                    await loop.run_in_executor(executor, http_cache.mark_validated,
+                                               url, response.headers)
+                    return await loop.run_in_executor(executor, self._cached_text, entry, encoding)
+
+                encoding = encoding or response.charset or 'utf-8'
+                raw = [] if ttl is not None and response.status == 200 else None
+                text = await self._read_text(response, encoding, raw)
+
+        if raw is not None:
+            await loop.run_in_executor(executor, http_cache.store,
+                                       url, b''.join(raw), response.headers, encoding)
+        return text
+
+    @staticmethod
+    def _cached_text(entry: Dict, encoding: str = None) -> str:
+        return http_cache.to_page(entry, encoding).text
+
+    async def fetch_ordered(self, urls: List[str], parse: Callable[[int, str], object],
+                            encoding: str = None, ttl: float = None,
+                            is_cancelled: Callable[[], bool] = None,
+                            on_retry: Callable[[int, int, Exception], None] = None
+                            ) -> AsyncIterator[Tuple[int, object, Optional[Exception]]]:
+        """
+        Fetch and parse many URLs concurrently, yielding in input order.
+
+        Same contract as WebFetcher.fetch_ordered (including dropping
+        pages that fail to parse from the cache), except that parse is
+        called with (index, decoded text) on a parser thread.
+        """
+        loop = asyncio.get_running_loop()
+        limiters: Dict[str, AsyncHostLimiter] = {}
+        connector = aiohttp.TCPConnector(limit=self.MAX_CONNECTIONS,
+                                         limit_per_host=self.max_per_host,
+                                         ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.TOTAL_TIMEOUT,
+                                        connect=self.CONNECT_TIMEOUT,
+                                        sock_read=self.READ_TIMEOUT)
+        parser = ThreadPoolExecutor(max_workers=self.PARSE_THREADS, thread_name_prefix='parse')
+
+        async def task(session, index: int, url: str):
+            delay = self.RETRY_DELAY
+            for attempt in range(1, self.MAX_RETRIES + 1):
+                if is_cancelled and is_cancelled():
+                    return None, None
+                try:
+                    text = await self.fetch_text(session, limiters, url, encoding, ttl, parser)
+                    try:
+                        return await loop.run_in_executor(parser, parse, index, text), None
+                    except Exception:
+                        if ttl is not None:
+                            await loop.run_in_executor(parser, http_cache.remove, url)
+                        raise
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if attempt == self.MAX_RETRIES:
+                        return None, e
+                    if on_retry:
+                        on_retry(index, attempt, e)
+                    await asyncio.sleep(delay)
+                    delay *= 2
+
+        try:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                             headers=DEFAULT_HEADERS) as session:
+                tasks = [asyncio.ensure_future(task(session, i, url)) for i, url in enumerate(urls)]
+                try:
+                    for index, pending in enumerate(tasks):
+                        if is_cancelled and is_cancelled():
+                            break
+                        result, error = await pending
+                        yield index, result, error
+                finally:
+                    for pending in tasks:
+                        pending.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            parser.shutdown(wait=False, cancel_futures=True)
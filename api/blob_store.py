@@ -0,0 +1,150 @@
+"""
+AnhMin Audio - Blob Store
+Content-addressed, compressed storage for chapter text and Claude outputs
+"""
+
+import os
+import hashlib
+import time
+import zlib
+from pathlib import Path
+from typing import Iterable, Optional
+
+from config import BLOBS_DIR
+
+# Optional zstd support (falls back to zlib)
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+class BlobStore:
+    """
+    Store byte/text payloads once, keyed by their SHA-256.
+
+    Blobs live in BLOBS_DIR/<first 2 hex>/<sha256>.zst (or .zz when
+    zstandard is not installed). Writing content that already exists is
+    a no-op, so repeated scrapes and imports cost no extra disk.
+    """
+
+    SUFFIXES = ('.zst', '.zz')
+
+    def __init__(self, root: Path = BLOBS_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """Get the SHA-256 hex digest of data."""
+        return hashlib.sha256(data).hexdigest()
+
+    def _path(self, digest: str, suffix: str) -> Path:
+        return self.root / digest[:2] / f"{digest}{suffix}"
+
+    def find(self, digest: str) -> Optional[Path]:
+        """Get the on-disk path of a blob, or None if it is not stored."""
+        for suffix in self.SUFFIXES:
+            path = self._path(digest, suffix)
+            if path.exists():
+                return path
+        return None
+
+    def exists(self, digest: str) -> bool:
+        """Check if a blob is stored."""
+        return self.find(digest) is not None
+
+    def put_bytes(self, data: bytes) -> str:
+        """
+        Store data and return its digest.
+
+        Returns:
+            SHA-256 hex digest of the uncompressed data
+        """
+        digest = self.hash_bytes(data)
+        if self.exists(digest):
+            return digest
+
+        if ZSTD_AVAILABLE:
+            path = self._path(digest, '.zst')
+            payload = zstandard.ZstdCompressor(level=10).compress(data)
+        else:
+            path = self._path(digest, '.zz')
+            payload = zlib.compress(data, 6)
+
+        path.parent.mkdir(exist_ok=True)
+        # Write to a temp file first so a crash never leaves a partial blob
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return digest
+
+    def put_text(self, text: str) -> str:
+        """Store UTF-8 text and return its digest."""
+        return self.put_bytes(text.encode('utf-8'))
+
+    def put_file(self, filepath: str) -> str:
+        """Store a file's contents and return its digest."""
+        with open(filepath, 'rb') as f:
+            return self.put_bytes(f.read())
+
+    def get_bytes(self, digest: str) -> Optional[bytes]:
+        """Read a blob, or None if it is missing or unreadable."""
+        path = self.find(digest) if digest else None
+        if path is None:
+            return None
+
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+            if path.suffix == '.zst':
+                if not ZSTD_AVAILABLE:
+                    print(f"Blob {digest} is zstd-compressed but zstandard is not installed")
+                    return None
+                return zstandard.ZstdDecompressor().decompress(payload)
+            return zlib.decompress(payload)
+        except Exception as e:
+            print(f"Error reading blob {digest}: {e}")
+            return None
+
+    def get_text(self, digest: str) -> Optional[str]:
+        """Read a UTF-8 text blob, or None if it is missing."""
+        data = self.get_bytes(digest)
+        return data.decode('utf-8') if data is not None else None
+
+    def collect_garbage(self, referenced: Iterable[str], min_age: float = 3600) -> int:
+        """
+        Delete blobs that are not in the referenced set.
+
+        Temp files and blobs written less than min_age seconds ago are
+        kept (their writer may not have stored the reference yet).
+
+        Returns:
+            Number of blobs removed
+        """
+        keep = set(referenced)
+        cutoff = time.time() - min_age
+        removed = 0
+        for path in self.root.glob('*/*'):
+            if path.suffix not in self.SUFFIXES:
+                continue
+            digest = path.name.split('.', 1)[0]
+            if digest in keep:
+                continue
+            try:
+                if path.stat().st_mtime > cutoff:
+                    continue
+            except OSError:
+                continue
+            try:
+                path.unlink()
+                removed += 1
+            except OSError as e:
+                print(f"Error removing blob {path}: {e}")
+        return removed
+
+
+# Singleton instance
+blob_store = BlobStore()
@@ -9,7 +9,9 @@ from dataclasses import dataclass
 from datetime import datetime
 from PyQt6.QtCore import QObject, pyqtSignal, QThread
 
-from database import db
+from database import db, settings_cache
+from api.usage_tracker import usage_tracker
+from api.memory_index import memory_index
 from config import DEFAULT_MODEL, MAX_TOKENS, TEMPERATURE
 
 
@@ -135,7 +137,7 @@ class ClaudeClient:
     def _rotate_api_key(self) -> bool:
         """Rotate to the next available API key."""
         if self.current_key:
-            db.increment_api_key_error(self.current_key.id)
+            usage_tracker.record_key_error(self.current_key.id)
         
         self.current_key = self._get_next_api_key()
         if self.current_key:
@@ -191,6 +193,7 @@ class ClaudeClient:
             return {
                 'id': batch.id,
                 'status': batch.processing_status,
+                'key_id': self.current_key.id,
                 'created_at': batch.created_at.isoformat() if batch.created_at else None,
                 'request_counts': {
                     'total': len(requests),
@@ -229,13 +232,15 @@ class ClaudeClient:
         except Exception as e:
             raise Exception(f"Lỗi lấy trạng thái batch: {str(e)}")
     
-    def get_batch_results(self, batch_id: str) -> List[Dict]:
-        """Get results of a completed batch."""
+    def get_batch_results(self, batch_id: str, project_id: int = None,
+                          task_type: str = "batch") -> List[Dict]:
+        """Get results of a completed batch and record their usage (once per batch)."""
         if not self.ensure_client():
             raise Exception("Không có API key khả dụng.")
         
         try:
             results = []
+            usages = []
             for result in self._client.messages.batches.results(batch_id):
                 result_dict = {
                     'custom_id': result.custom_id,
@@ -243,17 +248,27 @@ class ClaudeClient:
                 }
                 
                 if result.result.type == 'succeeded':
-                    # Extract text from response
+                    message = result.result.message
+                    
+                    # Extract text (and forced tool input) from response
                     text_content = ""
-                    for block in result.result.message.content:
+                    for block in message.content:
                         if block.type == 'text':
                             text_content += block.text
+                        elif block.type == 'tool_use':
+                            result_dict['tool_input'] = block.input
                     result_dict['content'] = text_content
+                    
+                    usages.append((message.model, self._extract_usage(message.usage)))
                 elif result.result.type == 'errored':
                     result_dict['error'] = str(result.result.error)
                 
                 results.append(result_dict)
             
+            # Charge the key that submitted the batch (rotation may have moved on)
+            job = db.get_batch_job(batch_id) or {}
+            usage_tracker.record_batch(batch_id, job.get('key_id') or self.current_key.id, usages,
+                                       project_id=project_id, task_type=task_type)
             return results
         except Exception as e:
             raise Exception(f"Lỗi lấy kết quả batch: {str(e)}")
@@ -270,8 +285,14 @@ class ClaudeClient:
             raise Exception(f"Lỗi hủy batch: {str(e)}")
     
     def build_batch_request(self, custom_id: str, content: str, 
-                            system_prompt: str) -> Dict:
-        """Build a single request for batch processing."""
+                            system_prompt: str, tool: Dict = None) -> Dict:
+        """
+        Build a single request for batch processing.
+        
+        Args:
+            tool: Optional tool definition the model is forced to call
+                  (structured output; disables extended thinking)
+        """
         params = {
             "model": self.model,
             "max_tokens": self.max_tokens,
@@ -279,8 +300,13 @@ class ClaudeClient:
             "messages": [{"role": "user", "content": content}]
         }
         
+        if tool:
+            # Forced tool use is not allowed together with extended thinking
+            params["tools"] = [tool]
+            params["tool_choice"] = {"type": "tool", "name": tool["name"]}
+            params["temperature"] = self.temperature
         # Add extended thinking if supported
-        if self.extended_thinking_enabled and self.supports_thinking():
+        elif self.extended_thinking_enabled and self.supports_thinking():
             params["thinking"] = {
                 "type": "enabled",
                 "budget_tokens": self.thinking_budget
@@ -327,10 +353,21 @@ class ClaudeClient:
         
         return api_messages
     
-    def build_system_prompt(self, instructions: str, memory: List[Dict]) -> str:
-        """Build system prompt with instructions and memory."""
+    def build_system_prompt(self, instructions: str, memory: List[Dict],
+                            context: str = None) -> str:
+        """
+        Build system prompt with instructions and memory.
+        
+        Args:
+            context: Text the prompt is for (chapter, message); when given
+                     only memory mentioned in it plus the pinned core set
+                     is included
+        """
         system_parts = []
         
+        if memory and context is not None:
+            memory = memory_index.filter(memory, context)
+        
         if instructions:
             system_parts.append(instructions)
         
@@ -342,9 +379,31 @@ class ClaudeClient:
         
         return "\n\n".join(system_parts)
     
+    @staticmethod
+    def _extract_usage(usage, into: Dict[str, int] = None) -> Dict[str, int]:
+        """Convert an API usage object into ledger token counts."""
+        counts = into if into is not None else {
+            'input_tokens': 0, 'output_tokens': 0, 'cache_creation_tokens': 0,
+            'cache_read_tokens': 0, 'thinking_tokens': 0
+        }
+        if usage is None:
+            return counts
+        
+        for field, attr in (('input_tokens', 'input_tokens'),
+                            ('output_tokens', 'output_tokens'),
+                            ('cache_creation_tokens', 'cache_creation_input_tokens'),
+                            ('cache_read_tokens', 'cache_read_input_tokens'),
+                            ('thinking_tokens', 'thinking_tokens')):
+            value = getattr(usage, attr, None)
+            if value:
+                counts[field] = value
+        return counts
+    
     def send_message(self, messages: List[Dict], 
                      system_prompt: str = "",
-                     max_retries: int = 3) -> Optional[str]:
+                     max_retries: int = 3,
+                     project_id: int = None,
+                     task_type: str = "chat") -> Optional[str]:
         """Send a message and get response (non-streaming)."""
         if not self.ensure_client():
             raise Exception("Không có API key khả dụng. Vui lòng thêm API key trong cài đặt.")
@@ -372,14 +431,11 @@ class ClaudeClient:
                 
                 response = self._client.messages.create(**api_params)
                 
-                # Success - reset error count and mark as used
-                db.reset_api_key_errors(self.current_key.id)
-                db.mark_api_key_used(self.current_key.id)
-                
-                # Track usage
-                input_tokens = response.usage.input_tokens if response.usage else 0
-                output_tokens = response.usage.output_tokens if response.usage else 0
-                db.add_usage(input_tokens, output_tokens)
+                # Success - buffer key reset/last_used and usage (flushed later)
+                usage_tracker.record_request(
+                    self.current_key.id, self._extract_usage(response.usage),
+                    model=api_params["model"], project_id=project_id, task_type=task_type
+                )
                 
                 # Extract text from response (skip thinking blocks)
                 result_text = ""
@@ -403,8 +459,64 @@ class ClaudeClient:
         
         return None
     
+    def send_tool_message(self, messages: List[Dict], tool: Dict,
+                          system_prompt: str = "",
+                          max_retries: int = 3,
+                          project_id: int = None,
+                          task_type: str = "chat") -> Optional[Dict]:
+        """
+        Send a message forcing a call to one tool and return its input.
+        
+        Used for structured output: the tool's input_schema is the output
+        format. Extended thinking is not used (it cannot be combined with
+        a forced tool choice).
+        
+        Returns:
+            The tool input dict, or None if the model did not call the tool
+        """
+        if not self.ensure_client():
+            raise Exception("Không có API key khả dụng. Vui lòng thêm API key trong cài đặt.")
+        
+        for attempt in range(max_retries):
+            try:
+                api_params = {
+                    "model": self.model,
+                    "max_tokens": self.max_tokens,
+                    "system": system_prompt,
+                    "messages": messages,
+                    "tools": [tool],
+                    "tool_choice": {"type": "tool", "name": tool["name"]},
+                    "temperature": self.temperature
+                }
+                
+                response = self._client.messages.create(**api_params)
+                
+                usage_tracker.record_request(
+                    self.current_key.id, self._extract_usage(response.usage),
+                    model=api_params["model"], project_id=project_id, task_type=task_type
+                )
+                
+                for block in response.content:
+                    if block.type == "tool_use" and block.name == tool["name"]:
+                        return block.input
+                return None
+                
+            except anthropic.RateLimitError:
+                if not self._rotate_api_key():
+                    raise Exception("Tất cả API key đã hết quota. Vui lòng thử lại sau.")
+            except anthropic.AuthenticationError:
+                if not self._rotate_api_key():
+                    raise Exception("API key không hợp lệ. Vui lòng kiểm tra lại.")
+            except Exception as e:
+                if attempt == max_retries - 1:
+                    raise e
+        
+        return None
+    
     def stream_message(self, messages: List[Dict],
-                       system_prompt: str = "") -> Generator[str, None, None]:
+                       system_prompt: str = "",
+                       project_id: int = None,
+                       task_type: str = "chat") -> Generator[str, None, None]:
         """Stream a message response."""
         if not self.ensure_client():
             raise Exception("Không có API key khả dụng. Vui lòng thêm API key trong cài đặt.")
@@ -429,8 +541,7 @@ class ClaudeClient:
             else:
                 api_params["temperature"] = self.temperature
             
-            input_tokens = 0
-            output_tokens = 0
+            usage = self._extract_usage(None)
             
             with self._client.messages.stream(**api_params) as stream:
                 for event in stream:
@@ -453,40 +564,39 @@ class ClaudeClient:
                         elif event.type == 'message_delta':
                             # Get usage from final message
                             if hasattr(event, 'usage'):
-                                output_tokens = event.usage.output_tokens if event.usage else 0
+                                self._extract_usage(event.usage, into=usage)
                         elif event.type == 'message_start':
                             if hasattr(event, 'message') and hasattr(event.message, 'usage'):
-                                input_tokens = event.message.usage.input_tokens if event.message.usage else 0
+                                self._extract_usage(event.message.usage, into=usage)
                     elif hasattr(event, 'text'):
                         yield event.text
             
-            # Success - track usage
-            db.reset_api_key_errors(self.current_key.id)
-            db.mark_api_key_used(self.current_key.id)
-            
-            if input_tokens > 0 or output_tokens > 0:
-                db.add_usage(input_tokens, output_tokens)
+            # Success - buffer key reset/last_used and usage (flushed later)
+            usage_tracker.record_request(
+                self.current_key.id, usage,
+                model=api_params["model"], project_id=project_id, task_type=task_type
+            )
             
         except anthropic.RateLimitError:
             # Emit rate limit warning
             self._on_rate_limit()
             if self._rotate_api_key():
                 # Retry with new key
-                yield from self.stream_message(messages, system_prompt)
+                yield from self.stream_message(messages, system_prompt, project_id, task_type)
             else:
                 raise Exception("Tất cả API key đã hết quota.")
         except anthropic.AuthenticationError:
             if self._rotate_api_key():
-                yield from self.stream_message(messages, system_prompt)
+                yield from self.stream_message(messages, system_prompt, project_id, task_type)
             else:
                 raise Exception("API key không hợp lệ.")
     
     def _on_rate_limit(self):
         """Called when rate limit is hit."""
         # Store rate limit event for UI to pick up
-        db.set_setting('last_rate_limit', datetime.now().isoformat())
+        settings_cache.set('last_rate_limit', datetime.now().isoformat())
         if self.current_key:
-            db.set_setting('last_rate_limit_key', self.current_key.name)
+            settings_cache.set('last_rate_limit_key', self.current_key.name)
     
     def test_api_key(self, api_key: str) -> Dict:
         """Test if an API key is valid."""
@@ -531,18 +641,22 @@ class StreamWorker(QThread):
     error_occurred = pyqtSignal(str)
     
     def __init__(self, client: ClaudeClient, messages: List[Dict], 
-                 system_prompt: str = ""):
+                 system_prompt: str = "", project_id: int = None,
+                 task_type: str = "chat"):
         super().__init__()
         self.client = client
         self.messages = messages
         self.system_prompt = system_prompt
+        self.project_id = project_id
+        self.task_type = task_type
         self._is_cancelled = False
     
     def run(self):
         """Run the streaming in background thread."""
         try:
             full_response = ""
-            for chunk in self.client.stream_message(self.messages, self.system_prompt):
+            for chunk in self.client.stream_message(self.messages, self.system_prompt,
+                                                    self.project_id, self.task_type):
                 if self._is_cancelled:
                     break
                 full_response += chunk
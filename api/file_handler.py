@@ -5,6 +5,7 @@ Handle file reading, writing and export to DOCX
 
 import os
 import shutil
+import hashlib
 from pathlib import Path
 from typing import Optional, Tuple
 from datetime import datetime
@@ -54,6 +55,15 @@ class FileHandler:
         else:
             return f"{size_bytes / (1024 * 1024):.1f} MB"
     
+    @staticmethod
+    def hash_file(filepath: str) -> str:
+        """Get the SHA-256 hex digest of a file's contents."""
+        sha = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(block)
+        return sha.hexdigest()
+    
     @classmethod
     def read_file(cls, filepath: str) -> Tuple[str, Optional[str]]:
         """
@@ -88,6 +98,7 @@ class FileHandler:
     def copy_to_project(cls, source_path: str, project_id: int) -> Tuple[str, Optional[str]]:
         """
         Copy a file to project directory.
+        If an identical file is already there, its path is returned instead.
         Returns: (new_filepath, error_message)
         """
         try:
@@ -97,6 +108,17 @@ class FileHandler:
             
             project_dir = cls.get_project_dir(project_id)
             
+            # Reuse an identical file instead of storing another copy
+            source_size = source.stat().st_size
+            source_hash = None
+            for existing in project_dir.iterdir():
+                if not existing.is_file() or existing.stat().st_size != source_size:
+                    continue
+                if source_hash is None:
+                    source_hash = cls.hash_file(source_path)
+                if cls.hash_file(str(existing)) == source_hash:
+                    return str(existing), None
+            
             # Generate unique filename if exists
             dest_name = source.name
             dest_path = project_dir / dest_name
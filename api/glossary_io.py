@@ -0,0 +1,175 @@
+"""
+AnhMin Audio - Glossary Import/Export
+Streaming glossary exchange in JSON Lines, CSV/TSV and the legacy JSON format
+"""
+
+import csv
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+from database import db
+
+
+class GlossaryIO:
+    """
+    Import and export glossaries without loading them into memory.
+
+    Every format is a flat list of terms with the columns in FIELDS.
+    Imports are upserted in chunks of CHUNK_SIZE, one transaction per
+    chunk, deduplicated by (category, standard).
+    """
+
+    FIELDS = ['category', 'icon', 'original', 'standard', 'variants', 'notes']
+    CHUNK_SIZE = 1000
+
+    FORMATS = {
+        '.jsonl': 'jsonl',
+        '.csv': 'csv',
+        '.tsv': 'tsv',
+        '.json': 'json',
+    }
+
+    # QFileDialog filters
+    IMPORT_FILTER = "Glossary (*.jsonl *.csv *.tsv *.json)"
+    EXPORT_FILTER = "JSON Lines (*.jsonl);;CSV (*.csv);;TSV (*.tsv);;JSON (*.json)"
+
+    def get_format(self, filepath: str) -> str:
+        """Get the format of a file from its extension."""
+        fmt = self.FORMATS.get(Path(filepath).suffix.lower())
+        if not fmt:
+            raise ValueError(f"Định dạng không hỗ trợ: {Path(filepath).suffix}")
+        return fmt
+
+    # ============== Import ==============
+
+    def iter_rows(self, filepath: str) -> Iterator[Dict]:
+        """Yield term rows from a glossary file, parsed incrementally."""
+        fmt = self.get_format(filepath)
+
+        if fmt == 'jsonl':
+            with open(filepath, 'r', encoding='utf-8-sig') as f:
+                for line_num, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        raise ValueError(f"Dòng {line_num} không hợp lệ: {e}")
+                    if isinstance(row, dict):
+                        yield row
+
+        elif fmt in ('csv', 'tsv'):
+            with open(filepath, 'r', encoding='utf-8-sig', newline='') as f:
+                reader = csv.DictReader(f, delimiter='\t' if fmt == 'tsv' else ',')
+                if not reader.fieldnames or 'standard' not in reader.fieldnames:
+                    raise ValueError("File thiếu cột 'standard'")
+                yield from reader
+
+        else:
+            # Legacy nested export: {"categories": [{"name", "icon", "terms": [...]}]}
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for cat_data in data.get('categories', []):
+                for term in cat_data.get('terms', []):
+                    yield dict(term, category=cat_data.get('name'), icon=cat_data.get('icon'))
+
+    def import_file(self, filepath: str, project_id: int) -> Dict[str, int]:
+        """
+        Import a glossary file into a project.
+
+        Returns:
+            {'inserted': n, 'updated': n, 'skipped': n}
+        """
+        totals = {'inserted': 0, 'updated': 0, 'skipped': 0}
+        chunk: List[Dict] = []
+
+        def flush():
+            for key, value in db.upsert_glossary_terms(project_id, chunk).items():
+                totals[key] += value
+            chunk.clear()
+
+        for row in self.iter_rows(filepath):
+            chunk.append(row)
+            if len(chunk) >= self.CHUNK_SIZE:
+                flush()
+        flush()
+
+        return totals
+
+    # ============== Export ==============
+
+    def iter_export_rows(self, project_id: int) -> Iterator[Dict]:
+        """Yield a project's terms as export rows (one query, streamed)."""
+        for term in db.iter_glossary_terms(project_id):
+            yield {
+                'category': term['category_name'],
+                'icon': term['category_icon'],
+                'original': term.get('original') or '',
+                'standard': term['standard'],
+                'variants': term.get('variants') or '',
+                'notes': term.get('notes') or '',
+            }
+
+    def export_file(self, filepath: str, project_id: int, project_name: str = '') -> int:
+        """
+        Export a project's glossary (global categories included).
+
+        Returns:
+            Number of terms written
+        """
+        fmt = self.get_format(filepath)
+        count = 0
+
+        if fmt == 'jsonl':
+            with open(filepath, 'w', encoding='utf-8') as f:
+                for row in self.iter_export_rows(project_id):
+                    f.write(json.dumps(row, ensure_ascii=False))
+                    f.write('\n')
+                    count += 1
+
+        elif fmt in ('csv', 'tsv'):
+            # BOM so Excel detects UTF-8
+            with open(filepath, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=self.FIELDS,
+                                        delimiter='\t' if fmt == 'tsv' else ',')
+                writer.writeheader()
+                for row in self.iter_export_rows(project_id):
+                    writer.writerow(row)
+                    count += 1
+
+        else:
+            count = self._export_legacy_json(filepath, project_id, project_name)
+
+        return count
+
+    def _export_legacy_json(self, filepath: str, project_id: int, project_name: str) -> int:
+        """Write the nested JSON format term by term (rows arrive grouped by category)."""
+        count = 0
+        current = None
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write('{\n  "project": %s,\n  "version": "1.0",\n  "categories": ['
+                    % json.dumps(project_name, ensure_ascii=False))
+            for row in self.iter_export_rows(project_id):
+                if row['category'] != current:
+                    if current is not None:
+                        f.write('\n      ]\n    },')
+                    current = row['category']
+                    f.write('\n    {\n      "name": %s,\n      "icon": %s,\n      "terms": ['
+                            % (json.dumps(row['category'], ensure_ascii=False),
+                               json.dumps(row['icon'], ensure_ascii=False)))
+                    first = True
+                term = {k: row[k] for k in ('original', 'standard', 'variants', 'notes')}
+                f.write(('\n' if first else ',\n') + '        '
+                        + json.dumps(term, ensure_ascii=False))
+                first = False
+                count += 1
+            if current is not None:
+                f.write('\n      ]\n    }\n  ')
+            f.write(']\n}\n')
+        return count
+
+
+# Singleton instance
+glossary_io = GlossaryIO()
@@ -0,0 +1,269 @@
+"""
+AnhMin Audio - Glossary Matcher
+Find the glossary terms used in a chapter with one Aho-Corasick pass,
+and rewrite non-standard spellings in Claude output
+"""
+
+import re
+import threading
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from database import db
+from api.memory_index import is_mostly_cjk
+
+# Separators between spellings in 'original' / 'variants'
+SPELLING_SEPARATORS = re.compile(r'[,;，、|/\n]')
+
+
+def is_han(c: str) -> bool:
+    """Check if a character is a Han ideograph."""
+    return '㐀' <= c <= '鿿'
+
+
+def is_word_char(c: str) -> bool:
+    """Letters/digits of space-separated scripts (Han text has no word breaks)."""
+    return c.isalnum() and not is_han(c)
+
+
+def normalize_text(text: str) -> str:
+    """NFC-normalize and lowercase (keeps the string length stable for NFC text)."""
+    return unicodedata.normalize('NFC', text).lower()
+
+
+def split_spellings(value: str) -> List[str]:
+    """Split an 'original' / 'variants' field into its spellings."""
+    return [s.strip() for s in SPELLING_SEPARATORS.split(value or '') if s.strip()]
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: all occurrences of all patterns in one pass."""
+
+    def __init__(self, patterns: Iterable[Tuple[str, object]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, object]]] = [[]]  # (pattern length, value)
+
+        for pattern, value in patterns:
+            if pattern:
+                self._add(pattern, value)
+        self._build()
+
+    def _add(self, pattern: str, value):
+        state = 0
+        for c in pattern:
+            nxt = self._goto[state].get(c)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][c] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), value))
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and c not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(c, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, object]]:
+        """Yield (start, end, value) for every match, in order of end position."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, c in enumerate(text):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            for length, value in out[state]:
+                yield i + 1 - length, i + 1, value
+
+
+class GlossaryMatcher:
+    """
+    Compiled matcher over a project's glossary.
+
+    Every spelling of a term (original, standard, variants) is a pattern.
+    Matching is case-insensitive on NFC text; spellings that start or end
+    with a letter of a space-separated script only match on word
+    boundaries, Han spellings match anywhere.
+    """
+
+    MIN_PATTERN_CHARS = 2
+
+    def __init__(self, terms: List[Dict]):
+        self.terms = terms
+        patterns = []
+        owners: Dict[str, set] = {}  # spelling -> indexes of terms using it
+        for index, term in enumerate(terms):
+            spellings = [term.get('standard') or '']
+            spellings += split_spellings(term.get('original'))
+            spellings += split_spellings(term.get('variants'))
+            for spelling in {normalize_text(s) for s in spellings if s}:
+                if len(spelling) >= self.MIN_PATTERN_CHARS or is_han(spelling[0]):
+                    patterns.append((spelling, index))
+                    owners.setdefault(spelling, set()).add(index)
+        self._automaton = AhoCorasick(patterns)
+
+        # Spellings shared by several terms cannot be rewritten safely
+        self._ambiguous = {s for s, indexes in owners.items() if len(indexes) > 1}
+        self._standards = [normalize_text(t.get('standard') or '') for t in terms]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Dict]]:
+        """
+        Yield (start, end, term) for each glossary spelling in text.
+
+        Positions refer to the NFC-normalized text.
+        """
+        norm = normalize_text(text)
+        for start, end, index in self._automaton.iter_matches(norm):
+            if is_word_char(norm[start]) and start > 0 and is_word_char(norm[start - 1]):
+                continue
+            if is_word_char(norm[end - 1]) and end < len(norm) and is_word_char(norm[end]):
+                continue
+            yield start, end, self.terms[index]
+
+    def match(self, text: str) -> List[Dict]:
+        """Get the terms used in text, in glossary order."""
+        found = {id(term) for _, _, term in self.iter_matches(text)}
+        return [term for term in self.terms if id(term) in found]
+
+    def enforce(self, text: str) -> Tuple[str, Dict]:
+        """
+        Replace non-standard spellings of glossary terms with the standard.
+
+        Overlapping matches resolve leftmost-longest, so a standard name
+        protects the shorter variants inside it. Spellings that differ
+        from the standard only by case, and spellings shared by several
+        terms, are left alone. Mostly-Han text (a chapter Claude did not
+        process) is not touched.
+
+        Returns:
+            (text, report) where report has 'replacements' and 'changes'
+            ({"variant → standard": count}); text is NFC when changed
+        """
+        report = {'replacements': 0, 'changes': {}}
+        nfc = unicodedata.normalize('NFC', text)
+        norm = normalize_text(nfc)
+        if len(norm) != len(nfc) or is_mostly_cjk(nfc):
+            return text, report
+
+        # Leftmost-longest, non-overlapping
+        matches = sorted(self._automaton.iter_matches(norm), key=lambda m: (m[0], m[0] - m[1]))
+        replacements, pos = [], 0
+        for start, end, index in matches:
+            if start < pos:
+                continue
+            if is_word_char(norm[start]) and start > 0 and is_word_char(norm[start - 1]):
+                continue
+            if is_word_char(norm[end - 1]) and end < len(norm) and is_word_char(norm[end]):
+                continue
+
+            pos = end
+            spelling = norm[start:end]
+            if spelling == self._standards[index] or spelling in self._ambiguous:
+                continue
+
+            standard = self.terms[index]['standard']
+            replacements.append((start, end, standard))
+            change = f"{nfc[start:end]} → {standard}"
+            report['changes'][change] = report['changes'].get(change, 0) + 1
+
+        if not replacements:
+            return text, report
+        report['replacements'] = len(replacements)
+
+        out, last = [], 0
+        for start, end, standard in replacements:
+            out.append(nfc[last:start])
+            out.append(standard)
+            last = end
+        out.append(nfc[last:])
+        return ''.join(out), report
+
+
+class GlossaryMatcherCache:
+    """Per-project GlossaryMatcher, rebuilt when the glossary revision changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matchers: Dict[int, Tuple[int, GlossaryMatcher]] = {}
+
+    def get(self, project_id: int) -> GlossaryMatcher:
+        """Get a project's matcher (global categories included)."""
+        revision = db.get_glossary_revision()
+        with self._lock:
+            cached = self._matchers.get(project_id)
+            if cached and cached[0] == revision:
+                return cached[1]
+
+        matcher = GlossaryMatcher(db.get_all_glossary_terms(project_id))
+        with self._lock:
+            self._matchers[project_id] = (revision, matcher)
+        return matcher
+
+    def match(self, project_id: int, text: str) -> List[Dict]:
+        """Get the project's glossary terms used in text."""
+        return self.get(project_id).match(text)
+
+    def prompt_for(self, project_id: int, text: str) -> str:
+        """Format only the glossary terms used in text ("" if none)."""
+        terms = self.match(project_id, text)
+        return db.format_glossary_for_prompt(terms) if terms else ""
+
+    def localize(self, project_id: int, instructions: str, text: str) -> Tuple[str, str]:
+        """
+        Narrow the glossary to the terms used in text.
+
+        Instructions made from a {{GLOSSARY}} template embed the whole
+        glossary; that block is replaced in place by the matched terms.
+        Returns (instructions, glossary section still to append - "" when
+        the glossary was embedded).
+        """
+        glossary = self.prompt_for(project_id, text) if project_id else ""
+        if not instructions or not project_id:
+            return instructions, glossary
+
+        replacement = glossary or "(Không có thuật ngữ nào xuất hiện trong nội dung này)"
+        full = db.get_glossary_for_prompt(project_id)
+        if full in instructions:
+            return instructions.replace(full, replacement), ""
+
+        # An older rendering: category headings followed by their terms
+        names = '|'.join(re.escape(category['name'])
+                         for category in db.get_glossary_categories(project_id))
+        if not names:
+            return instructions, glossary
+        block = rf'\n?### (?:{names}):(?:\n- [^\n]*)+'
+        pattern = re.compile(rf'{block}(?:\n{block})*')
+        match = pattern.search(instructions)
+        if not match:
+            return instructions, glossary
+        lead = '\n' if match.group().startswith('\n') and not replacement.startswith('\n') else ''
+        rest = pattern.sub('', instructions[match.end():])
+        return instructions[:match.start()] + lead + replacement + rest, ""
+
+    def enforce(self, project_id: int, text: str) -> Tuple[str, Dict]:
+        """Rewrite non-standard term spellings in text (see GlossaryMatcher.enforce)."""
+        return self.get(project_id).enforce(text)
+
+    def invalidate(self, project_id: int = None):
+        """Drop one project's matcher, or all of them."""
+        with self._lock:
+            if project_id is None:
+                self._matchers.clear()
+            else:
+                self._matchers.pop(project_id, None)
+
+
+# Singleton instance
+glossary_matcher = GlossaryMatcherCache()
@@ -0,0 +1,258 @@
+"""
+AnhMin Audio - HTTP Cache
+On-disk cache of scraped pages with conditional revalidation and LRU eviction
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import HTTP_CACHE_DIR
+
+
+class CachedPage:
+    """
+    A page served from the cache.
+
+    Has the parts of requests.Response the scrapers use: content, text
+    (decoded with encoding), encoding, status_code, headers and url.
+    """
+
+    from_cache = True
+
+    def __init__(self, url: str, content: bytes, headers: Dict[str, str] = None,
+                 encoding: str = None):
+        self.url = url
+        self.content = content
+        self.headers = headers or {}
+        self.encoding = encoding
+        self.status_code = 200
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def raise_for_status(self):
+        pass
+
+
+class HttpCache:
+    """
+    Cache of raw response bodies keyed by URL.
+
+    Bodies are zlib-compressed files under HTTP_CACHE_DIR/<2 hex>/<sha256(url)>.zz;
+    index.db keeps each URL's ETag/Last-Modified, size, and when it was
+    last validated and last used. An entry validated less than ttl
+    seconds ago is served without a request; an older one is revalidated
+    with If-None-Match / If-Modified-Since, and a 304 serves the cached
+    body. When the cache grows past max_bytes the least recently used
+    entries are dropped.
+    """
+
+    DEFAULT_TTL = 7 * 24 * 3600
+    MAX_BYTES = 500 * 1024 * 1024
+    EVICT_TO = 0.9  # evict down to this fraction of max_bytes
+
+    def __init__(self, root: Path = HTTP_CACHE_DIR, max_bytes: int = MAX_BYTES):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.index_path = self.root / "index.db"
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+        self._init_index()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_index(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    encoding TEXT,
+                    size INTEGER NOT NULL,
+                    validated_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+
+    def _path(self, url: str) -> Path:
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self.root / key[:2] / f"{key}.zz"
+
+    # ============== Lookup ==============
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """
+        Get a URL's cache entry.
+
+        Returns:
+            {'url', 'etag', 'last_modified', 'encoding', 'size', 'validated_at', 'content'}
+            or None if not cached (or the body file is gone)
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM entries WHERE url = ?", (url,)).fetchone()
+        if not row:
+            return None
+
+        try:
+            with open(self._path(url), 'rb') as f:
+                content = zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            self.remove(url)
+            return None
+
+        with self._connect() as conn:
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        return dict(row, content=content)
+
+    @staticmethod
+    def is_fresh(entry: Dict, ttl: float) -> bool:
+        """Check if an entry may be served without revalidation."""
+        return time.time() - entry['validated_at'] < ttl
+
+    @staticmethod
+    def to_page(entry: Dict, encoding: str = None) -> CachedPage:
+        """Wrap an entry as a response-like page."""
+        return CachedPage(entry['url'], entry['content'], encoding=encoding or entry.get('encoding'))
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        """Get If-None-Match / If-Modified-Since headers for an entry."""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    # ============== Store ==============
+
+    def store(self, url: str, content: bytes, headers=None, encoding: str = None):
+        """Cache a 200 response body with its validators and text encoding."""
+        headers = headers or {}
+        path = self._path(url)
+        payload = zlib.compress(content, 6)
+
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        with self._connect() as conn:
+            old = conn.execute("SELECT size FROM entries WHERE url = ?", (url,)).fetchone()
+            conn.execute(
+                """INSERT OR REPLACE INTO entries
+                   (url, etag, last_modified, encoding, size, validated_at, accessed_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (url, headers.get('ETag'), headers.get('Last-Modified'), encoding,
+                 len(payload), now, now)
+            )
+
+        self._add_bytes(len(payload) - (old['size'] if old else 0))
+
+    def mark_validated(self, url: str, headers=None):
+        """Record a 304 Not Modified (the cached body is still current)."""
+        headers = headers or {}
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """UPDATE entries SET validated_at = ?, accessed_at = ?,
+                          etag = COALESCE(?, etag),
+                          last_modified = COALESCE(?, last_modified)
+                   WHERE url = ?""",
+                (now, now, headers.get('ETag'), headers.get('Last-Modified'), url)
+            )
+
+    # ============== Eviction ==============
+
+    def _add_bytes(self, delta: int):
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self.total_bytes()
+            else:
+                self._total_bytes += delta
+            over = self._total_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def total_bytes(self) -> int:
+        """Get the size of all cached bodies (compressed)."""
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def evict(self) -> int:
+        """
+        Drop least recently used entries until under EVICT_TO * max_bytes.
+
+        Returns:
+            Number of entries removed
+        """
+        target = int(self.max_bytes * self.EVICT_TO)
+        removed = []
+        with self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            for row in conn.execute("SELECT url, size FROM entries ORDER BY accessed_at"):
+                if total <= target:
+                    break
+                removed.append(row['url'])
+                total -= row['size']
+            conn.executemany("DELETE FROM entries WHERE url = ?", [(url,) for url in removed])
+
+        for url in removed:
+            try:
+                self._path(url).unlink()
+            except OSError:
+                pass
+
+        with self._lock:
+            self._total_bytes = total
+        return len(removed)
+
+    def remove(self, url: str):
+        """Drop one URL from the cache."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+        try:
+            self._path(url).unlink()
+        except OSError:
+            pass
+        with self._lock:
+            self._total_bytes = None
+
+    def clear(self):
+        """Drop every cached page."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+        for path in self.root.glob('*/*.zz'):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        with self._lock:
+            self._total_bytes = 0
+
+
+# Singleton instance
+http_cache = HttpCache()
@@ -4,53 +4,111 @@ Automatically detect and extract memory from chapter content using Claude API
 """
 
 import re
-from typing import List, Dict, Tuple
-from api import claude_client
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Tuple, Iterable, Optional
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+
+from api import claude_client, blob_store
+from api.memory_index import normalize
 from database import db
 
 
 class MemoryDetector:
     """Automatically detect memory items from chapter content."""
 
-    # Prompt template for memory detection
-    DETECTION_PROMPT = """Hãy phân tích nội dung chương truyện sau và trích xuất các thông tin quan trọng cần ghi nhớ.
+    # batch_jobs.source of bulk extraction batches
+    BULK_SOURCE = 'memory'
+    # Batch statuses whose results have not been merged yet
+    BULK_OPEN_STATUSES = ('in_progress', 'canceling', 'ended')
+
+    # Categories the model may use (anything else is stored as 'general')
+    CATEGORIES = ('character', 'location', 'realm', 'skill', 'item', 'faction',
+                  'series', 'style', 'progress', 'general')
+
+    # Items the model is less sure about than this are dropped
+    MIN_CONFIDENCE = 0.5
+
+    # Known keys listed in the delta digest (most recently added win)
+    MAX_DIGEST_KEYS = 500
+
+    # Structured output: the model is forced to call this tool
+    MEMORY_TOOL = {
+        "name": "record_memory",
+        "description": "Ghi lại các thông tin quan trọng cần nhớ từ chương truyện.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "items": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "op": {
+                                "type": "string",
+                                "enum": ["add", "update"],
+                                "description": "add: key mới; update: sửa value của key đã biết"
+                            },
+                            "category": {"type": "string", "enum": list(CATEGORIES)},
+                            "key": {
+                                "type": "string",
+                                "description": "snake_case, chữ thường, không dấu"
+                            },
+                            "value": {
+                                "type": "string",
+                                "description": "Tên - mô tả ngắn gọn trong 1 dòng"
+                            },
+                            "confidence": {"type": "number", "minimum": 0, "maximum": 1}
+                        },
+                        "required": ["op", "category", "key", "value", "confidence"]
+                    }
+                }
+            },
+            "required": ["items"]
+        }
+    }
 
-Trả về kết quả theo format Markdown sau:
+    # Prompt template for memory detection (format comes from MEMORY_TOOL)
+    DETECTION_PROMPT = """Trích xuất các thông tin QUAN TRỌNG cần ghi nhớ (nhân vật, địa danh, cảnh giới, kỹ năng, vật phẩm, thế lực) từ chương truyện sau. Bỏ qua chi tiết nhỏ.
 
-## Nhân vật:
-- key_name: Tên nhân vật - mô tả ngắn gọn
-- ...
+NỘI DUNG CHƯƠNG:
 
-## Địa danh:
-- key_name: Tên địa danh - mô tả ngắn gọn
-- ...
+{content}
+"""
 
-## Cảnh giới:
-- key_name: Tên cảnh giới - mô tả ngắn gọn
-- ...
+    # System prompt listing what is already stored, so only deltas come back
+    DIGEST_PROMPT = """Các key memory ĐÃ BIẾT (theo category):
+{digest}
 
-## Kỹ năng:
-- key_name: Tên kỹ năng - mô tả ngắn gọn
-- ...
+Chỉ trả về key MỚI (op "add") hoặc key đã biết có thông tin THAY ĐỔI (op "update", giữ nguyên key). Không lặp lại thông tin đã biết."""
 
-## Vật phẩm:
-- key_name: Tên vật phẩm - mô tả ngắn gọn
-- ...
+    _KEY_INVALID = re.compile(r'[^a-z0-9_]+')
 
-## Thế lực:
-- key_name: Tên thế lực - mô tả ngắn gọn
-- ...
+    @staticmethod
+    def normalize_key(key: str) -> str:
+        """Fold a key to snake_case ASCII ('Đông Hoa Tông' -> 'dong_hoa_tong')."""
+        return MemoryDetector._KEY_INVALID.sub('_', normalize(key.strip())).strip('_')
 
-LƯU Ý:
-- key_name phải là snake_case (chữ thường, dấu gạch dưới), không dấu tiếng Việt
-- Chỉ trích xuất thông tin QUAN TRỌNG, không trích xuất chi tiết nhỏ
-- Nếu một category không có thông tin mới thì BỎ QUA category đó
-- Mỗi item chỉ cần 1 dòng mô tả ngắn gọn
+    @staticmethod
+    def resolve_keys(items: List[tuple], known: Iterable[str]) -> List[tuple]:
+        """
+        Map item keys onto stored keys that normalize the same way.
 
-NỘI DUNG CHƯƠNG:
+        Stored keys may keep diacritics or spaces (entered by hand or by
+        older versions); a detected key that folds to the same form
+        refers to that entry, so it updates it instead of duplicating it.
 
-{content}
-"""
+        Args:
+            items: Tuples whose second element is the key
+            known: Stored keys (db.get_memory_keys)
+        """
+        stored = {}
+        for key in known:
+            stored.setdefault(MemoryDetector.normalize_key(key), key)
+        return [(item[0], stored.get(MemoryDetector.normalize_key(item[1]), item[1]), *item[2:])
+                for item in items]
 
     @staticmethod
     def detect_memory(content: str, project_id: int) -> Tuple[int, str]:
@@ -67,24 +125,23 @@ NỘI DUNG CHƯƠNG:
             - error_message: Error message if failed, empty string if success
         """
         try:
-            # Build prompt
-            prompt = MemoryDetector.DETECTION_PROMPT.format(content=content)
-
-            # Call Claude API (non-streaming for simple parsing)
             messages = [
                 {
                     "role": "user",
-                    "content": prompt
+                    "content": MemoryDetector.DETECTION_PROMPT.format(content=content)
                 }
             ]
+            system_prompt = MemoryDetector.build_digest_prompt(db.get_memory_keys(project_id))
 
-            response = claude_client.send_message(messages, system_prompt="")
+            data = claude_client.send_tool_message(messages, MemoryDetector.MEMORY_TOOL,
+                                                   system_prompt=system_prompt,
+                                                   project_id=project_id, task_type="memory")
 
-            if not response:
+            if data is None:
                 return 0, "Không nhận được phản hồi từ Claude API"
 
-            # Parse markdown response and add to database
-            items_added = MemoryDetector._parse_and_add_memory(response, project_id)
+            items = MemoryDetector.validate_items(data)
+            items_added = MemoryDetector._add_memory(items, project_id)
 
             return items_added, ""
 
@@ -92,18 +149,202 @@ NỘI DUNG CHƯƠNG:
             return 0, f"Lỗi khi phát hiện memory: {str(e)}"
 
     @staticmethod
-    def _parse_and_add_memory(markdown_text: str, project_id: int) -> int:
+    def build_digest_prompt(known: Dict[str, str]) -> str:
         """
-        Parse markdown memory format and add to database.
+        Build the compact list of known keys sent with each extraction.
 
         Args:
-            markdown_text: Markdown formatted memory text
+            known: key -> category (db.get_memory_keys)
+
+        Returns:
+            System prompt, or "" if nothing is known yet
+        """
+        if not known:
+            return ""
+
+        by_category: Dict[str, List[str]] = {}
+        for key, category in list(known.items())[-MemoryDetector.MAX_DIGEST_KEYS:]:
+            by_category.setdefault(category or 'general', []).append(key)
+
+        digest = "\n".join(f"{category}: {', '.join(sorted(keys))}"
+                           for category, keys in sorted(by_category.items()))
+        return MemoryDetector.DIGEST_PROMPT.format(digest=digest)
+
+    @staticmethod
+    def validate_items(data) -> List[Tuple[str, str, str, str]]:
+        """
+        Check a record_memory tool input and keep the usable items.
+
+        Malformed items are skipped rather than failing the whole call;
+        keys are folded to ASCII snake_case, unknown categories become
+        'general' and a missing op means 'add'.
+
+        Returns:
+            List of (category, key, value, op) in response order
+        """
+        raw_items = data.get('items') if isinstance(data, dict) else None
+        if not isinstance(raw_items, list):
+            return []
+
+        items = []
+        for item in raw_items:
+            if not isinstance(item, dict):
+                continue
+            key, value = item.get('key'), item.get('value')
+            if not isinstance(key, str) or not isinstance(value, str):
+                continue
+
+            confidence = item.get('confidence', 1)
+            if not isinstance(confidence, (int, float)) or confidence < MemoryDetector.MIN_CONFIDENCE:
+                continue
+
+            key = MemoryDetector.normalize_key(key)
+            value = value.strip()
+            if not key or not value:
+                continue
+
+            category = item.get('category')
+            if category not in MemoryDetector.CATEGORIES:
+                category = 'general'
+            op = 'update' if item.get('op') == 'update' else 'add'
+            items.append((category, key, value, op))
+
+        return items
+
+    # ============== Bulk (Batch API) ==============
+
+    @staticmethod
+    def bulk_custom_id(chapter_num: int) -> str:
+        """Batch custom_id of a chapter (zero-padded so it sorts by chapter)."""
+        return f"memory_{chapter_num:05d}"
+
+    @staticmethod
+    def start_bulk_detection(project_id: int, chapters: List[Tuple[int, str]]) -> str:
+        """
+        Submit one Message Batch request per chapter and record the job.
+
+        Args:
+            project_id: Project ID to add memory to
+            chapters: List of (chapter_num, content)
+
+        Returns:
+            Batch ID
+        """
+        # Every request shares the digest of what was known at submission
+        system_prompt = MemoryDetector.build_digest_prompt(db.get_memory_keys(project_id))
+        requests = [
+            claude_client.build_batch_request(
+                custom_id=MemoryDetector.bulk_custom_id(chapter_num),
+                content=MemoryDetector.DETECTION_PROMPT.format(content=content),
+                system_prompt=system_prompt,
+                tool=MemoryDetector.MEMORY_TOOL
+            )
+            for chapter_num, content in chapters
+        ]
+
+        batch_info = claude_client.create_batch(requests)
+        db.create_batch_job(
+            batch_info['id'],
+            project_id,
+            batch_info['status'],
+            requests=[{'custom_id': r['custom_id']} for r in requests],
+            source=MemoryDetector.BULK_SOURCE,
+            key_id=batch_info['key_id']
+        )
+        return batch_info['id']
+
+    @staticmethod
+    def get_pending_bulk_jobs(project_id: int) -> List[Dict]:
+        """Get bulk extraction jobs of a project whose results are not merged yet."""
+        jobs = db.get_batch_jobs_by_status(list(MemoryDetector.BULK_OPEN_STATUSES),
+                                           source=MemoryDetector.BULK_SOURCE)
+        return [job for job in jobs if job['project_id'] == project_id]
+
+    @staticmethod
+    def merge_bulk_results(batch_id: str, project_id: int, results: List[Dict]) -> int:
+        """
+        Merge batch results into project memory in chapter order.
+
+        A key found in a later chapter overrides earlier chapters and any
+        stored value. Merging is idempotent, so an interrupted merge can
+        simply be run again.
+
+        Args:
+            batch_id: Batch ID
+            project_id: Project ID
+            results: Output of claude_client.get_batch_results()
+
+        Returns:
+            Number of items added or changed
+        """
+        merged: Dict[str, Tuple[str, str]] = {}  # key -> (value, category)
+        for result in sorted(results, key=lambda r: r['custom_id']):
+            if result['type'] != 'succeeded':
+                continue
+            if 'tool_input' in result:
+                items = MemoryDetector.validate_items(result['tool_input'])
+            else:
+                # Batch submitted before structured output
+                items = MemoryDetector._parse_legacy_markdown(result.get('content', ''))
+            for category, key, value, _op in items:
+                merged[key] = (value, category)
+
+        existing = {m['key']: (m['value'], m['category']) for m in db.get_memory(project_id)}
+        merged = {key: entry for _, key, entry in MemoryDetector.resolve_keys(
+            [(None, key, entry) for key, entry in merged.items()], existing)}
+        changed = [(key, value, category) for key, (value, category) in merged.items()
+                   if existing.get(key) != (value, category)]
+        items_added = db.set_memory_bulk(project_id, changed)
+
+        db.update_batch_requests(batch_id, [
+            {'custom_id': r['custom_id'], 'status': r['type'], 'error': r.get('error')}
+            for r in results
+        ])
+        db.update_batch_job(batch_id, status='merged')
+        return items_added
+
+    @staticmethod
+    def _add_memory(items: List[Tuple[str, str, str, str]], project_id: int) -> int:
+        """
+        Add validated items to the database.
+
+        Existing keys are read once and all new items are written in a
+        single transaction. 'add' items for a key already stored under
+        the same category are skipped; 'update' items revise the value.
+
+        Args:
+            items: List of (category, key, value, op)
             project_id: Project ID
 
         Returns:
             Number of items added
         """
-        items_added = 0
+        existing = db.get_memory_keys(project_id)  # key -> category
+        new_items = []
+
+        for category, key, value, op in MemoryDetector.resolve_keys(items, existing):
+            # Skip re-extracted keys already stored under the same category
+            if op != 'update' and existing.get(key) == category:
+                continue
+            existing[key] = category
+            new_items.append((key, value, category))
+
+        return db.set_memory_bulk(project_id, new_items)
+
+    @staticmethod
+    def _parse_legacy_markdown(markdown_text: str) -> List[Tuple[str, str, str]]:
+        """
+        Parse the markdown format used before structured output.
+
+        Only needed for bulk batches submitted by older versions.
+
+        Args:
+            markdown_text: Markdown formatted memory text
+
+        Returns:
+            List of (category, key, value, 'add') in response order
+        """
+        items = []
         current_category = "general"
 
         # Category mapping
@@ -153,19 +394,239 @@ NỘI DUNG CHƯƠNG:
                     value = parts[1].strip()
 
                     if key and value:
-                        # Check if key already exists for this project
-                        existing_memory = db.get_memory(project_id)
-                        key_exists = any(
-                            mem['key'] == key and mem['category'] == current_category
-                            for mem in existing_memory
-                        )
-
-                        if not key_exists:
-                            # Add new memory item
-                            db.set_memory(project_id, key, value, current_category)
-                            items_added += 1
+                        items.append((current_category, key, value, 'add'))
 
-        return items_added
+        return items
+
+
+class MemoryDetectionQueue(QObject):
+    """
+    Run memory detection on a background thread.
+
+    Content is deduplicated by hash per project; chapters queued within
+    COALESCE_DELAY of each other are merged (up to MAX_BATCH_CHARS) into
+    a single extraction request.
+    """
+
+    memory_added = pyqtSignal(int, int)  # project_id, items_added
+    detection_failed = pyqtSignal(int, str)  # project_id, error
+
+    COALESCE_DELAY = 3.0  # seconds to wait for more chapters
+    MAX_BATCH_CHARS = 60000
+    MAX_SEEN = 5000
+    SEPARATOR = "\n\n---\n\n"
+
+    def __init__(self):
+        super().__init__()
+        self._cond = threading.Condition()
+        self._pending: Dict[int, List[Tuple[str, str]]] = {}  # project_id -> [(digest, content)]
+        self._seen: "OrderedDict[Tuple[int, str], bool]" = OrderedDict()
+        self._in_flight: Tuple[Optional[int], int] = (None, 0)  # project_id, chapters being sent
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    @staticmethod
+    def _digest(content: str) -> str:
+        return hashlib.sha256(content.strip().encode('utf-8')).hexdigest()
+
+    def enqueue(self, content: str, project_id: int) -> bool:
+        """
+        Queue content for memory detection.
+
+        Returns:
+            False if the content is empty or was already queued/processed
+        """
+        if not content or not content.strip() or not project_id:
+            return False
+
+        digest = self._digest(content)
+        with self._cond:
+            if (project_id, digest) in self._seen:
+                return False
+            self._seen[(project_id, digest)] = True
+            while len(self._seen) > self.MAX_SEEN:
+                self._seen.popitem(last=False)
+
+            self._pending.setdefault(project_id, []).append((digest, content))
+            self._stopping = False
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return True
+
+    def enqueue_many(self, contents: Iterable[str], project_id: int) -> int:
+        """Queue several chapters (e.g. after a batch). Returns how many were queued."""
+        return sum(1 for content in contents if self.enqueue(content, project_id))
+
+    def pending_count(self, project_id: int = None) -> int:
+        """Number of chapters queued or in the request being sent."""
+        with self._cond:
+            in_flight_project, in_flight = self._in_flight
+            if project_id is not None:
+                if in_flight_project != project_id:
+                    in_flight = 0
+                return len(self._pending.get(project_id, [])) + in_flight
+            return sum(len(items) for items in self._pending.values()) + in_flight
+
+    def stop(self):
+        """Stop the worker after its current request; queued content is dropped."""
+        with self._cond:
+            self._stopping = True
+            self._pending.clear()
+            self._cond.notify()
+
+    def _take_batch(self) -> Tuple[int, List[Tuple[str, str]]]:
+        """Take up to MAX_BATCH_CHARS of one project's content (lock must be held)."""
+        project_id = next(iter(self._pending))
+        items = self._pending[project_id]
+        batch, size = [], 0
+        while items and (not batch or size + len(items[0][1]) <= self.MAX_BATCH_CHARS):
+            digest, content = items.pop(0)
+            batch.append((digest, content))
+            size += len(content)
+        if not items:
+            del self._pending[project_id]
+        return project_id, batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+
+            # Give consecutive chapters a moment to arrive so they share a request
+            time.sleep(self.COALESCE_DELAY)
+
+            with self._cond:
+                if not self._pending:
+                    continue
+                project_id, batch = self._take_batch()
+                self._in_flight = (project_id, len(batch))
+
+            content = self.SEPARATOR.join(content for _, content in batch)
+            try:
+                items_added, error = MemoryDetector.detect_memory(content, project_id)
+            finally:
+                with self._cond:
+                    self._in_flight = (None, 0)
+
+            if error:
+                print(f"Memory detection failed for project {project_id}: {error}")
+                # Forget the hashes so the same content can be retried later
+                with self._cond:
+                    for digest, _ in batch:
+                        self._seen.pop((project_id, digest), None)
+                self.detection_failed.emit(project_id, error)
+            else:
+                self.memory_added.emit(project_id, items_added)
+
+
+# Singleton instance
+memory_queue = MemoryDetectionQueue()
+
+
+class BulkMemoryWorker(QThread):
+    """
+    Extract memory from a range of stored chapters with the Batch API.
+
+    Pass batch_id to resume polling a job submitted in an earlier session.
+    """
+
+    progress = pyqtSignal(str, int, int)  # message, current, total
+    finished = pyqtSignal(int)  # items added
+    error = pyqtSignal(str)
+
+    POLL_INTERVAL = 30  # seconds
+
+    def __init__(self, project_id: int, from_chapter: int = None, to_chapter: int = None,
+                 batch_id: str = None):
+        super().__init__()
+        self.project_id = project_id
+        self.from_chapter = from_chapter
+        self.to_chapter = to_chapter
+        self.batch_id = batch_id
+        self.is_stopped = False
+        self._stop_event = threading.Event()  # wakes the poll wait on stop
+
+    def stop(self):
+        """Stop polling; the batch keeps running and can be resumed later."""
+        self.is_stopped = True
+        self._stop_event.set()
+
+    def cancel(self):
+        """Cancel the batch on the server."""
+        self.stop()
+        if self.batch_id:
+            try:
+                claude_client.cancel_batch(self.batch_id)
+            except Exception as e:
+                print(f"Error canceling memory batch: {e}")
+
+    def load_chapters(self) -> List[Tuple[int, str]]:
+        """Read stored chapters (processed text preferred over the raw scrape)."""
+        chapters = []
+        for chapter in db.get_chapters(self.project_id, self.from_chapter, self.to_chapter):
+            content = (blob_store.get_text(chapter['processed_blob'])
+                       or blob_store.get_text(chapter['raw_blob']))
+            if content:
+                chapters.append((chapter['chapter_num'], content))
+        return chapters
+
+    def run(self):
+        try:
+            if not self.batch_id:
+                self.progress.emit("Đang đọc các chương đã lưu...", 0, 0)
+                chapters = self.load_chapters()
+                if not chapters:
+                    self.error.emit("Không có chương nào đã lưu trong khoảng này.")
+                    return
+                if self.is_stopped:
+                    return
+
+                self.progress.emit(f"Đang gửi batch {len(chapters)} chương...", 0, len(chapters))
+                self.batch_id = MemoryDetector.start_bulk_detection(self.project_id, chapters)
+
+            job = db.get_batch_job(self.batch_id) or {}
+            total = job.get('file_count') or 0
+
+            # Poll for completion
+            last_state = None
+            while not self.is_stopped:
+                status_info = claude_client.get_batch_status(self.batch_id)
+                status = status_info['status']
+                counts = status_info['request_counts']
+                succeeded = counts.get('succeeded', 0)
+                errored = counts.get('errored', 0)
+                processing = counts.get('processing', 0)
+
+                if (status, processing, succeeded, errored) != last_state:
+                    last_state = (status, processing, succeeded, errored)
+                    db.update_batch_job(self.batch_id, status=status, processing=processing,
+                                        succeeded=succeeded, errored=errored,
+                                        ended_at=status_info.get('ended_at'))
+
+                self.progress.emit(
+                    f"Batch memory đang xử lý... ({succeeded}/{total}, lỗi: {errored})",
+                    succeeded, total
+                )
+
+                if status == 'ended':
+                    break
+                self._stop_event.wait(self.POLL_INTERVAL)
+
+            if self.is_stopped:
+                return
+
+            self.progress.emit("Đang gộp kết quả vào memory...", total, total)
+            results = claude_client.get_batch_results(self.batch_id, self.project_id, "memory")
+            items_added = MemoryDetector.merge_bulk_results(self.batch_id, self.project_id, results)
+            self.finished.emit(items_added)
+
+        except Exception as e:
+            self.error.emit(f"Lỗi batch memory: {str(e)}")
 
 
 def auto_detect_and_add_memory(content: str, project_id: int) -> Tuple[int, str]:
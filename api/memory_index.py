@@ -0,0 +1,184 @@
+"""
+AnhMin Audio - Memory Index
+Select the memory entries relevant to a chapter via a precomputed alias index
+"""
+
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Set, Tuple
+
+from database import db
+
+# Separators used in glossary 'original' / 'variants' fields
+ALIAS_SEPARATORS = re.compile(r'[,;，、|/]')
+PARENTHESIZED = re.compile(r'[(（]([^)）]{1,30})[)）]')
+WORD = re.compile(r'\w+')
+
+
+def normalize(text: str) -> str:
+    """Lowercase and strip Vietnamese diacritics ('Lâm Động' -> 'lam dong')."""
+    text = unicodedata.normalize('NFD', text.lower().replace('đ', 'd'))
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def is_cjk(text: str) -> bool:
+    """Check if text contains Han characters."""
+    return any('㐀' <= c <= '鿿' for c in text)
+
+
+def is_mostly_cjk(text: str, sample: int = 2000) -> bool:
+    """Check if at least a tenth of the start of text is Han characters."""
+    head = text[:sample]
+    return sum(1 for c in head if '㐀' <= c <= '鿿') * 10 >= len(head) > 0
+
+
+class MemoryIndex:
+    """
+    Alias index over one project's memory.
+
+    Aliases of an item are its key (underscores as spaces), the name part
+    of its value ('Tên - mô tả'), parenthesized names in the value, and the
+    original/variant spellings of glossary terms whose standard name
+    matches one of those. Latin aliases match whole words of the
+    diacritic-free text; Han aliases match as substrings.
+    """
+
+    MIN_ALIAS_CHARS = 3
+    MIN_CJK_ALIAS_CHARS = 2
+    MAX_NAME_CHARS = 40
+
+    def __init__(self, memory: List[Dict], glossary_terms: List[Dict] = ()):
+        # first word -> [(alias words, memory id)]
+        self._words: Dict[str, List[Tuple[Tuple[str, ...], int]]] = {}
+        self._cjk: Dict[str, Set[int]] = {}
+
+        aliases: Dict[str, Set[int]] = {}  # normalized alias -> memory ids
+        for item in memory:
+            for alias in self._item_aliases(item):
+                aliases.setdefault(alias, set()).add(item['id'])
+
+        # Link glossary spellings (e.g. the Chinese original) to memory items
+        for term in glossary_terms:
+            ids = aliases.get(normalize(term.get('standard') or '').strip())
+            if not ids:
+                continue
+            for field in ('original', 'variants'):
+                for spelling in ALIAS_SEPARATORS.split(term.get(field) or ''):
+                    spelling = normalize(spelling).strip()
+                    if spelling:
+                        aliases.setdefault(spelling, set()).update(ids)
+
+        for alias, ids in aliases.items():
+            self._add_alias(alias, ids)
+
+    def _item_aliases(self, item: Dict) -> Set[str]:
+        """Get the normalized aliases of a memory item."""
+        names = [item['key'].replace('_', ' ')]
+        value = item.get('value') or ''
+        name = re.split(r' - |:', value, 1)[0]
+        if len(name) <= self.MAX_NAME_CHARS:
+            names.append(name)
+        names.extend(PARENTHESIZED.findall(value))
+        return {normalize(n).strip() for n in names if n.strip()}
+
+    def _add_alias(self, alias: str, ids: Set[int]):
+        if is_cjk(alias):
+            if len(alias) >= self.MIN_CJK_ALIAS_CHARS:
+                self._cjk.setdefault(alias, set()).update(ids)
+            return
+
+        words = tuple(WORD.findall(alias))
+        if not words or len(''.join(words)) < self.MIN_ALIAS_CHARS:
+            return
+        for memory_id in ids:
+            self._words.setdefault(words[0], []).append((words, memory_id))
+
+    @property
+    def has_cjk_aliases(self) -> bool:
+        return bool(self._cjk)
+
+    def match(self, text: str) -> Set[int]:
+        """Get the ids of memory items mentioned in text."""
+        found = set()
+
+        words = WORD.findall(normalize(text))
+        for i, word in enumerate(words):
+            for alias, memory_id in self._words.get(word, ()):
+                if memory_id not in found and tuple(words[i:i + len(alias)]) == alias:
+                    found.add(memory_id)
+
+        for alias, ids in self._cjk.items():
+            if alias in text:
+                found.update(ids)
+
+        return found
+
+
+class MemoryIndexCache:
+    """
+    Per-project MemoryIndex, rebuilt when memory or glossary is written.
+    """
+
+    TABLES = ('project_memory', 'glossary_categories', 'glossary_terms')
+
+    # Categories always sent (project-wide context, not tied to names)
+    PINNED_CATEGORIES = ('series', 'style', 'progress')
+
+    # Projects with at most this many items get all of them
+    FILTER_MIN_ITEMS = 30
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes: Dict[int, Tuple[Dict[str, int], MemoryIndex]] = {}
+
+    def get(self, project_id: int) -> MemoryIndex:
+        """Get a project's index, rebuilding it if memory/glossary changed."""
+        versions = db.get_table_versions(self.TABLES)
+        with self._lock:
+            cached = self._indexes.get(project_id)
+            if cached and cached[0] == versions:
+                return cached[1]
+
+        with db.read_transaction():
+            index = MemoryIndex(db.get_memory(project_id), db.get_all_glossary_terms(project_id))
+
+        with self._lock:
+            self._indexes[project_id] = (versions, index)
+        return index
+
+    def filter(self, memory: List[Dict], text: str) -> List[Dict]:
+        """
+        Keep the pinned items and the items mentioned in text.
+
+        Args:
+            memory: Memory rows of one project (db.get_memory)
+            text: Chapter or message the prompt is for
+
+        Returns:
+            Subset of memory, in its original order
+        """
+        if len(memory) <= self.FILTER_MIN_ITEMS or not text:
+            return memory
+
+        index = self.get(memory[0]['project_id'])
+
+        # Han source text cannot match Vietnamese names without Han aliases
+        if not index.has_cjk_aliases and is_mostly_cjk(text):
+            return memory
+
+        found = index.match(text)
+        return [m for m in memory
+                if m['id'] in found or m.get('category') in self.PINNED_CATEGORIES]
+
+    def invalidate(self, project_id: int = None):
+        """Drop one project's index, or all of them."""
+        with self._lock:
+            if project_id is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(project_id, None)
+
+
+# Singleton instance
+memory_index = MemoryIndexCache()
@@ -0,0 +1,111 @@
+"""
+AnhMin Audio - Piaotia Parser
+Linear-time extraction of chapter title and text from piaotia.com pages
+"""
+
+import html
+import re
+from typing import Tuple
+
+# Any tag (or comment/doctype)
+TAG = re.compile(r'<[^>]+>')
+BR = re.compile(r'<br\s*/?>', re.IGNORECASE)
+
+# Blocks dropped with their text (ads, navigation, scripts); skipped up
+# to the first closing tag of the same name. Scripts go first, so markup
+# inside script strings (e.g. '</div>') cannot end another block
+SCRIPT_OPEN = re.compile(r'<(script)\b[^>]*>', re.IGNORECASE)
+SKIP_OPEN = re.compile(r'<(div|a|center)\b[^>]*>', re.IGNORECASE)
+BLOCK_END = {name: re.compile(r'</%s\s*>' % name, re.IGNORECASE)
+             for name in ('script', 'div', 'a', 'center')}
+
+H1 = re.compile(r'<h1[^>]*>([^<]*(?:<(?!/h1)[^<]*)*)</h1>', re.IGNORECASE)
+
+CONTENT_START = '</table>'
+CONTENT_END = '<div id="Commenddiv"'
+
+MIN_LINE_CHARS = 3
+
+
+class PiaotiaParser:
+    """
+    Parse piaotia.com chapter pages.
+
+    The chapter text is the markup between the first </table> and
+    <div id="Commenddiv">. One scan drops <script> blocks, a second
+    drops div/a/center blocks, each with their text (closing tags found
+    once are reused, so unclosed blocks cannot make it quadratic); <br>
+    then becomes a newline and other tags are dropped. Only plain string
+    searches and compiled patterns that cannot backtrack are used.
+
+    Unlike the old regex passes, tag names match in any case (<BR>
+    becomes a newline, <DIV> blocks are dropped) and <a> does not match
+    longer tag names such as <abbr>.
+    """
+
+    def strip_blocks(self, markup: str, opener: re.Pattern = SKIP_OPEN) -> str:
+        """Remove the blocks opener starts, with their text (one scan over the markup)."""
+        parts = []
+        pos = 0
+        ends = {}  # block name -> next closing tag match (None: no more)
+        while True:
+            match = opener.search(markup, pos)
+            if not match:
+                parts.append(markup[pos:])
+                break
+
+            parts.append(markup[pos:match.start()])
+            pos = match.end()
+
+            # Reuse the last closing tag found if it is still ahead, so
+            # unclosed blocks do not rescan the rest of the page
+            name = match.group(1).lower()
+            end = ends.get(name, False)
+            if end is False or (end is not None and end.start() < pos):
+                end = ends[name] = BLOCK_END[name].search(markup, pos)
+            if end is not None:
+                pos = end.end()
+
+        return ''.join(parts)
+
+    def strip_tags(self, markup: str) -> str:
+        """Convert content markup to text: skip blocks, <br> to newline, drop tags."""
+        markup = self.strip_blocks(self.strip_blocks(markup, SCRIPT_OPEN))
+        return TAG.sub('', BR.sub('\n', markup))
+
+    def clean_text(self, text: str) -> str:
+        """Decode entities, drop non-breaking spaces and short/empty lines."""
+        text = text.replace('&nbsp;', '')
+        if '&' in text:
+            text = html.unescape(text)
+        text = text.replace('\xa0', '')
+        lines = (line.strip() for line in text.split('\n'))
+        return '\n'.join(line for line in lines if len(line) >= MIN_LINE_CHARS)
+
+    def parse_title(self, page: str) -> str:
+        """Get the text of the first <h1> ("" if none)."""
+        match = H1.search(page)
+        if not match:
+            return ""
+        return html.unescape(TAG.sub('', match.group(1))).strip()
+
+    def parse_content(self, page: str) -> str:
+        """
+        Get the chapter text.
+
+        Raises:
+            ValueError if the content markers are missing
+        """
+        start = page.find(CONTENT_START)
+        end = page.find(CONTENT_END, start) if start >= 0 else -1
+        if end < 0:
+            raise ValueError("Không tìm thấy content pattern")
+        return self.clean_text(self.strip_tags(page[start + len(CONTENT_START):end]))
+
+    def parse(self, page: str) -> Tuple[str, str]:
+        """Get (title, content) of a decoded chapter page."""
+        return self.parse_title(page), self.parse_content(page)
+
+
+# Singleton instance
+piaotia_parser = PiaotiaParser()
@@ -0,0 +1,312 @@
+"""
+AnhMin Audio - Term Miner
+Offline glossary candidate mining from scraped and processed chapters
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from database import db
+from api.blob_store import blob_store
+from api.glossary_matcher import normalize_text, split_spellings
+
+HAN_RUN = re.compile(r'[㐀-鿿]{2,}')
+# A word, and whether it follows a sentence break
+VI_WORD = re.compile(r'([.!?:;"“”…\n]\s*)?([^\W\d_]+)')
+
+# Category hints: (glossary category name, Vietnamese suffixes, Han suffixes)
+CATEGORY_HINTS = [
+    ('Cảnh giới', ('cảnh', 'kỳ', 'cấp', 'tầng', 'trọng', 'đế', 'vương', 'tôn', 'thánh', 'tiên'),
+     ('境', '期', '阶', '层', '重', '帝', '王', '尊', '圣', '仙')),
+    ('Chiêu thức', ('quyền', 'chưởng', 'chỉ', 'thuật', 'quyết', 'công', 'pháp', 'ấn', 'trảm'),
+     ('拳', '掌', '指', '术', '诀', '功', '法', '印', '斩')),
+    ('Thế lực', ('tông', 'môn', 'phái', 'gia', 'tộc', 'điện', 'các', 'hội', 'minh'),
+     ('宗', '门', '派', '家', '族', '殿', '阁', '会', '盟')),
+    ('Địa danh', ('thành', 'sơn', 'cốc', 'vực', 'châu', 'quốc', 'lâm', 'hải', 'phong'),
+     ('城', '山', '谷', '域', '州', '国', '林', '海', '峰')),
+    ('Vật phẩm', ('đan', 'đỉnh', 'kiếm', 'đao', 'thạch', 'quả', 'dịch', 'phù', 'bảo'),
+     ('丹', '鼎', '剑', '刀', '石', '果', '液', '符', '宝')),
+]
+DEFAULT_CATEGORY = 'Nhân vật'
+
+
+@dataclass
+class TermCandidate:
+    """A ranked glossary suggestion."""
+    text: str
+    category: str
+    score: float
+    frequency: int
+    chapters: int
+    script: str  # 'han' or 'vi'
+
+
+def guess_category(text: str, script: str) -> str:
+    """Guess a glossary category from the term's last syllable/character."""
+    if script == 'han':
+        for name, _, han_suffixes in CATEGORY_HINTS:
+            if text.endswith(han_suffixes):
+                return name
+    else:
+        last = text.split()[-1].lower()
+        for name, vi_suffixes, _ in CATEGORY_HINTS:
+            if last in vi_suffixes:
+                return name
+    return DEFAULT_CATEGORY
+
+
+class ProjectTermStats:
+    """
+    Incremental n-gram statistics over a project's chapters.
+
+    Han text: character n-grams (1..MAX_HAN_N) inside Han runs.
+    Vietnamese text: runs of Capitalized syllables that do not start a
+    sentence (proper nouns capitalize every syllable), plus lowercase
+    syllable counts for PMI.
+    """
+
+    MAX_HAN_N = 4
+    MAX_VI_N = 4
+    MAX_NGRAMS = 3_000_000  # prune singletons beyond this
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seen: Dict[int, Tuple[str, Optional[str]]] = {}  # chapter_num -> (raw, processed blob)
+        self.han = Counter()
+        self.han_chapters = Counter()
+        self.han_total = 0
+        self.vi_words = Counter()
+        self.vi_phrases = Counter()
+        self.vi_chapters = Counter()
+        self.vi_total = 0
+
+    def add_han(self, text: str):
+        """Count Han n-grams of one chapter."""
+        runs = HAN_RUN.findall(text)
+        present = set()
+        for n in range(1, self.MAX_HAN_N + 1):
+            grams = [run[i:i + n] for run in runs for i in range(len(run) - n + 1)]
+            self.han.update(grams)
+            if n == 1:
+                self.han_total += len(grams)
+            else:
+                present.update(grams)
+        self.han_chapters.update(present)
+        if len(self.han) > self.MAX_NGRAMS:
+            self.han = Counter({g: c for g, c in self.han.items() if c > 1 or len(g) == 1})
+
+    def add_vietnamese(self, text: str):
+        """Count capitalized syllable runs of one chapter."""
+        present = set()
+        run: List[str] = []
+        skip_first = False  # run starts a sentence: its first word may be any word
+        last_end = 0
+
+        def close_run():
+            words = run[1:] if skip_first else run
+            for n in range(2, min(len(words), self.MAX_VI_N) + 1):
+                for i in range(len(words) - n + 1):
+                    phrase = ' '.join(words[i:i + n])
+                    self.vi_phrases[phrase] += 1
+                    present.add(phrase)
+            run.clear()
+
+        for match in VI_WORD.finditer(text):
+            word = match.group(2)
+            self.vi_words[word.lower()] += 1
+            self.vi_total += 1
+
+            sentence_start = match.group(1) is not None or match.start(2) == 0
+            contiguous = bool(run) and text[last_end:match.start(2)].isspace()
+            last_end = match.end(2)
+
+            if word[0].isupper() and contiguous and not sentence_start:
+                run.append(word)
+                continue
+            close_run()
+            if word[0].isupper():
+                run.append(word)
+                skip_first = sentence_start
+        close_run()
+        self.vi_chapters.update(present)
+
+    def han_candidates(self, min_freq: int) -> List[TermCandidate]:
+        """Rank Han n-grams by frequency and weakest-split PMI."""
+        total = max(self.han_total, 1)
+        scored = {}
+        for gram, count in self.han.items():
+            if len(gram) < 2 or count < min_freq:
+                continue
+            splits = [(self.han[gram[:i]], self.han[gram[i:]]) for i in range(1, len(gram))]
+            if not all(left and right for left, right in splits):
+                continue
+            pmi = min(math.log(count * total / (left * right)) for left, right in splits)
+            if pmi <= 0:
+                continue
+            scored[gram] = (count, pmi)
+
+        # Drop fragments that mostly occur inside a longer candidate
+        counts = {gram: count for gram, (count, _) in scored.items()}
+        for gram, count in counts.items():
+            for sub in (gram[:-1], gram[1:]):
+                if len(sub) >= 2 and sub in scored and counts[sub] <= count * 1.25:
+                    scored.pop(sub, None)
+
+        return [
+            TermCandidate(gram, guess_category(gram, 'han'),
+                          count * pmi * math.log1p(self.han_chapters[gram]),
+                          count, self.han_chapters[gram], 'han')
+            for gram, (count, pmi) in scored.items()
+        ]
+
+    def vi_candidates(self, min_freq: int) -> List[TermCandidate]:
+        """Rank capitalized Vietnamese phrases by frequency and PMI."""
+        total = max(self.vi_total, 1)
+        scored = {}
+        for phrase, count in self.vi_phrases.items():
+            if count < min_freq:
+                continue
+            words = phrase.lower().split()
+            expected = 1.0
+            for word in words:
+                expected *= self.vi_words[word] / total
+            pmi = math.log(count / total / expected) / (len(words) - 1) if expected else 0
+            if pmi <= 0:
+                continue
+            scored[phrase] = (count, pmi)
+
+        # Drop fragments that mostly occur inside a longer candidate
+        counts = {phrase: count for phrase, (count, _) in scored.items()}
+        for phrase, count in counts.items():
+            words = phrase.split()
+            for sub in (' '.join(words[:-1]), ' '.join(words[1:])):
+                if sub in scored and counts[sub] <= count * 1.25:
+                    scored.pop(sub, None)
+
+        return [
+            TermCandidate(phrase, guess_category(phrase, 'vi'),
+                          count * pmi * math.log1p(self.vi_chapters[phrase]),
+                          count, self.vi_chapters[phrase], 'vi')
+            for phrase, (count, pmi) in scored.items()
+        ]
+
+
+class TermMiner:
+    """
+    Suggest glossary terms from a project's stored chapters.
+
+    Statistics are kept per project in memory and only chapters not
+    seen before are read, so refreshing after new chapters arrive costs
+    only those chapters. A chapter processed by Claude since it was
+    counted only adds its processed text. When a counted chapter's text
+    changes (re-scraped, re-processed) or it is deleted, the project's
+    statistics are rebuilt, since counts cannot be subtracted exactly
+    once rare n-grams have been pruned.
+    """
+
+    MIN_FREQUENCY = 5
+    MAX_CANDIDATES = 300
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[int, ProjectTermStats] = {}
+
+    def _get_stats(self, project_id: int) -> ProjectTermStats:
+        with self._lock:
+            return self._stats.setdefault(project_id, ProjectTermStats())
+
+    def update(self, project_id: int, progress=None) -> int:
+        """
+        Add chapters stored or processed since the last update to the statistics.
+
+        Args:
+            progress: Optional callback(done, total)
+
+        Returns:
+            Number of chapters read
+        """
+        stats = self._get_stats(project_id)
+        chapters = db.get_chapters(project_id)
+        current = {c['chapter_num']: (c['raw_blob'], c['processed_blob']) for c in chapters}
+
+        # Chapters whose counted text was replaced or removed: rebuild
+        if any(current.get(num, (None, None))[0] != raw
+               or (processed and current[num][1] != processed)
+               for num, (raw, processed) in stats.seen.items()):
+            with self._lock:
+                stats = self._stats[project_id] = ProjectTermStats()
+
+        with stats.lock:
+            todo = [c for c in chapters if stats.seen.get(c['chapter_num']) !=
+                    (c['raw_blob'], c['processed_blob'])]
+            for i, chapter in enumerate(todo):
+                seen = stats.seen.get(chapter['chapter_num'])
+                if seen is None:
+                    raw = blob_store.get_text(chapter['raw_blob'])
+                    if raw:
+                        stats.add_han(raw)
+                        if not HAN_RUN.search(raw[:2000]):
+                            stats.add_vietnamese(raw)
+                # Else only the processed text is new (raw is unchanged)
+                processed = blob_store.get_text(chapter['processed_blob']) \
+                    if chapter['processed_blob'] else None
+                if processed:
+                    stats.add_vietnamese(processed)
+                stats.seen[chapter['chapter_num']] = (chapter['raw_blob'], chapter['processed_blob'])
+                if progress:
+                    progress(i + 1, len(todo))
+            return len(todo)
+
+    def candidates(self, project_id: int, min_frequency: int = None,
+                   limit: int = None) -> List[TermCandidate]:
+        """
+        Get ranked candidates that are not in the glossary yet.
+
+        Returns:
+            Best candidates first
+        """
+        min_frequency = min_frequency or self.MIN_FREQUENCY
+        stats = self._get_stats(project_id)
+        with stats.lock:
+            found = stats.han_candidates(min_frequency) + stats.vi_candidates(min_frequency)
+
+        known = set()
+        for term in db.iter_glossary_terms(project_id):
+            known.add(normalize_text(term['standard']))
+            for field in ('original', 'variants'):
+                known.update(normalize_text(s) for s in split_spellings(term.get(field)))
+
+        found = [c for c in found if normalize_text(c.text) not in known]
+        found.sort(key=lambda c: c.score, reverse=True)
+        return found[:limit or self.MAX_CANDIDATES]
+
+    def accept(self, project_id: int, candidates: Iterable[TermCandidate]) -> Dict[str, int]:
+        """
+        Add candidates to the glossary in one transaction.
+
+        Han candidates are stored with the Han text as original and as a
+        placeholder standard (marked 'Chưa dịch') until translated.
+        """
+        rows = []
+        for candidate in candidates:
+            row = {'category': candidate.category, 'standard': candidate.text}
+            if candidate.script == 'han':
+                row.update(original=candidate.text, notes=db.UNTRANSLATED_NOTE)
+            rows.append(row)
+        return db.upsert_glossary_terms(project_id, rows)
+
+    def reset(self, project_id: int = None):
+        """Forget statistics for one project, or all of them."""
+        with self._lock:
+            if project_id is None:
+                self._stats.clear()
+            else:
+                self._stats.pop(project_id, None)
+
+
+# Singleton instance
+term_miner = TermMiner()
@@ -0,0 +1,248 @@
+"""
+AnhMin Audio - Usage Tracker
+In-memory usage aggregator with periodic write-behind to SQLite
+"""
+
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from PyQt6.QtCore import QObject, pyqtSignal, QTimer
+
+from database import db, db_executor
+from config import MODEL_PRICING, DEFAULT_PRICING
+
+
+def calculate_cost(model: str, usage: Dict[str, int], batch: bool = False) -> float:
+    """
+    Estimate the USD cost of a request from its token usage.
+
+    Args:
+        model: Model ID used for the request
+        usage: Token counts (input, output, cache creation, cache read)
+        batch: Whether the request went through the Batch API (50% off)
+
+    Returns:
+        Cost in USD
+    """
+    prefixes = [p for p in MODEL_PRICING if model and model.startswith(p)]
+    input_price, output_price = (
+        MODEL_PRICING[max(prefixes, key=len)] if prefixes else DEFAULT_PRICING
+    )
+
+    cost = (
+        usage.get('input_tokens', 0) * input_price
+        + usage.get('output_tokens', 0) * output_price
+        + usage.get('cache_creation_tokens', 0) * input_price * 1.25
+        + usage.get('cache_read_tokens', 0) * input_price * 0.1
+    ) / 1_000_000
+
+    return cost * 0.5 if batch else cost
+
+
+class UsageTracker(QObject):
+    """
+    Aggregate per-request usage in memory and flush it to the database.
+
+    Workers call record_request() on every successful API call; the
+    counters are keyed by (date, project, model, key, task type) and
+    written to the usage ledger and its monthly rollups in one
+    transaction every FLUSH_INTERVAL_MS and on shutdown. Batch results
+    are buffered per batch and counted once per batch (see record_batch).
+    """
+
+    usage_updated = pyqtSignal(dict)  # today's totals, including unflushed usage
+    api_status_changed = pyqtSignal()  # key last_used / error_count written
+
+    FLUSH_INTERVAL_MS = 15000
+    TODAY_FIELDS = ('input_tokens', 'output_tokens', 'request_count', 'cost')
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._pending_usage: Dict[tuple, Dict[str, float]] = {}
+        self._pending_keys: Dict[int, str] = {}  # key_id -> last_used
+        self._pending_batches: Dict[str, Dict[tuple, Dict[str, float]]] = {}  # batch_id -> usage
+        self._today_date: Optional[str] = None
+        self._today: Dict[str, float] = {}
+        self._timer: Optional[QTimer] = None
+
+    def start(self, interval_ms: int = None):
+        """Start the periodic flush timer (call from the main thread)."""
+        if self._timer is None:
+            self._timer = QTimer(self)
+            self._timer.timeout.connect(self.flush)
+        self._timer.start(interval_ms or self.FLUSH_INTERVAL_MS)
+
+    def stop(self):
+        """Stop the flush timer and write any pending usage."""
+        if self._timer:
+            self._timer.stop()
+        self.flush(wait=True)
+
+    def _load_today(self, date: str):
+        """Reset today's counters from the database when the date changes."""
+        if self._today_date == date:
+            return
+        usage = db.get_usage_today()
+        self._today_date = date
+        self._today = {field: usage.get(field) or 0 for field in self.TODAY_FIELDS}
+        pending = [self._pending_usage, *self._pending_batches.values()]
+        for entries in pending:
+            for key, counters in entries.items():
+                if key[0] == date:
+                    for field in self.TODAY_FIELDS:
+                        self._today[field] += counters[field]
+
+    def _merge(self, key: tuple, counters: Dict[str, float], into: Dict = None):
+        """Add counters into the pending entry for key (lock must be held)."""
+        entries = self._pending_usage if into is None else into
+        pending = entries.setdefault(key, dict.fromkeys(db.USAGE_FIELDS, 0))
+        for field in db.USAGE_FIELDS:
+            pending[field] += counters.get(field, 0)
+
+    @staticmethod
+    def _counters(usage: Dict[str, int], model: str, batch: bool) -> Dict[str, float]:
+        counters = dict(usage)
+        counters['request_count'] = 1
+        counters['cost'] = calculate_cost(model, usage, batch)
+        return counters
+
+    def record_request(self, key_id: Optional[int], usage: Dict[str, int],
+                       model: str = "", project_id: Optional[int] = None,
+                       task_type: str = "chat", batch: bool = False):
+        """
+        Record a successful request.
+
+        Args:
+            key_id: API key that served the request
+            usage: Token counts (input_tokens, output_tokens,
+                   cache_creation_tokens, cache_read_tokens, thinking_tokens)
+            model: Model ID used
+            project_id: Project the request was made for, if any
+            task_type: Pipeline that issued the request (chat, memory,
+                       link_to_text, batch, ...)
+            batch: Whether the request went through the Batch API
+        """
+        now = datetime.now()
+        date = now.strftime("%Y-%m-%d")
+        counters = self._counters(usage, model, batch)
+        key = (date, project_id or 0, model or "", key_id or 0, task_type)
+
+        with self._lock:
+            self._load_today(date)
+            self._merge(key, counters)
+
+            for field in self.TODAY_FIELDS:
+                self._today[field] += counters.get(field, 0)
+            today = dict(self._today)
+
+            if key_id is not None:
+                self._pending_keys[key_id] = now.isoformat()
+
+        self.usage_updated.emit(today)
+
+    def record_batch(self, batch_id: str, key_id: Optional[int],
+                     usages: List[Tuple[str, Dict[str, int]]],
+                     project_id: Optional[int] = None, task_type: str = "batch"):
+        """
+        Record the succeeded results of a Message Batch, once per batch.
+
+        Results can be fetched many times (re-downloads, workers resumed
+        after a restart); a batch whose usage is already pending or marked
+        usage_recorded on its batch_jobs row is ignored. The mark is
+        checked again and set in the flush transaction.
+
+        Args:
+            batch_id: Anthropic batch ID
+            key_id: API key the results were fetched with
+            usages: (model, token counts) of every succeeded result
+            project_id: Project the batch belongs to, if any
+            task_type: Pipeline that created the batch
+        """
+        if not usages or batch_id in self._pending_batches or db.is_batch_usage_recorded(batch_id):
+            return
+
+        now = datetime.now()
+        date = now.strftime("%Y-%m-%d")
+        entries: Dict[tuple, Dict[str, float]] = {}
+
+        with self._lock:
+            if batch_id in self._pending_batches:
+                return
+            for model, usage in usages:
+                key = (date, project_id or 0, model or "", key_id or 0, task_type)
+                self._merge(key, self._counters(usage, model, True), into=entries)
+
+            self._load_today(date)
+            self._pending_batches[batch_id] = entries
+            for counters in entries.values():
+                for field in self.TODAY_FIELDS:
+                    self._today[field] += counters[field]
+            today = dict(self._today)
+
+            if key_id is not None:
+                self._pending_keys[key_id] = now.isoformat()
+
+        self.usage_updated.emit(today)
+
+    def get_usage_today(self) -> Dict:
+        """Get today's usage including counters not yet flushed."""
+        with self._lock:
+            self._load_today(datetime.now().strftime("%Y-%m-%d"))
+            return dict(self._today)
+
+    def flush(self, wait: bool = False):
+        """
+        Queue all pending usage as one write transaction.
+
+        Args:
+            wait: Block until the write is done (required off the main
+                  thread, where queued callbacks would never run)
+        """
+        with self._lock:
+            usage, self._pending_usage = self._pending_usage, {}
+            keys, self._pending_keys = self._pending_keys, {}
+            batches, self._pending_batches = self._pending_batches, {}
+
+        if not usage and not keys and not batches:
+            return
+
+        if wait:
+            try:
+                db_executor.write(db.flush_usage, usage, keys, batches).result()
+            except Exception as e:
+                self._on_flush_failed(usage, keys, str(e), batches)
+                return
+            self._on_flushed(keys)
+        else:
+            db_executor.write(
+                db.flush_usage, usage, keys, batches,
+                callback=lambda _: self._on_flushed(keys),
+                error_callback=lambda error: self._on_flush_failed(usage, keys, error, batches)
+            )
+
+    def _on_flushed(self, keys: Dict[int, str]):
+        if keys:
+            self.api_status_changed.emit()
+
+    def _on_flush_failed(self, usage: Dict[tuple, Dict[str, float]],
+                         keys: Dict[int, str], error: str, batches: Dict = None):
+        """Put the counters back so the next flush retries them."""
+        print(f"Error flushing usage: {error}")
+        with self._lock:
+            for key, counters in usage.items():
+                self._merge(key, counters)
+            for key_id, last_used in keys.items():
+                self._pending_keys.setdefault(key_id, last_used)
+            for batch_id, entries in (batches or {}).items():
+                self._pending_batches.setdefault(batch_id, entries)
+
+    def record_key_error(self, key_id: int):
+        """Increment a key's error count after flushing its pending success."""
+        self.flush(wait=True)
+        db_executor.write(db.increment_api_key_error, key_id).result()
+        self.api_status_changed.emit()
+
+
+# Singleton instance
+usage_tracker = UsageTracker()
@@ -0,0 +1,219 @@
+"""
+AnhMin Audio - Web Fetcher
+Pooled HTTP session with bounded per-host concurrency and polite rate limiting
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from api.http_cache import http_cache
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+def get_host(url: str) -> str:
+    """Get the host of a URL without 'www.'."""
+    return urlparse(url).netloc.lower().replace('www.', '')
+
+
+class HostRateLimiter:
+    """
+    Space out request starts per host.
+
+    Each caller reserves the next free slot for its host and sleeps
+    until then, so concurrent threads never start two requests to the
+    same host closer than the host's interval.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_slot: Dict[str, float] = {}
+
+    def wait(self, host: str, interval: float):
+        """Block until a request to host may start."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def defer(self, host: str, seconds: float):
+        """Push the host's next slot back (e.g. after HTTP 429)."""
+        with self._lock:
+            self._next_slot[host] = max(self._next_slot.get(host, 0.0),
+                                        time.monotonic() + seconds)
+
+
+class WebFetcher:
+    """
+    Shared HTTP client for the static scrapers.
+
+    One requests.Session keeps connections alive per host. Requests to
+    a host are limited to MAX_PER_HOST at a time and started at most
+    once per MIN_INTERVAL seconds; both can be set per host.
+    """
+
+    MAX_PER_HOST = 4
+    MIN_INTERVAL = 0.25  # seconds between request starts to one host
+    MAX_WORKERS = 8
+    TIMEOUT = 15
+    MAX_RETRIES = 3
+    RETRY_DELAY = 1.0  # doubled after each failed attempt
+    BACKOFF_STATUSES = (429, 503)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._limiter = HostRateLimiter()
+        self._host_limits: Dict[str, Tuple[int, float]] = {}  # host -> (max concurrent, interval)
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+
+    @property
+    def session(self) -> requests.Session:
+        """The pooled session (created on first use)."""
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.MAX_WORKERS,
+                                      pool_maxsize=self.MAX_WORKERS)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                self._session = session
+            return self._session
+
+    def configure_host(self, host: str, max_concurrency: int = None, min_interval: float = None):
+        """Set a host's concurrency and rate limit (e.g. from SUPPORTED_WEBSITES)."""
+        host = host.lower().replace('www.', '')
+        with self._lock:
+            current = self._host_limits.get(host, (self.MAX_PER_HOST, self.MIN_INTERVAL))
+            limits = (max_concurrency or current[0],
+                      current[1] if min_interval is None else min_interval)
+            self._host_limits[host] = limits
+            if host in self._semaphores and limits[0] != current[0]:
+                del self._semaphores[host]  # new limit applies to requests not yet started
+
+    def _get_limits(self, host: str) -> Tuple[threading.BoundedSemaphore, float]:
+        with self._lock:
+            max_concurrency, interval = self._host_limits.get(
+                host, (self.MAX_PER_HOST, self.MIN_INTERVAL))
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(max_concurrency)
+                self._semaphores[host] = semaphore
+            return semaphore, interval
+
+    def get(self, url: str, encoding: str = None, timeout: float = None,
+            ttl: float = None, **kwargs):
+        """
+        GET a URL within the host's concurrency and rate limits.
+
+        Args:
+            encoding: Force the response text encoding (e.g. 'gbk')
+            ttl: Use the HTTP cache: serve a copy validated less than ttl
+                seconds ago, otherwise revalidate it with a conditional
+                GET. None bypasses the cache.
+
+        Returns:
+            requests.Response, or a CachedPage when served from the cache
+
+        Raises:
+            requests.HTTPError on an error status
+        """
+        entry = None
+        if ttl is not None:
+            entry = http_cache.lookup(url)
+            if entry and http_cache.is_fresh(entry, ttl):
+                return http_cache.to_page(entry, encoding)
+            kwargs['headers'] = {**kwargs.get('headers', {}), **http_cache.conditional_headers(entry)}
+
+        host = get_host(url)
+        semaphore, interval = self._get_limits(host)
+        with semaphore:
+            self._limiter.wait(host, interval)
+            response = self.session.get(url, timeout=timeout or self.TIMEOUT, **kwargs)
+
+        if response.status_code in self.BACKOFF_STATUSES:
+            retry_after = response.headers.get('Retry-After', '')
+            self._limiter.defer(host, float(retry_after) if retry_after.isdigit() else 5.0)
+        response.raise_for_status()
+
+        if ttl is not None:
+            if response.status_code == 304 and entry:
+                http_cache.mark_validated(url, response.headers)
+                return http_cache.to_page(entry, encoding)
+            if response.status_code == 200:
+                http_cache.store(url, response.content, response.headers,
+                                 encoding or response.encoding)
+
+        if encoding:
+            response.encoding = encoding
+        return response
+
+    def fetch_ordered(self, urls: List[str], parse: Callable[[int, requests.Response], object],
+                      encoding: str = None, ttl: float = None,
+                      is_cancelled: Callable[[], bool] = None,
+                      on_retry: Callable[[int, int, Exception], None] = None
+                      ) -> Iterator[Tuple[int, object, Optional[Exception]]]:
+        """
+        Fetch and parse many URLs concurrently, yielding in input order.
+
+        A URL is retried (with backoff) when the request or
+        parse(index, response) raises, up to MAX_RETRIES attempts. A page
+        that fails to parse is dropped from the HTTP cache, so the retry
+        (and later runs) fetch it again instead of reusing the bad copy.
+
+        Args:
+            parse: Called on a worker thread with (index, response)
+            ttl: HTTP cache lifetime (see get())
+            is_cancelled: Checked between results; pending fetches are dropped
+            on_retry: Called on a worker thread with (index, attempt, error)
+
+        Yields:
+            (index, parse result, None) or (index, None, last error)
+        """
+        def task(index: int, url: str):
+            delay = self.RETRY_DELAY
+            for attempt in range(1, self.MAX_RETRIES + 1):
+                if is_cancelled and is_cancelled():
+                    return None, None
+                try:
+                    response = self.get(url, encoding=encoding, ttl=ttl)
+                    try:
+                        return parse(index, response), None
+                    except Exception:
+                        if ttl is not None:
+                            http_cache.remove(url)
+                        raise
+                except Exception as e:
+                    if attempt == self.MAX_RETRIES:
+                        return None, e
+                    if on_retry:
+                        on_retry(index, attempt, e)
+                    time.sleep(delay)
+                    delay *= 2
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(len(urls), self.MAX_WORKERS)),
+                                      thread_name_prefix='fetch')
+        try:
+            futures = [executor.submit(task, i, url) for i, url in enumerate(urls)]
+            for index, future in enumerate(futures):
+                if is_cancelled and is_cancelled():
+                    break
+                result, error = future.result()
+                yield index, result, error
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instance
+web_fetcher = WebFetcher()
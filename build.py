@@ -95,6 +95,7 @@ def main():
         '--hidden-import=bs4',
         '--hidden-import=selenium',
         '--hidden-import=sqlite3',
+        '--hidden-import=zstandard',  # Chapter/blob compression
         '--hidden-import=gdown',  # For auto-update from Google Drive
         '--hidden-import=packaging',  # For version comparison in auto-update
         '--hidden-import=requests',  # For downloading updates
@@ -31,6 +31,10 @@ DATA_DIR.mkdir(exist_ok=True)
 DATABASE_PATH = DATA_DIR / "database.db"
 PROJECTS_DIR = DATA_DIR / "projects"
 PROJECTS_DIR.mkdir(exist_ok=True)
+BLOBS_DIR = PROJECTS_DIR / "blobs"  # content-addressed chapter/output storage
+BLOBS_DIR.mkdir(exist_ok=True)
+HTTP_CACHE_DIR = DATA_DIR / "http_cache"  # scraped pages, revalidated with conditional GETs
+HTTP_CACHE_DIR.mkdir(exist_ok=True)
 
 # Claude API Settings
 DEFAULT_MODEL = "claude-opus-4-5-20250514"
@@ -47,6 +51,17 @@ FALLBACK_MODELS = [
 MAX_TOKENS = 8192
 TEMPERATURE = 0.7
 
+# Model pricing in USD per million tokens: (input, output)
+# Matched by longest model ID prefix. Cache writes cost 1.25x input,
+# cache reads 0.1x input, Batch API requests are billed at 50%.
+MODEL_PRICING = {
+    "claude-opus-4-5": (5.0, 25.0),
+    "claude-opus-4": (15.0, 75.0),
+    "claude-sonnet-4": (3.0, 15.0),
+    "claude-haiku-4-5": (1.0, 5.0),
+}
+DEFAULT_PRICING = (3.0, 15.0)
+
 # UI Settings
 WINDOW_MIN_WIDTH = 1200
 WINDOW_MIN_HEIGHT = 700
@@ -1,3 +1,9 @@
 from .db_manager import db, DatabaseManager
+from .settings_cache import settings_cache, SettingsCache
+from .maintenance import db_maintenance, DatabaseMaintenance
+from .executor import db_executor, DbExecutor, DbFuture
+from .snapshot import project_snapshots, ProjectSnapshot, ProjectSnapshotCache
 
-__all__ = ['db', 'DatabaseManager']
+__all__ = ['db', 'DatabaseManager', 'settings_cache', 'SettingsCache',
+           'db_maintenance', 'DatabaseMaintenance', 'db_executor', 'DbExecutor', 'DbFuture',
+           'project_snapshots', 'ProjectSnapshot', 'ProjectSnapshotCache']
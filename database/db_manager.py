@@ -5,19 +5,29 @@ SQLite database for projects, chats, and memory
 
 import sqlite3
 import json
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Tuple
 from contextlib import contextmanager
 
 from config import DATABASE_PATH
+from .text_codec import encode_text, decode_text, COMPRESS_MIN_BYTES
 
 
 class DatabaseManager:
     """Manages SQLite database for the application."""
     
+    WRITE_ACTIONS = (sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE)
+    UNTRANSLATED_NOTE = 'Chưa dịch'  # notes of a mined Han term whose standard is a placeholder
+    
     def __init__(self, db_path: Path = DATABASE_PATH):
         self.db_path = db_path
+        self._local = threading.local()  # shared connection of read_transaction()
+        self._versions_lock = threading.Lock()
+        self._table_versions: Dict[str, int] = {}
+        self._glossary_revision = 0  # bumped by every glossary mutator
+        self._glossary_prompts: Dict[Optional[int], tuple] = {}  # project_id -> (revision, text)
         self.init_database()
         self._migrate_database()  # Run migrations for existing databases
         self.init_default_templates()
@@ -26,8 +36,22 @@ class DatabaseManager:
     @contextmanager
     def get_connection(self):
         """Context manager for database connections."""
+        shared = getattr(self._local, 'conn', None)
+        if shared is not None:
+            # Inside read_transaction(): reuse its connection
+            yield shared
+            return
+        
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
+        written = set()
+        
+        def track_writes(action, table, *_):
+            if action in self.WRITE_ACTIONS and table:
+                written.add(table)
+            return sqlite3.SQLITE_OK
+        
+        conn.set_authorizer(track_writes)
         try:
             yield conn
             conn.commit()
@@ -36,6 +60,53 @@ class DatabaseManager:
             raise e
         finally:
             conn.close()
+        
+        if written:
+            self._bump_table_versions(written)
+    
+    @contextmanager
+    def read_transaction(self):
+        """
+        Run several reads in one transaction on one connection.
+
+        Every db.get_* call made on this thread inside the block sees the
+        same consistent snapshot of the database.
+        """
+        if getattr(self._local, 'conn', None) is not None:
+            yield
+            return
+        
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("BEGIN")
+            self._local.conn = conn
+            yield
+        finally:
+            self._local.conn = None
+            conn.rollback()
+            conn.close()
+    
+    def _bump_table_versions(self, tables: set):
+        """Record that tables changed in a committed transaction."""
+        with self._versions_lock:
+            for table in tables:
+                self._table_versions[table] = self._table_versions.get(table, 0) + 1
+    
+    def get_table_versions(self, tables: Iterable[str]) -> Dict[str, int]:
+        """Get change counters for tables (bumped on every committed write)."""
+        with self._versions_lock:
+            return {table: self._table_versions.get(table, 0) for table in tables}
+    
+    def _bump_glossary_revision(self):
+        """Record a committed glossary change (invalidates rendered prompts)."""
+        with self._versions_lock:
+            self._glossary_revision += 1
+    
+    def get_glossary_revision(self) -> int:
+        """Get the glossary revision (changes whenever any term or category changes)."""
+        with self._versions_lock:
+            return self._glossary_revision
     
     def _migrate_database(self):
         """Migrate database schema for existing databases."""
@@ -56,11 +127,81 @@ class DatabaseManager:
                 cursor.execute("ALTER TABLE projects ADD COLUMN extended_thinking INTEGER DEFAULT 1")
                 print("Added 'extended_thinking' column to projects table")
 
+            # Add compression flag to chat messages if missing
+            cursor.execute("PRAGMA table_info(chat_messages)")
+            message_columns = [row[1] for row in cursor.fetchall()]
+            if 'content_codec' not in message_columns:
+                cursor.execute("ALTER TABLE chat_messages ADD COLUMN content_codec TEXT DEFAULT ''")
+                print("Added 'content_codec' column to chat_messages table")
+
+            # Add cost column to daily usage stats if missing
+            cursor.execute("PRAGMA table_info(usage_stats)")
+            usage_columns = [row[1] for row in cursor.fetchall()]
+            if 'cost' not in usage_columns:
+                cursor.execute("ALTER TABLE usage_stats ADD COLUMN cost REAL DEFAULT 0")
+                print("Added 'cost' column to usage_stats table")
+
+            # Add the hash of the prompt that produced a chapter's output if missing
+            cursor.execute("PRAGMA table_info(chapters)")
+            chapter_columns = [row[1] for row in cursor.fetchall()]
+            if 'prompt_hash' not in chapter_columns:
+                cursor.execute("ALTER TABLE chapters ADD COLUMN prompt_hash TEXT")
+                print("Added 'prompt_hash' column to chapters table")
+
+            # Add batch usage flag if missing (results may be fetched many times)
+            cursor.execute("PRAGMA table_info(batch_jobs)")
+            batch_columns = [row[1] for row in cursor.fetchall()]
+            if 'usage_recorded' not in batch_columns:
+                cursor.execute("ALTER TABLE batch_jobs ADD COLUMN usage_recorded INTEGER DEFAULT 0")
+                print("Added 'usage_recorded' column to batch_jobs table")
+            
+            # Add the API key that submitted a batch if missing (its usage is charged to it)
+            if 'key_id' not in batch_columns:
+                cursor.execute("ALTER TABLE batch_jobs ADD COLUMN key_id INTEGER")
+                print("Added 'key_id' column to batch_jobs table")
+
+            # Seed monthly totals from legacy daily stats (no cost/breakdown available)
+            cursor.execute("SELECT COUNT(*) FROM usage_rollups")
+            if cursor.fetchone()[0] == 0:
+                cursor.execute(
+                    """INSERT INTO usage_rollups
+                       (period, dimension, dim_value, input_tokens, output_tokens, request_count)
+                       SELECT substr(date, 1, 7), 'total', '',
+                              SUM(input_tokens), SUM(output_tokens), SUM(request_count)
+                       FROM usage_stats GROUP BY substr(date, 1, 7)"""
+                )
+                if cursor.rowcount > 0:
+                    print(f"Seeded {cursor.rowcount} monthly usage rollups from usage_stats")
+
+            # Move batch history JSON blobs out of settings into batch_jobs
+            cursor.execute("SELECT key, value FROM settings WHERE key LIKE 'batch_history_%'")
+            for row in cursor.fetchall():
+                try:
+                    project_id = int(row['key'][len('batch_history_'):])
+                    history = json.loads(row['value'])
+                except (ValueError, TypeError):
+                    continue
+                cursor.executemany(
+                    """INSERT OR IGNORE INTO batch_jobs
+                       (id, project_id, status, file_count, output_dir, created_at, updated_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    [(item['id'], project_id, item.get('status'), item.get('file_count', 0),
+                      item.get('output_dir'), item.get('created_at'), item.get('created_at'))
+                     for item in history if item.get('id')]
+                )
+                cursor.execute("DELETE FROM settings WHERE key = ?", (row['key'],))
+                print(f"Migrated {len(history)} batch history entries for project {project_id}")
+
     def init_database(self):
         """Initialize database tables."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
+            # Only takes effect on a new database; existing ones are
+            # converted by the maintenance service (needs a VACUUM)
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            cursor.execute("PRAGMA journal_mode = WAL")
+            
             # Projects table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS projects (
@@ -108,6 +249,7 @@ class DatabaseManager:
                     session_id INTEGER NOT NULL,
                     role TEXT NOT NULL,
                     content TEXT NOT NULL,
+                    content_codec TEXT DEFAULT '',
                     attachments TEXT DEFAULT '[]',
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (session_id) REFERENCES chat_sessions(id) ON DELETE CASCADE
@@ -159,10 +301,52 @@ class DatabaseManager:
                     input_tokens INTEGER DEFAULT 0,
                     output_tokens INTEGER DEFAULT 0,
                     request_count INTEGER DEFAULT 0,
+                    cost REAL DEFAULT 0,
                     UNIQUE(date)
                 )
             """)
             
+            # Detailed usage ledger (one row per date/project/model/key/task)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS usage_ledger (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    date TEXT NOT NULL,
+                    project_id INTEGER NOT NULL DEFAULT 0,
+                    model TEXT NOT NULL DEFAULT '',
+                    key_id INTEGER NOT NULL DEFAULT 0,
+                    task_type TEXT NOT NULL DEFAULT 'chat',
+                    input_tokens INTEGER DEFAULT 0,
+                    output_tokens INTEGER DEFAULT 0,
+                    cache_creation_tokens INTEGER DEFAULT 0,
+                    cache_read_tokens INTEGER DEFAULT 0,
+                    thinking_tokens INTEGER DEFAULT 0,
+                    request_count INTEGER DEFAULT 0,
+                    cost REAL DEFAULT 0,
+                    UNIQUE(date, project_id, model, key_id, task_type)
+                )
+            """)
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_usage_ledger_project ON usage_ledger(project_id, date)"
+            )
+            
+            # Monthly rollups per dimension ('total', 'project', 'model', 'key', 'task'),
+            # updated incrementally together with the ledger
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS usage_rollups (
+                    period TEXT NOT NULL,
+                    dimension TEXT NOT NULL,
+                    dim_value TEXT NOT NULL DEFAULT '',
+                    input_tokens INTEGER DEFAULT 0,
+                    output_tokens INTEGER DEFAULT 0,
+                    cache_creation_tokens INTEGER DEFAULT 0,
+                    cache_read_tokens INTEGER DEFAULT 0,
+                    thinking_tokens INTEGER DEFAULT 0,
+                    request_count INTEGER DEFAULT 0,
+                    cost REAL DEFAULT 0,
+                    PRIMARY KEY (period, dimension, dim_value)
+                )
+            """)
+            
             # Templates table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS templates (
@@ -179,6 +363,68 @@ class DatabaseManager:
                 )
             """)
             
+            # Batch jobs table (one row per Message Batch)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS batch_jobs (
+                    id TEXT PRIMARY KEY,
+                    project_id INTEGER,
+                    source TEXT DEFAULT 'batch',
+                    status TEXT,
+                    file_count INTEGER DEFAULT 0,
+                    processing INTEGER DEFAULT 0,
+                    succeeded INTEGER DEFAULT 0,
+                    errored INTEGER DEFAULT 0,
+                    output_dir TEXT,
+                    usage_recorded INTEGER DEFAULT 0,
+                    key_id INTEGER,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    ended_at TIMESTAMP
+                )
+            """)
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_batch_jobs_project ON batch_jobs(project_id, created_at)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_batch_jobs_status ON batch_jobs(status)"
+            )
+            
+            # Batch requests table (one row per request inside a batch)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS batch_requests (
+                    batch_id TEXT NOT NULL,
+                    custom_id TEXT NOT NULL,
+                    status TEXT DEFAULT 'processing',
+                    source_path TEXT,
+                    output_path TEXT,
+                    error TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (batch_id, custom_id),
+                    FOREIGN KEY (batch_id) REFERENCES batch_jobs(id) ON DELETE CASCADE
+                )
+            """)
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_batch_requests_status ON batch_requests(batch_id, status)"
+            )
+            
+            # Chapters table (text lives in the blob store, keyed by SHA-256)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS chapters (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    project_id INTEGER NOT NULL,
+                    chapter_num INTEGER NOT NULL,
+                    title TEXT,
+                    source_url TEXT,
+                    raw_blob TEXT,
+                    processed_blob TEXT,
+                    prompt_hash TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(project_id, chapter_num),
+                    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
+                )
+            """)
+            
             # Glossary categories table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS glossary_categories (
@@ -205,6 +451,10 @@ class DatabaseManager:
                     FOREIGN KEY (category_id) REFERENCES glossary_categories(id) ON DELETE CASCADE
                 )
             """)
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_glossary_terms_category "
+                "ON glossary_terms(category_id, standard, id)"
+            )
     
     # ============== Projects ==============
     
@@ -259,6 +509,14 @@ class DatabaseManager:
         """Delete a project and all related data."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute("DELETE FROM chapters WHERE project_id = ?", (project_id,))
+            # foreign_keys is off, so ON DELETE CASCADE never fires for batch rows
+            cursor.execute(
+                """DELETE FROM batch_requests
+                   WHERE batch_id IN (SELECT id FROM batch_jobs WHERE project_id = ?)""",
+                (project_id,)
+            )
+            cursor.execute("DELETE FROM batch_jobs WHERE project_id = ?", (project_id,))
             cursor.execute("DELETE FROM projects WHERE id = ?", (project_id,))
             return cursor.rowcount > 0
     
@@ -356,14 +614,15 @@ class DatabaseManager:
     
     def add_message(self, session_id: int, role: str, content: str, 
                     attachments: List[str] = None) -> int:
-        """Add a message to a chat session."""
+        """Add a message to a chat session (large content is stored compressed)."""
         attachments = attachments or []
+        stored, codec = encode_text(content)
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                """INSERT INTO chat_messages (session_id, role, content, attachments)
-                   VALUES (?, ?, ?, ?)""",
-                (session_id, role, content, json.dumps(attachments))
+                """INSERT INTO chat_messages (session_id, role, content, content_codec, attachments)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (session_id, role, stored, codec, json.dumps(attachments))
             )
             # Update session's updated_at
             cursor.execute(
@@ -383,10 +642,54 @@ class DatabaseManager:
             messages = []
             for row in cursor.fetchall():
                 msg = dict(row)
+                try:
+                    msg['content'] = decode_text(msg['content'], msg.pop('content_codec', ''))
+                except Exception as e:
+                    print(f"Error decoding message {msg['id']}: {e}")
+                    msg['content'] = "[Không thể giải nén nội dung tin nhắn]"
                 msg['attachments'] = json.loads(msg['attachments'])
                 messages.append(msg)
             return messages
     
+    def compress_existing_messages(self, batch_size: int = 200) -> Dict[str, int]:
+        """
+        Compress stored plain-text messages above the size threshold.
+
+        Works in batches of batch_size rows, one transaction each, so it
+        can run in the background without holding the write lock long.
+
+        Returns:
+            {'rows': messages compressed, 'saved_bytes': bytes saved}
+        """
+        total = {'rows': 0, 'saved_bytes': 0}
+        last_id = 0
+        while True:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """SELECT id, content FROM chat_messages
+                       WHERE id > ? AND COALESCE(content_codec, '') = ''
+                         AND length(CAST(content AS BLOB)) >= ?
+                       ORDER BY id LIMIT ?""",
+                    (last_id, COMPRESS_MIN_BYTES, batch_size)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    return total
+                
+                updates = []
+                for row in rows:
+                    stored, codec = encode_text(row['content'])
+                    if codec:
+                        updates.append((stored, codec, row['id']))
+                        total['saved_bytes'] += len(row['content'].encode('utf-8')) - len(stored)
+                cursor.executemany(
+                    "UPDATE chat_messages SET content = ?, content_codec = ? WHERE id = ?",
+                    updates
+                )
+                total['rows'] += len(updates)
+                last_id = rows[-1]['id']
+    
     # ============== Memory ==============
     
     def set_memory(self, project_id: int, key: str, value: str, 
@@ -405,6 +708,44 @@ class DatabaseManager:
             )
             return cursor.lastrowid
     
+    def get_memory_keys(self, project_id: int) -> Dict[str, str]:
+        """Get a project's memory keys mapped to their category (oldest first)."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT key, category FROM project_memory WHERE project_id = ? ORDER BY id",
+                (project_id,)
+            )
+            return {row['key']: row['category'] for row in cursor.fetchall()}
+    
+    def set_memory_bulk(self, project_id: int, items: List[tuple]) -> int:
+        """
+        Upsert many memory items in one transaction.
+
+        Args:
+            project_id: Project ID
+            items: List of (key, value, category) tuples
+
+        Returns:
+            Number of rows added or changed (a repeated key counts once, last wins)
+        """
+        latest = {key: (value, category) for key, value, category in items}
+        if not latest:
+            return 0
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                """INSERT INTO project_memory (project_id, key, value, category)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT(project_id, key) DO UPDATE SET 
+                   value = excluded.value,
+                   category = excluded.category,
+                   updated_at = CURRENT_TIMESTAMP
+                   WHERE value IS NOT excluded.value OR category IS NOT excluded.category""",
+                [(project_id, key, value, category) for key, (value, category) in latest.items()]
+            )
+            return cursor.rowcount
+    
     def get_memory(self, project_id: int) -> List[Dict]:
         """Get all memory items for a project."""
         with self.get_connection() as conn:
@@ -519,6 +860,13 @@ class DatabaseManager:
             row = cursor.fetchone()
             return row['value'] if row else default
     
+    def get_all_settings(self) -> Dict[str, str]:
+        """Get all settings as a key -> value dict."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT key, value FROM settings")
+            return {row['key']: row['value'] for row in cursor.fetchall()}
+    
     def set_setting(self, key: str, value: str):
         """Set a setting value."""
         with self.get_connection() as conn:
@@ -546,6 +894,92 @@ class DatabaseManager:
                 (today, input_tokens, output_tokens)
             )
     
+    USAGE_FIELDS = ('input_tokens', 'output_tokens', 'cache_creation_tokens',
+                    'cache_read_tokens', 'thinking_tokens', 'request_count', 'cost')
+    
+    def flush_usage(self, entries: Dict[tuple, Dict[str, float]],
+                    key_last_used: Dict[int, str],
+                    batches: Dict[str, Dict[tuple, Dict[str, float]]] = None):
+        """
+        Write buffered usage accounting in a single transaction.
+
+        Args:
+            entries: {(date, project_id, model, key_id, task_type): counters}
+                     where counters holds every field in USAGE_FIELDS
+            key_last_used: {key_id: last_used ISO timestamp} for keys that
+                           completed a request (their error count is reset)
+            batches: {batch_id: entries} for fetched batch results; a batch
+                     is counted only if its batch_jobs row is not yet marked
+                     usage_recorded (the mark is set here)
+        """
+        fields = self.USAGE_FIELDS
+        increments = ", ".join(f"{f} = {{table}}.{f} + excluded.{f}" for f in fields)
+        placeholders = ", ".join("?" for _ in fields)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            if batches:
+                entries = {key: dict(counters) for key, counters in entries.items()}
+                for batch_id, batch_entries in batches.items():
+                    cursor.execute(
+                        "UPDATE batch_jobs SET usage_recorded = 1 WHERE id = ? AND usage_recorded = 0",
+                        (batch_id,)
+                    )
+                    if cursor.rowcount == 0 and cursor.execute(
+                            "SELECT 1 FROM batch_jobs WHERE id = ?", (batch_id,)).fetchone():
+                        continue  # already counted by an earlier fetch
+                    for key, counters in batch_entries.items():
+                        pending = entries.setdefault(key, dict.fromkeys(fields, 0))
+                        for field in fields:
+                            pending[field] += counters[field]
+            
+            daily: Dict[str, Dict[str, float]] = {}
+            rollups: Dict[tuple, Dict[str, float]] = {}
+            for (date, project_id, model, key_id, task_type), counters in entries.items():
+                day = daily.setdefault(date, dict.fromkeys(fields, 0))
+                period = date[:7]
+                for dimension, value in (('total', ''), ('project', str(project_id)),
+                                         ('model', model), ('key', str(key_id)),
+                                         ('task', task_type)):
+                    rollup = rollups.setdefault((period, dimension, value), dict.fromkeys(fields, 0))
+                    for field in fields:
+                        rollup[field] += counters[field]
+                for field in fields:
+                    day[field] += counters[field]
+            
+            cursor.executemany(
+                "UPDATE api_keys SET last_used = ?, error_count = 0 WHERE id = ?",
+                [(last_used, key_id) for key_id, last_used in key_last_used.items()]
+            )
+            cursor.executemany(
+                """INSERT INTO usage_stats (date, input_tokens, output_tokens, request_count, cost)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(date) DO UPDATE SET
+                   input_tokens = usage_stats.input_tokens + excluded.input_tokens,
+                   output_tokens = usage_stats.output_tokens + excluded.output_tokens,
+                   request_count = usage_stats.request_count + excluded.request_count,
+                   cost = usage_stats.cost + excluded.cost""",
+                [(date, c['input_tokens'], c['output_tokens'], c['request_count'], c['cost'])
+                 for date, c in daily.items()]
+            )
+            cursor.executemany(
+                f"""INSERT INTO usage_ledger
+                    (date, project_id, model, key_id, task_type, {', '.join(fields)})
+                    VALUES (?, ?, ?, ?, ?, {placeholders})
+                    ON CONFLICT(date, project_id, model, key_id, task_type) DO UPDATE SET
+                    {increments.format(table='usage_ledger')}""",
+                [(*key, *(c[f] for f in fields)) for key, c in entries.items()]
+            )
+            cursor.executemany(
+                f"""INSERT INTO usage_rollups
+                    (period, dimension, dim_value, {', '.join(fields)})
+                    VALUES (?, ?, ?, {placeholders})
+                    ON CONFLICT(period, dimension, dim_value) DO UPDATE SET
+                    {increments.format(table='usage_rollups')}""",
+                [(*key, *(c[f] for f in fields)) for key, c in rollups.items()]
+            )
+    
     def get_usage_today(self) -> Dict:
         """Get today's usage."""
         today = datetime.now().strftime("%Y-%m-%d")
@@ -558,7 +992,7 @@ class DatabaseManager:
             row = cursor.fetchone()
             if row:
                 return dict(row)
-            return {'input_tokens': 0, 'output_tokens': 0, 'request_count': 0}
+            return {'input_tokens': 0, 'output_tokens': 0, 'request_count': 0, 'cost': 0}
     
     def get_usage_week(self) -> Dict:
         """Get this week's usage."""
@@ -571,7 +1005,8 @@ class DatabaseManager:
             cursor.execute(
                 """SELECT SUM(input_tokens) as input_tokens, 
                           SUM(output_tokens) as output_tokens,
-                          SUM(request_count) as request_count
+                          SUM(request_count) as request_count,
+                          SUM(cost) as cost
                    FROM usage_stats WHERE date >= ?""",
                 (week_start,)
             )
@@ -580,31 +1015,75 @@ class DatabaseManager:
                 return {
                     'input_tokens': row['input_tokens'] or 0,
                     'output_tokens': row['output_tokens'] or 0,
-                    'request_count': row['request_count'] or 0
+                    'request_count': row['request_count'] or 0,
+                    'cost': row['cost'] or 0
                 }
-            return {'input_tokens': 0, 'output_tokens': 0, 'request_count': 0}
+            return {'input_tokens': 0, 'output_tokens': 0, 'request_count': 0, 'cost': 0}
     
     def get_usage_month(self) -> Dict:
-        """Get this month's usage."""
-        month_start = datetime.now().strftime("%Y-%m-01")
+        """Get this month's usage (read from the pre-aggregated rollup)."""
+        month = datetime.now().strftime("%Y-%m")
         
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                """SELECT SUM(input_tokens) as input_tokens, 
-                          SUM(output_tokens) as output_tokens,
-                          SUM(request_count) as request_count
-                   FROM usage_stats WHERE date >= ?""",
-                (month_start,)
+                """SELECT * FROM usage_rollups
+                   WHERE period = ? AND dimension = 'total' AND dim_value = ''""",
+                (month,)
             )
             row = cursor.fetchone()
-            if row and row['input_tokens']:
-                return {
-                    'input_tokens': row['input_tokens'] or 0,
-                    'output_tokens': row['output_tokens'] or 0,
-                    'request_count': row['request_count'] or 0
-                }
-            return {'input_tokens': 0, 'output_tokens': 0, 'request_count': 0}
+            if row:
+                return dict(row)
+            return {'input_tokens': 0, 'output_tokens': 0, 'request_count': 0, 'cost': 0}
+    
+    def get_usage_rollup(self, dimension: str, period: str = None) -> List[Dict]:
+        """
+        Get a month's usage broken down by one dimension, highest cost first.
+
+        Args:
+            dimension: 'project', 'model', 'key' or 'task'
+            period: Month as YYYY-MM (defaults to the current month)
+
+        Returns:
+            Rollup rows; 'label' holds the project/key name where applicable
+        """
+        period = period or datetime.now().strftime("%Y-%m")
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT r.*,
+                          CASE r.dimension
+                              WHEN 'project' THEN p.name
+                              WHEN 'key' THEN k.name
+                              ELSE r.dim_value
+                          END as label
+                   FROM usage_rollups r
+                   LEFT JOIN projects p
+                       ON r.dimension = 'project' AND p.id = CAST(r.dim_value AS INTEGER)
+                   LEFT JOIN api_keys k
+                       ON r.dimension = 'key' AND k.id = CAST(r.dim_value AS INTEGER)
+                   WHERE r.period = ? AND r.dimension = ?
+                   ORDER BY r.cost DESC, r.output_tokens DESC""",
+                (period, dimension)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_project_usage(self, project_id: int, period: str = None) -> Dict:
+        """Get a project's usage for a month (defaults to the current month)."""
+        period = period or datetime.now().strftime("%Y-%m")
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT * FROM usage_rollups
+                   WHERE period = ? AND dimension = 'project' AND dim_value = ?""",
+                (period, str(project_id))
+            )
+            row = cursor.fetchone()
+            if row:
+                return dict(row)
+            return {field: 0 for field in self.USAGE_FIELDS}
     
     def get_api_status(self) -> Dict:
         """Get overall API status."""
@@ -622,6 +1101,235 @@ class DatabaseManager:
             'status': 'ok' if active_keys else ('warning' if keys else 'none')
         }
     
+    # ============== Batch Jobs ==============
+    
+    def create_batch_job(self, batch_id: str, project_id: int, status: str,
+                         requests: List[Dict], output_dir: str = None,
+                         source: str = 'batch', key_id: int = None) -> str:
+        """
+        Record a newly created batch and its requests.
+
+        Args:
+            batch_id: Anthropic batch ID
+            project_id: Project the batch belongs to
+            status: Initial processing status
+            requests: List of dicts with 'custom_id' and optional 'source_path'
+            output_dir: Directory results will be written to
+            source: Pipeline that created the batch ('batch', 'link_to_text', ...)
+            key_id: API key the batch was submitted with
+        """
+        now = datetime.now().isoformat()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """INSERT OR REPLACE INTO batch_jobs
+                   (id, project_id, source, status, file_count, processing,
+                    output_dir, key_id, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (batch_id, project_id, source, status, len(requests), len(requests),
+                 output_dir, key_id, now, now)
+            )
+            cursor.executemany(
+                """INSERT OR REPLACE INTO batch_requests (batch_id, custom_id, source_path)
+                   VALUES (?, ?, ?)""",
+                [(batch_id, r['custom_id'], r.get('source_path')) for r in requests]
+            )
+            return batch_id
+    
+    def update_batch_job(self, batch_id: str, **kwargs) -> bool:
+        """Update status/count fields of a batch job (single-row write)."""
+        allowed = ['status', 'processing', 'succeeded', 'errored', 'output_dir', 'ended_at']
+        updates = {k: v for k, v in kwargs.items() if k in allowed}
+        
+        if not updates:
+            return False
+        
+        updates['updated_at'] = datetime.now().isoformat()
+        set_clause = ', '.join(f"{k} = ?" for k in updates.keys())
+        values = list(updates.values()) + [batch_id]
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"UPDATE batch_jobs SET {set_clause} WHERE id = ?", values)
+            return cursor.rowcount > 0
+    
+    def get_batch_job(self, batch_id: str) -> Optional[Dict]:
+        """Get a batch job by ID."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM batch_jobs WHERE id = ?", (batch_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def is_batch_usage_recorded(self, batch_id: str) -> bool:
+        """Check if a batch's usage has already been added to the usage ledger."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT usage_recorded FROM batch_jobs WHERE id = ?", (batch_id,))
+            row = cursor.fetchone()
+            return bool(row and row['usage_recorded'])
+    
+    def get_batch_jobs(self, project_id: int, limit: int = 20,
+                       source: str = None) -> List[Dict]:
+        """Get the most recent batch jobs for a project, newest first."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if source:
+                cursor.execute(
+                    """SELECT * FROM batch_jobs
+                       WHERE project_id = ? AND source = ?
+                       ORDER BY created_at DESC LIMIT ?""",
+                    (project_id, source, limit)
+                )
+            else:
+                cursor.execute(
+                    """SELECT * FROM batch_jobs
+                       WHERE project_id = ?
+                       ORDER BY created_at DESC LIMIT ?""",
+                    (project_id, limit)
+                )
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_batch_jobs_by_status(self, statuses: List[str],
+                                 source: str = None) -> List[Dict]:
+        """Get batch jobs in any of the given statuses (e.g. still in progress)."""
+        placeholders = ', '.join('?' for _ in statuses)
+        query = f"SELECT * FROM batch_jobs WHERE status IN ({placeholders})"
+        params = list(statuses)
+        if source:
+            query += " AND source = ?"
+            params.append(source)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query + " ORDER BY created_at ASC", params)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def update_batch_requests(self, batch_id: str, results: List[Dict]):
+        """
+        Update per-request rows from batch results.
+
+        Args:
+            batch_id: Batch ID
+            results: List of dicts with 'custom_id', 'status' and optional
+                     'output_path' / 'error'
+        """
+        now = datetime.now().isoformat()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                """UPDATE batch_requests
+                   SET status = ?, output_path = COALESCE(?, output_path),
+                       error = ?, updated_at = ?
+                   WHERE batch_id = ? AND custom_id = ?""",
+                [(r['status'], r.get('output_path'), r.get('error'), now,
+                  batch_id, r['custom_id']) for r in results]
+            )
+    
+    def get_batch_requests(self, batch_id: str, status: str = None) -> List[Dict]:
+        """Get the requests of a batch, optionally filtered by status."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if status:
+                cursor.execute(
+                    """SELECT * FROM batch_requests
+                       WHERE batch_id = ? AND status = ?
+                       ORDER BY custom_id""",
+                    (batch_id, status)
+                )
+            else:
+                cursor.execute(
+                    "SELECT * FROM batch_requests WHERE batch_id = ? ORDER BY custom_id",
+                    (batch_id,)
+                )
+            return [dict(row) for row in cursor.fetchall()]
+    
+    # ============== Chapters ==============
+    
+    def upsert_chapter(self, project_id: int, chapter_num: int, title: str,
+                       raw_blob: str, source_url: str = None):
+        """
+        Store a scraped chapter.
+
+        The processed blob (and its prompt hash) is cleared when the raw
+        content changes, so a stale Claude output is never reused for new
+        source text.
+        """
+        now = datetime.now().isoformat()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """INSERT INTO chapters
+                   (project_id, chapter_num, title, source_url, raw_blob, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(project_id, chapter_num) DO UPDATE SET
+                       title = excluded.title,
+                       source_url = excluded.source_url,
+                       processed_blob = CASE WHEN chapters.raw_blob = excluded.raw_blob
+                                             THEN chapters.processed_blob END,
+                       prompt_hash = CASE WHEN chapters.raw_blob = excluded.raw_blob
+                                          THEN chapters.prompt_hash END,
+                       raw_blob = excluded.raw_blob,
+                       updated_at = excluded.updated_at""",
+                (project_id, chapter_num, title, source_url, raw_blob, now, now)
+            )
+    
+    def set_chapter_processed(self, project_id: int, chapter_num: int, processed_blob: str,
+                              prompt_hash: str = None):
+        """
+        Attach a Claude output blob to a chapter.
+
+        Args:
+            prompt_hash: Hash of the system prompt and model that produced
+                         the output (it is only reused for the same hash)
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """UPDATE chapters SET processed_blob = ?, prompt_hash = ?, updated_at = ?
+                   WHERE project_id = ? AND chapter_num = ?""",
+                (processed_blob, prompt_hash, datetime.now().isoformat(), project_id, chapter_num)
+            )
+    
+    def get_chapter(self, project_id: int, chapter_num: int) -> Optional[Dict]:
+        """Get a chapter by number."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT * FROM chapters WHERE project_id = ? AND chapter_num = ?",
+                (project_id, chapter_num)
+            )
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def get_chapters(self, project_id: int, from_chapter: int = None,
+                     to_chapter: int = None) -> List[Dict]:
+        """Get a project's chapters in order, optionally limited to a range."""
+        query = "SELECT * FROM chapters WHERE project_id = ?"
+        params = [project_id]
+        if from_chapter is not None:
+            query += " AND chapter_num >= ?"
+            params.append(from_chapter)
+        if to_chapter is not None:
+            query += " AND chapter_num <= ?"
+            params.append(to_chapter)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query + " ORDER BY chapter_num", params)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_referenced_blobs(self) -> set:
+        """Get every blob digest referenced by a chapter."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT raw_blob FROM chapters WHERE raw_blob IS NOT NULL
+                   UNION
+                   SELECT processed_blob FROM chapters WHERE processed_blob IS NOT NULL"""
+            )
+            return {row[0] for row in cursor.fetchall()}
+    
     # ============== Templates ==============
     
     def get_templates(self, project_id: int = None) -> List[Dict]:
@@ -783,7 +1491,9 @@ Chỉnh sửa văn bản dịch thành văn nói tự nhiên, phù hợp cho aud
                    VALUES (?, ?, ?, ?)""",
                 (project_id, name, icon, int(is_global))
             )
-            return cursor.lastrowid
+            category_id = cursor.lastrowid
+        self._bump_glossary_revision()
+        return category_id
     
     def update_glossary_category(self, category_id: int, **kwargs):
         """Update a glossary category."""
@@ -799,6 +1509,7 @@ Chỉnh sửa văn bản dịch thành văn nói tự nhiên, phù hợp cho aud
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"UPDATE glossary_categories SET {set_clause} WHERE id = ?", values)
+        self._bump_glossary_revision()
     
     def delete_glossary_category(self, category_id: int):
         """Delete a glossary category and its terms."""
@@ -806,6 +1517,7 @@ Chỉnh sửa văn bản dịch thành văn nói tự nhiên, phù hợp cho aud
             cursor = conn.cursor()
             cursor.execute("DELETE FROM glossary_terms WHERE category_id = ?", (category_id,))
             cursor.execute("DELETE FROM glossary_categories WHERE id = ?", (category_id,))
+        self._bump_glossary_revision()
     
     def init_default_categories(self):
         """Initialize default glossary categories if not exist."""
@@ -830,6 +1542,9 @@ Chỉnh sửa văn bản dịch thành văn nói tự nhiên, phù hợp cho aud
                            VALUES (?, ?, 1, ?)""",
                         (name, icon, i)
                     )
+        
+        if count == 0:
+            self._bump_glossary_revision()
     
     # ============== Glossary Terms ==============
     
@@ -845,6 +1560,38 @@ Chỉnh sửa văn bản dịch thành văn nói tự nhiên, phù hợp cho aud
             )
             return [dict(row) for row in cursor.fetchall()]
     
+    def get_glossary_terms_page(self, category_id: int, after: Tuple[str, int] = None,
+                                limit: int = 500) -> List[Dict]:
+        """
+        Get one page of a category's terms, ordered by (standard, id).
+        
+        Args:
+            after: (standard, id) of the last term of the previous page
+            limit: Page size
+        """
+        query = "SELECT * FROM glossary_terms WHERE category_id = ?"
+        params: list = [category_id]
+        if after is not None:
+            query += " AND (standard, id) > (?, ?)"
+            params.extend(after)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query + " ORDER BY standard, id LIMIT ?", params + [limit])
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def count_glossary_terms(self, project_id: int = None) -> int:
+        """Count the terms of a project (includes global)."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT COUNT(*) FROM glossary_terms t
+                   JOIN glossary_categories c ON t.category_id = c.id
+                   WHERE c.project_id = ? OR c.is_global = 1""",
+                (project_id or -1,)
+            )
+            return cursor.fetchone()[0]
+    
     def get_all_glossary_terms(self, project_id: int = None) -> List[Dict]:
         """Get all terms for a project (includes global)."""
         with self.get_connection() as conn:
@@ -878,7 +1625,9 @@ Chỉnh sửa văn bản dịch thành văn nói tự nhiên, phù hợp cho aud
                    VALUES (?, ?, ?, ?, ?)""",
                 (category_id, original, standard, variants, notes)
             )
-            return cursor.lastrowid
+            term_id = cursor.lastrowid
+        self._bump_glossary_revision()
+        return term_id
     
     def update_glossary_term(self, term_id: int, **kwargs):
         """Update a glossary term."""
@@ -896,23 +1645,171 @@ Chỉnh sửa văn bản dịch thành văn nói tự nhiên, phù hợp cho aud
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"UPDATE glossary_terms SET {set_clause} WHERE id = ?", values)
+        self._bump_glossary_revision()
     
     def delete_glossary_term(self, term_id: int):
         """Delete a glossary term."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM glossary_terms WHERE id = ?", (term_id,))
+        self._bump_glossary_revision()
+    
+    def iter_glossary_terms(self, project_id: int = None,
+                            batch_size: int = 1000) -> Iterator[Dict]:
+        """
+        Stream all terms for a project (includes global) with one query.
+
+        Same rows and order as get_all_glossary_terms(), fetched in batches
+        so large glossaries are never held in memory at once.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT t.*, c.name as category_name, c.icon as category_icon
+                   FROM glossary_terms t
+                   JOIN glossary_categories c ON t.category_id = c.id
+                   WHERE c.is_global = 1 OR (? IS NOT NULL AND c.project_id = ?)
+                   ORDER BY c.sort_order, c.id, t.standard""",
+                (project_id, project_id)
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+    
+    def upsert_glossary_terms(self, project_id: int, rows: List[Dict]) -> Dict[str, int]:
+        """
+        Insert or update many terms in one transaction.
+
+        Terms are deduplicated by (category, standard): an existing term
+        gets the non-empty original/variants/notes of the row, otherwise
+        a new term is added. Categories are matched by name among the
+        project's and global categories; missing ones are created for
+        the project.
+
+        Args:
+            project_id: Project to import into (None = global)
+            rows: Dicts with 'category', 'standard' and optional 'icon',
+                  'original', 'variants', 'notes'
+
+        Returns:
+            {'inserted': n, 'updated': n, 'skipped': n}
+        """
+        counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
+        if not rows:
+            return counts
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if project_id:
+                cursor.execute(
+                    """SELECT id, name FROM glossary_categories
+                       WHERE project_id = ? OR is_global = 1
+                       ORDER BY is_global ASC, id ASC""",
+                    (project_id,)
+                )
+            else:
+                cursor.execute("SELECT id, name FROM glossary_categories WHERE is_global = 1")
+            categories = {}
+            for row in cursor.fetchall():
+                categories.setdefault(row['name'], row['id'])  # project category wins
+            
+            # Group rows by category, last row wins for a repeated standard
+            by_category: Dict[int, Dict[str, Dict]] = {}
+            for row in rows:
+                standard = (row.get('standard') or '').strip()
+                name = (row.get('category') or '').strip()
+                if not standard or not name:
+                    counts['skipped'] += 1
+                    continue
+                if name not in categories:
+                    cursor.execute(
+                        """INSERT INTO glossary_categories (project_id, name, icon, is_global)
+                           VALUES (?, ?, ?, ?)""",
+                        (project_id, name, row.get('icon') or '📂', 0 if project_id else 1)
+                    )
+                    categories[name] = cursor.lastrowid
+                by_category.setdefault(categories[name], {})[standard] = row
+            
+            now = datetime.now().isoformat()
+            inserts, updates = [], []
+            for category_id, terms in by_category.items():
+                standards = list(terms)
+                existing = {}
+                # Stay under SQLite's bound-parameter limit
+                for i in range(0, len(standards), 500):
+                    chunk = standards[i:i + 500]
+                    placeholders = ', '.join('?' for _ in chunk)
+                    cursor.execute(
+                        f"""SELECT id, standard FROM glossary_terms
+                            WHERE category_id = ? AND standard IN ({placeholders})""",
+                        [category_id] + chunk
+                    )
+                    for row in cursor.fetchall():
+                        existing.setdefault(row['standard'], row['id'])
+                
+                for standard, row in terms.items():
+                    values = tuple((row.get(f) or '').strip() or None
+                                   for f in ('original', 'variants', 'notes'))
+                    if standard in existing:
+                        updates.append(values + (now, existing[standard]))
+                    else:
+                        inserts.append((category_id, standard) + values)
+            
+            cursor.executemany(
+                """UPDATE glossary_terms SET original = COALESCE(?, original),
+                       variants = COALESCE(?, variants), notes = COALESCE(?, notes),
+                       updated_at = ?
+                   WHERE id = ?""",
+                updates
+            )
+            cursor.executemany(
+                """INSERT INTO glossary_terms (category_id, standard, original, variants, notes)
+                   VALUES (?, ?, ?, ?, ?)""",
+                inserts
+            )
+            counts['inserted'] = len(inserts)
+            counts['updated'] = len(updates)
+            counts['skipped'] += len(rows) - counts['skipped'] - len(inserts) - len(updates)
+        
+        self._bump_glossary_revision()
+        return counts
     
     def get_glossary_for_prompt(self, project_id: int = None) -> str:
-        """Get formatted glossary for prompt insertion."""
+        """
+        Get formatted glossary for prompt insertion.
+        
+        The rendered text is cached per project until the glossary revision
+        changes, so repeated calls do no query and return identical text.
+        """
+        # Read the revision first so a concurrent edit leaves the entry stale
+        revision = self.get_glossary_revision()
+        cached = self._glossary_prompts.get(project_id)
+        if cached and cached[0] == revision:
+            return cached[1]
+        
         terms = self.get_all_glossary_terms(project_id)
+        text = self.format_glossary_for_prompt(terms) or "(Chưa có thuật ngữ nào được định nghĩa)"
         
-        if not terms:
-            return "(Chưa có thuật ngữ nào được định nghĩa)"
+        self._glossary_prompts[project_id] = (revision, text)
+        return text
+    
+    @staticmethod
+    def format_glossary_for_prompt(terms: List[Dict]) -> str:
+        """
+        Format glossary terms (from get_all_glossary_terms) grouped by category.
         
+        Mined terms not translated yet are left out: their standard is the
+        Han text itself, which would tell Claude to keep it untranslated.
+        """
         # Group by category
         categories = {}
         for term in terms:
+            if (term['notes'] == DatabaseManager.UNTRANSLATED_NOTE
+                    and term['standard'] == term['original']):
+                continue
             cat_name = term['category_name']
             if cat_name not in categories:
                 categories[cat_name] = []
@@ -931,6 +1828,89 @@ Chỉnh sửa văn bản dịch thành văn nói tự nhiên, phù hợp cho aud
                 lines.append(line)
         
         return '\n'.join(lines)
+    
+    # ============== Maintenance ==============
+    
+    def get_database_size(self) -> Dict[str, int]:
+        """Get database file size and reclaimable (free) space in bytes."""
+        with self.get_connection() as conn:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            return {
+                'size_bytes': page_size * page_count,
+                'free_bytes': page_size * freelist,
+            }
+    
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        Switch the database to auto_vacuum=INCREMENTAL.
+
+        Requires a full VACUUM on an existing database, so it only runs
+        when the mode is not already set. Returns True if it converted.
+        """
+        with self.get_connection() as conn:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                return False
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.commit()
+            conn.execute("VACUUM")
+            return True
+    
+    def incremental_vacuum(self, pages: int = 0):
+        """Release free pages back to the OS (0 = all of them)."""
+        with self.get_connection() as conn:
+            if pages:
+                conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+            else:
+                conn.execute("PRAGMA incremental_vacuum").fetchall()
+    
+    def optimize(self, analyze: bool = False):
+        """Refresh query planner statistics."""
+        with self.get_connection() as conn:
+            if analyze:
+                conn.execute("ANALYZE")
+            conn.execute("PRAGMA optimize")
+    
+    def checkpoint_wal(self) -> Optional[tuple]:
+        """Checkpoint the WAL into the main file and truncate it."""
+        with self.get_connection() as conn:
+            row = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            return tuple(row) if row else None
+    
+    def get_table_sizes(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get per-table row counts and on-disk size.
+
+        Sizes come from the dbstat virtual table (indexes counted with
+        their table); when SQLite is built without it only rows are set.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT name FROM sqlite_master
+                   WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"""
+            )
+            tables = [row['name'] for row in cursor.fetchall()]
+            
+            report = {}
+            for table in tables:
+                cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+                report[table] = {'rows': cursor.fetchone()[0], 'bytes': 0}
+            
+            try:
+                cursor.execute(
+                    """SELECT COALESCE(m.tbl_name, s.name) AS tbl, SUM(s.pgsize) AS size
+                       FROM dbstat s LEFT JOIN sqlite_master m ON m.name = s.name
+                       GROUP BY tbl"""
+                )
+                for row in cursor.fetchall():
+                    if row['tbl'] in report:
+                        report[row['tbl']]['bytes'] = row['size'] or 0
+            except sqlite3.OperationalError:
+                pass  # dbstat not available
+            
+            return report
 
 
 # Singleton instance
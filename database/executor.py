@@ -0,0 +1,128 @@
+"""
+AnhMin Audio - Database Executor
+Run database calls off the UI thread with a single-writer queue
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, Set
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+class DbFuture(QObject):
+    """
+    Handle to a queued database call.
+
+    succeeded/failed are emitted from the executor thread and delivered
+    to slots on their own thread. Cancelling suppresses both signals.
+    """
+
+    succeeded = pyqtSignal(object)  # return value of the call
+    failed = pyqtSignal(str)  # error message
+
+    def __init__(self):
+        super().__init__()
+        self._future: Optional[Future] = None
+        self._cancelled = False
+        self._release: Optional[Callable] = None
+
+    def cancel(self):
+        """Drop the call (or its result if it already ran)."""
+        self._cancelled = True
+        if self._future:
+            self._future.cancel()
+        if self._release:
+            self._release()
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled
+
+    def result(self, timeout: float = None):
+        """Block until the call finishes and return its value (raises on error)."""
+        return self._future.result(timeout)
+
+
+class DbExecutor:
+    """
+    Run db.* calls on background threads.
+
+    Reads run on a reader thread; writes are serialized on a single
+    writer thread. A read waits for every write queued before it, so
+    callers always see their own changes. Callbacks passed to read() or
+    write() must be connected from the main thread.
+    """
+
+    def __init__(self):
+        self._reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-read')
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-write')
+        self._lock = threading.Lock()
+        self._last_write: Optional[Future] = None
+        self._pending: Set[DbFuture] = set()  # keeps handles alive until delivered
+
+    def read(self, fn: Callable, *args, callback: Callable = None,
+             error_callback: Callable = None, **kwargs) -> DbFuture:
+        """
+        Queue a read-only call.
+
+        Args:
+            fn: Function to call (usually a db method)
+            callback: Called with the result on the main thread
+            error_callback: Called with the error message on the main thread
+        """
+        with self._lock:
+            barrier = self._last_write
+        return self._submit(self._reader, barrier, fn, args, kwargs, callback, error_callback)
+
+    def write(self, fn: Callable, *args, callback: Callable = None,
+              error_callback: Callable = None, **kwargs) -> DbFuture:
+        """Queue a mutation on the single writer thread (same arguments as read())."""
+        with self._lock:
+            handle = self._submit(self._writer, None, fn, args, kwargs, callback, error_callback)
+            self._last_write = handle._future
+        return handle
+
+    def _submit(self, pool: ThreadPoolExecutor, barrier: Optional[Future], fn: Callable,
+                args: tuple, kwargs: dict, callback: Callable,
+                error_callback: Callable) -> DbFuture:
+        handle = DbFuture()
+
+        if callback or error_callback:
+            self._pending.add(handle)
+            handle._release = lambda *_: self._pending.discard(handle)
+            if callback:
+                handle.succeeded.connect(callback)
+            if error_callback:
+                handle.failed.connect(error_callback)
+            handle.succeeded.connect(handle._release)
+            handle.failed.connect(handle._release)
+
+        def task():
+            if barrier is not None:
+                try:
+                    barrier.result()
+                except Exception:
+                    pass  # the write reported its own error
+            if handle.is_cancelled():
+                return None
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                print(f"Database error in {getattr(fn, '__name__', fn)}: {e}")
+                if not handle.is_cancelled():
+                    handle.failed.emit(str(e))
+                raise
+            if not handle.is_cancelled():
+                handle.succeeded.emit(result)
+            return result
+
+        handle._future = pool.submit(task)
+        return handle
+
+    def shutdown(self, wait: bool = True):
+        """Finish queued writes and stop the threads."""
+        self._writer.shutdown(wait=wait)
+        self._reader.shutdown(wait=wait)
+
+
+# Singleton instance
+db_executor = DbExecutor()
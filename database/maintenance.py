@@ -0,0 +1,153 @@
+"""
+AnhMin Audio - Database Maintenance
+Periodic vacuum, planner statistics, WAL checkpoint and size report
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+from PyQt6.QtCore import QObject, QEvent, pyqtSignal, QTimer
+from PyQt6.QtWidgets import QApplication
+
+from .db_manager import db
+from .executor import db_executor
+from .settings_cache import settings_cache
+
+
+class DatabaseMaintenance(QObject):
+    """
+    Keep the database file compact and the query planner informed.
+
+    A full pass (incremental vacuum conversion, compression of old chat
+    messages, removal of unreferenced chapter blobs, ANALYZE, optimize,
+    WAL checkpoint, size report) runs at
+    most once per MIN_INTERVAL, and only while the app is idle: no
+    keyboard or mouse input for IDLE_MS and no background job running
+    (the is_busy check passed to start()). It is queued on the
+    db_executor writer, so it never competes with other queued writes.
+    A quick pass (free pages, optimize, checkpoint) runs on close. The
+    last report is stored in the 'db_maintenance_report' setting.
+    """
+
+    finished = pyqtSignal(dict)  # maintenance report
+
+    IDLE_MS = 5 * 60 * 1000
+    CHECK_INTERVAL_MS = 60 * 1000
+    MIN_INTERVAL = timedelta(days=1)
+    REPORT_KEY = 'db_maintenance_report'
+    INPUT_EVENTS = (QEvent.Type.KeyPress, QEvent.Type.MouseButtonPress, QEvent.Type.Wheel)
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._timer: Optional[QTimer] = None
+        self._is_busy: Optional[Callable[[], bool]] = None
+        self._last_input = time.monotonic()
+        self._queued = False
+
+    def start(self, is_busy: Callable[[], bool] = None):
+        """
+        Start watching for idle time (call from the main thread).
+
+        Args:
+            is_busy: Returns True while a background job is running
+        """
+        self._is_busy = is_busy
+        self._last_input = time.monotonic()
+        if self._timer is None:
+            self._timer = QTimer(self)
+            self._timer.timeout.connect(self.check_idle)
+            app = QApplication.instance()
+            if app:
+                app.installEventFilter(self)
+        self._timer.start(self.CHECK_INTERVAL_MS)
+
+    def stop(self):
+        """Stop watching and run the quick close-time pass after queued writes."""
+        if self._timer:
+            self._timer.stop()
+        try:
+            db_executor.write(self.run, full=False).result()
+        except Exception as e:
+            print(f"Database maintenance error: {e}")
+
+    def eventFilter(self, obj, event) -> bool:
+        """Record the time of the last user input."""
+        if event.type() in self.INPUT_EVENTS:
+            self._last_input = time.monotonic()
+        return False
+
+    def is_idle(self) -> bool:
+        """Check if there was no user input for IDLE_MS and no job is running."""
+        if (time.monotonic() - self._last_input) * 1000 < self.IDLE_MS:
+            return False
+        return not (self._is_busy and self._is_busy())
+
+    def is_due(self) -> bool:
+        """Check if a full pass has not run within MIN_INTERVAL."""
+        report = settings_cache.get_json(self.REPORT_KEY, {})
+        try:
+            last_run = datetime.fromisoformat(report['ran_at'])
+        except (KeyError, TypeError, ValueError):
+            return True
+        return datetime.now() - last_run >= self.MIN_INTERVAL
+
+    def check_idle(self):
+        """Queue a full pass on the db writer if one is due and the app is idle."""
+        if self._queued or not self.is_due() or not self.is_idle():
+            return
+        self._queued = True
+        db_executor.write(self.run, callback=self._on_done, error_callback=self._on_done)
+
+    def _on_done(self, _):
+        self._queued = False
+
+    def run(self, full: bool = True) -> Dict:
+        """
+        Run a maintenance pass.
+
+        Args:
+            full: Also convert to incremental vacuum, ANALYZE and record
+                  the per-table size report
+
+        Returns:
+            Report dict (empty if another pass is already running)
+        """
+        if not self._lock.acquire(blocking=False):
+            return {}
+
+        try:
+            before = db.get_database_size()
+            report = {'ran_at': datetime.now().isoformat()}
+
+            if full:
+                report['converted'] = db.enable_incremental_vacuum()
+                # Compress chat history written before compression existed
+                report['compressed'] = db.compress_existing_messages()
+                # Drop chapter text no chapter refers to any more
+                from api.blob_store import blob_store
+                report['blobs_removed'] = blob_store.collect_garbage(db.get_referenced_blobs())
+            db.incremental_vacuum()
+            db.optimize(analyze=full)
+            db.checkpoint_wal()
+
+            after = db.get_database_size()
+            report['size_bytes'] = after['size_bytes']
+            report['freed_bytes'] = max(0, before['size_bytes'] - after['size_bytes'])
+
+            if full:
+                report['tables'] = db.get_table_sizes()
+                settings_cache.set(self.REPORT_KEY, report)
+                self.finished.emit(report)
+
+            return report
+        except Exception as e:
+            print(f"Database maintenance error: {e}")
+            return {}
+        finally:
+            self._lock.release()
+
+
+# Singleton instance
+db_maintenance = DatabaseMaintenance()
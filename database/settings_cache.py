@@ -0,0 +1,96 @@
+"""
+AnhMin Audio - Settings Cache
+In-process cache of the settings table with change notifications
+"""
+
+import json
+import threading
+from typing import Any, Dict, Optional
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from .db_manager import db
+
+
+class SettingsCache(QObject):
+    """
+    Read-through cache for the settings table.
+
+    All rows are loaded on first access; set() writes through to the
+    database and emits setting_changed(key, value) so widgets can react
+    without polling. Values are stored as strings like the table itself,
+    with typed accessors for the common int/bool/json cases.
+    """
+
+    setting_changed = pyqtSignal(str, str)  # key, new value
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._values: Optional[Dict[str, str]] = None
+
+    def _ensure_loaded(self) -> Dict[str, str]:
+        """Load all settings on first use (lock must be held)."""
+        if self._values is None:
+            self._values = db.get_all_settings()
+        return self._values
+
+    def reload(self):
+        """Drop the cache so the next read reloads it from the database."""
+        with self._lock:
+            self._values = None
+
+    def get(self, key: str, default: str = None) -> Optional[str]:
+        """Get a setting value."""
+        with self._lock:
+            return self._ensure_loaded().get(key, default)
+
+    def get_int(self, key: str, default: int = 0) -> int:
+        """Get a setting as int, falling back to default if unset or invalid."""
+        value = self.get(key)
+        try:
+            return int(value) if value is not None else default
+        except ValueError:
+            return default
+
+    def get_bool(self, key: str, default: bool = False) -> bool:
+        """Get a setting stored as 'true'/'false'."""
+        value = self.get(key)
+        return value == 'true' if value is not None else default
+
+    def get_json(self, key: str, default: Any = None) -> Any:
+        """Get a JSON-encoded setting."""
+        value = self.get(key)
+        if value is None:
+            return default
+        try:
+            return json.loads(value)
+        except (ValueError, TypeError):
+            return default
+
+    def set(self, key: str, value: Any):
+        """
+        Set a setting, writing through to the database.
+
+        bool values are stored as 'true'/'false', dict/list as JSON and
+        everything else via str(). Nothing is written or emitted when
+        the value is unchanged.
+        """
+        if isinstance(value, bool):
+            value = 'true' if value else 'false'
+        elif isinstance(value, (dict, list)):
+            value = json.dumps(value, ensure_ascii=False)
+        elif value is not None:
+            value = str(value)
+
+        with self._lock:
+            values = self._ensure_loaded()
+            if key in values and values[key] == value:
+                return
+            db.set_setting(key, value)
+            values[key] = value
+
+        self.setting_changed.emit(key, value if value is not None else '')
+
+
+# Singleton instance
+settings_cache = SettingsCache()
@@ -0,0 +1,163 @@
+"""
+AnhMin Audio - Project Snapshot
+Everything a project's tabs need, loaded in one read transaction
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .db_manager import db
+from .executor import db_executor, DbFuture
+
+
+@dataclass
+class ProjectSnapshot:
+    """
+    Consistent view of one project's data.
+
+    Glossary terms are not included (only their count); the glossary
+    tab pages them from the database.
+    """
+    project: Dict
+    files: List[Dict]
+    memory: List[Dict]
+    glossary_categories: List[Dict]
+    glossary_term_count: int
+    templates: List[Dict]
+    chat_sessions: List[Dict]
+    batch_jobs: List[Dict]
+    versions: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def project_id(self) -> int:
+        return self.project['id']
+
+
+class ProjectSnapshotCache:
+    """
+    LRU cache of ProjectSnapshot objects.
+
+    A snapshot stays valid until one of the tables it was read from is
+    written (tracked by db.get_table_versions). Versions are per table,
+    not per project, so a write for any project marks every cached
+    snapshot stale; on next access only the parts that depend on the
+    changed tables are re-read.
+    """
+
+    # snapshot field -> (tables it is read from, loader)
+    FIELDS = {
+        'project': (('projects',), db.get_project),
+        'files': (('project_files',), db.get_project_files),
+        'memory': (('project_memory',), db.get_memory),
+        'glossary_categories': (('glossary_categories',), db.get_glossary_categories),
+        'glossary_term_count': (('glossary_categories', 'glossary_terms'), db.count_glossary_terms),
+        'templates': (('templates',), db.get_templates),
+        'chat_sessions': (('chat_sessions',), db.get_chat_sessions),
+        'batch_jobs': (('batch_jobs',),
+                       lambda project_id: db.get_batch_jobs(project_id, limit=20, source='batch')),
+    }
+    TABLES = tuple(sorted({t for tables, _ in FIELDS.values() for t in tables}))
+    MAX_ENTRIES = 8
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots: "OrderedDict[int, ProjectSnapshot]" = OrderedDict()
+        self._prefetching = set()
+
+    def peek(self, project_id: int) -> Optional[ProjectSnapshot]:
+        """Get a cached snapshot if it is still valid, without loading."""
+        with self._lock:
+            snapshot = self._snapshots.get(project_id)
+            if snapshot is None or snapshot.versions != db.get_table_versions(self.TABLES):
+                return None
+            self._snapshots.move_to_end(project_id)
+            return snapshot
+
+    def get(self, project_id: int) -> Optional[ProjectSnapshot]:
+        """Get a project's snapshot, loading it if needed (None if no such project)."""
+        snapshot = self.peek(project_id)
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            previous = self._snapshots.get(project_id)
+        return self.load(project_id, previous)
+
+    def request(self, project_id: int,
+                callback: Callable[[Optional[ProjectSnapshot]], None]) -> DbFuture:
+        """
+        Get a project's snapshot on the db executor.
+
+        Args:
+            callback: Called on the main thread with the snapshot (None if
+                      no such project)
+        """
+        return db_executor.read(self.get, project_id, callback=callback)
+
+    def load(self, project_id: int,
+             previous: ProjectSnapshot = None) -> Optional[ProjectSnapshot]:
+        """
+        Read a project's snapshot in one transaction and cache it.
+
+        Args:
+            project_id: Project to load
+            previous: Stale snapshot whose unchanged parts can be kept
+        """
+        # Versions are taken first so a write racing the read marks it stale
+        versions = db.get_table_versions(self.TABLES)
+        stale = [
+            name for name, (tables, _) in self.FIELDS.items()
+            if previous is None or any(previous.versions.get(t) != versions[t] for t in tables)
+        ]
+
+        with db.read_transaction():
+            values = {name: self.FIELDS[name][1](project_id) for name in stale}
+
+        if 'project' in values and not values['project']:
+            self.invalidate(project_id)
+            return None
+
+        data = {name: values[name] if name in values else getattr(previous, name)
+                for name in self.FIELDS}
+        snapshot = ProjectSnapshot(**data, versions=versions)
+
+        with self._lock:
+            self._snapshots[project_id] = snapshot
+            self._snapshots.move_to_end(project_id)
+            while len(self._snapshots) > self.MAX_ENTRIES:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def prefetch(self, project_ids: Iterable[int]):
+        """Load snapshots for projects in the background (e.g. sidebar neighbours)."""
+        for project_id in project_ids:
+            with self._lock:
+                if project_id in self._prefetching:
+                    continue
+                self._prefetching.add(project_id)
+            if self.peek(project_id) is not None:
+                with self._lock:
+                    self._prefetching.discard(project_id)
+                continue
+
+            def task(pid=project_id):
+                try:
+                    return self.get(pid)
+                finally:
+                    with self._lock:
+                        self._prefetching.discard(pid)
+
+            db_executor.read(task)
+
+    def invalidate(self, project_id: int = None):
+        """Drop one project's snapshot, or all of them."""
+        with self._lock:
+            if project_id is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(project_id, None)
+
+
+# Singleton instance
+project_snapshots = ProjectSnapshotCache()
@@ -0,0 +1,58 @@
+"""
+AnhMin Audio - Text Codec
+Transparent compression for large TEXT payloads stored in SQLite
+"""
+
+import zlib
+from typing import Tuple, Union
+
+# Optional zstd support (falls back to zlib)
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Payloads smaller than this are stored as plain text
+COMPRESS_MIN_BYTES = 2048
+
+CODEC_PLAIN = ''
+CODEC_ZLIB = 'zlib'
+CODEC_ZSTD = 'zstd'
+
+
+def encode_text(text: str) -> Tuple[Union[str, bytes], str]:
+    """
+    Compress text if it is large enough to be worth it.
+
+    Returns:
+        (value to store, codec flag)
+    """
+    data = text.encode('utf-8')
+    if len(data) < COMPRESS_MIN_BYTES:
+        return text, CODEC_PLAIN
+
+    if ZSTD_AVAILABLE:
+        packed, codec = zstandard.ZstdCompressor(level=6).compress(data), CODEC_ZSTD
+    else:
+        packed, codec = zlib.compress(data, 6), CODEC_ZLIB
+
+    # Keep incompressible payloads as text
+    if len(packed) >= len(data):
+        return text, CODEC_PLAIN
+    return packed, codec
+
+
+def decode_text(value: Union[str, bytes, None], codec: str) -> str:
+    """Reverse encode_text()."""
+    if value is None:
+        return ""
+    if not codec:
+        return value
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(value).decode('utf-8')
+    if codec == CODEC_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("Nội dung được nén bằng zstd nhưng chưa cài zstandard")
+        return zstandard.ZstdDecompressor().decompress(value).decode('utf-8')
+    raise ValueError(f"Unknown text codec: {codec}")
@@ -0,0 +1,41 @@
+"""
+AnhMin Audio - Test Setup
+Point the data directory at a temporary home and make the database/api
+packages importable without the GUI stack
+
+database/__init__ and api/__init__ pull in PyQt6, anthropic and the
+scrapers. When those are not installed the packages are registered bare
+(like utils/bench_piaotia loads modules by path), so a test imports only
+the modules it exercises; tests that need the full stack skip themselves.
+"""
+
+import importlib
+import os
+import sys
+import tempfile
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# config creates its directories under the home directory at import
+_home = tempfile.mkdtemp(prefix="anhmin_test_")
+os.environ['HOME'] = _home
+os.environ['USERPROFILE'] = _home
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+for _name in ('database', 'api'):
+    try:
+        importlib.import_module(_name)
+    except ImportError as e:
+        print(f"{_name}/__init__ not importable ({e}); loading its modules directly")
+        _package = types.ModuleType(_name)
+        _package.__path__ = [str(ROOT / _name)]
+        sys.modules[_name] = _package
+
+if not hasattr(sys.modules['database'], 'db'):
+    # Modules that do `from database import db`
+    from database.db_manager import db  # noqa: E402
+    sys.modules['database'].db = db
@@ -0,0 +1,71 @@
+"""Tests for GlossaryMatcher matching and spelling enforcement."""
+
+from api.glossary_matcher import GlossaryMatcher, glossary_matcher
+from database import db
+
+
+def term(standard, original='', variants='', category='Nhân vật'):
+    return {'standard': standard, 'original': original, 'variants': variants,
+            'notes': '', 'category_name': category}
+
+
+MATCHER = GlossaryMatcher([
+    term('Lâm Phong', original='林峰', variants='Lam Phong, Lâm Phòng'),
+    term('Đông Hoa Tông', original='东华宗', variants='Đông Hoa Môn', category='Thế lực'),
+    term('Tô Vũ', variants='Tiểu Vũ'),
+    term('Tô Vân', variants='Tiểu Vũ'),  # shares a variant with Tô Vũ
+])
+
+
+def test_match_finds_terms_by_any_spelling():
+    found = {t['standard'] for t in MATCHER.match("林峰 bước vào Đông Hoa Môn.")}
+    assert found == {'Lâm Phong', 'Đông Hoa Tông'}
+
+
+def test_enforce_rewrites_variants():
+    text, report = MATCHER.enforce("Lam Phong gia nhập Đông Hoa Môn, Lâm Phòng cười.")
+    assert text == "Lâm Phong gia nhập Đông Hoa Tông, Lâm Phong cười."
+    assert report['replacements'] == 3
+    assert report['changes']["Lam Phong → Lâm Phong"] == 1
+
+
+def test_enforce_keeps_standard_and_case_variants():
+    text = "Lâm Phong và LÂM PHONG đều đúng."
+    assert MATCHER.enforce(text) == (text, {'replacements': 0, 'changes': {}})
+
+
+def test_enforce_respects_word_boundaries():
+    text = "Lam Phongxyz không phải tên."
+    assert MATCHER.enforce(text)[0] == text
+
+
+def test_enforce_skips_ambiguous_spellings():
+    text = "Tiểu Vũ đến."
+    assert MATCHER.enforce(text)[0] == text
+
+
+def test_enforce_leaves_han_text_alone():
+    text = "林峰走进东华宗，Lam Phong。"
+    assert MATCHER.enforce(text)[0] == text
+
+
+# ============== Embedded glossary ==============
+
+def test_localize_narrows_embedded_glossary():
+    project_id = db.create_project("Glossary nhúng", "")
+    db.upsert_glossary_terms(project_id, [
+        {'category': 'Nhân vật', 'standard': 'Lâm Phong', 'original': '林峰'},
+        {'category': 'Nhân vật', 'standard': 'Tô Vũ', 'original': '苏雨'},
+    ])
+    glossary_matcher.invalidate(project_id)
+    instructions = f"Dịch sang tiếng Việt.\n## Thuật ngữ:\n{db.get_glossary_for_prompt(project_id)}\n\nHết."
+
+    localized, extra = glossary_matcher.localize(project_id, instructions, "林峰走了。")
+    assert extra == ""
+    assert "Lâm Phong" in localized and "Tô Vũ" not in localized
+    assert localized.startswith("Dịch sang tiếng Việt.") and localized.endswith("Hết.")
+
+    # Without an embedded glossary the matched terms come back as a section to append
+    localized, extra = glossary_matcher.localize(project_id, "Dịch.", "苏雨来了。")
+    assert localized == "Dịch."
+    assert "Tô Vũ" in extra and "Lâm Phong" not in extra
@@ -0,0 +1,63 @@
+"""Tests for DatabaseManager.upsert_glossary_terms."""
+
+import pytest
+
+from database.db_manager import DatabaseManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return DatabaseManager(tmp_path / "test.db")
+
+
+@pytest.fixture
+def project_id(manager):
+    return manager.create_project("Truyện thử", "")
+
+
+def terms_by_standard(manager, project_id):
+    return {term['standard']: term for term in manager.get_all_glossary_terms(project_id)}
+
+
+def test_insert_then_update(manager, project_id):
+    counts = manager.upsert_glossary_terms(project_id, [
+        {'category': 'Nhân vật', 'standard': 'Lâm Phong', 'original': '林峰'},
+        {'category': 'Nhân vật', 'standard': 'Tô Vũ', 'notes': 'sư muội'},
+    ])
+    assert counts == {'inserted': 2, 'updated': 0, 'skipped': 0}
+
+    counts = manager.upsert_glossary_terms(project_id, [
+        {'category': 'Nhân vật', 'standard': 'Lâm Phong', 'variants': 'Lam Phong'},
+    ])
+    assert counts == {'inserted': 0, 'updated': 1, 'skipped': 0}
+
+    term = terms_by_standard(manager, project_id)['Lâm Phong']
+    assert term['original'] == '林峰'  # empty fields keep the stored value
+    assert term['variants'] == 'Lam Phong'
+
+
+def test_repeated_and_invalid_rows(manager, project_id):
+    counts = manager.upsert_glossary_terms(project_id, [
+        {'category': 'Nhân vật', 'standard': 'Lâm Phong', 'notes': 'cũ'},
+        {'category': 'Nhân vật', 'standard': 'Lâm Phong', 'notes': 'mới'},
+        {'category': 'Nhân vật', 'standard': '  '},
+        {'category': '', 'standard': 'Không loại'},
+    ])
+    assert counts == {'inserted': 1, 'updated': 0, 'skipped': 3}
+    assert terms_by_standard(manager, project_id)['Lâm Phong']['notes'] == 'mới'
+
+
+def test_creates_missing_category(manager, project_id):
+    manager.upsert_glossary_terms(project_id, [
+        {'category': 'Pháp bảo mới', 'standard': 'Hỗn Độn Châu', 'icon': '💎'},
+    ])
+    categories = {c['name']: c for c in manager.get_glossary_categories(project_id)}
+    assert 'Pháp bảo mới' in categories
+    assert terms_by_standard(manager, project_id)['Hỗn Độn Châu']['category_name'] == 'Pháp bảo mới'
+
+
+def test_bumps_glossary_revision(manager, project_id):
+    before = manager.get_glossary_revision()
+    manager.upsert_glossary_terms(project_id, [{'category': 'Nhân vật', 'standard': 'Lâm Phong'}])
+    assert manager.get_glossary_revision() > before
+    assert 'Lâm Phong' in manager.get_glossary_for_prompt(project_id)
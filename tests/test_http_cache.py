@@ -0,0 +1,74 @@
+"""Tests for HttpCache revalidation and LRU eviction."""
+
+import os
+import time
+
+import pytest
+
+from api.http_cache import HttpCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return HttpCache(tmp_path / "http_cache")
+
+
+def test_store_and_lookup(cache):
+    cache.store("https://example.com/1.html", "第一章".encode('gbk'),
+                {'ETag': '"v1"'}, encoding='gbk')
+
+    entry = cache.lookup("https://example.com/1.html")
+    assert entry['content'] == "第一章".encode('gbk')
+    page = cache.to_page(entry)
+    assert page.text == "第一章" and page.from_cache
+    assert cache.lookup("https://example.com/missing.html") is None
+
+
+def test_revalidation_headers_and_304(cache):
+    url = "https://example.com/2.html"
+    cache.store(url, b"body", {'ETag': '"v1"', 'Last-Modified': 'Mon, 05 Jan 2026 00:00:00 GMT'})
+    entry = cache.lookup(url)
+
+    assert cache.is_fresh(entry, ttl=3600)
+    assert not cache.is_fresh(entry, ttl=0)
+    assert cache.conditional_headers(entry) == {
+        'If-None-Match': '"v1"',
+        'If-Modified-Since': 'Mon, 05 Jan 2026 00:00:00 GMT',
+    }
+    assert cache.conditional_headers(None) == {}
+
+    # A 304 refreshes validated_at and picks up a new validator
+    time.sleep(0.01)
+    cache.mark_validated(url, {'ETag': '"v2"'})
+    revalidated = cache.lookup(url)
+    assert revalidated['validated_at'] > entry['validated_at']
+    assert revalidated['etag'] == '"v2"'
+    assert revalidated['last_modified'] == entry['last_modified']
+    assert revalidated['content'] == b"body"
+
+
+def test_evicts_least_recently_used(tmp_path):
+    body = os.urandom(1000)  # incompressible, so each entry is ~1000 bytes
+    cache = HttpCache(tmp_path / "http_cache", max_bytes=2500)
+
+    cache.store("https://example.com/a", body)
+    time.sleep(0.01)
+    cache.store("https://example.com/b", body)
+    time.sleep(0.01)
+    cache.lookup("https://example.com/a")  # a is now more recent than b
+    time.sleep(0.01)
+    cache.store("https://example.com/c", body)
+
+    assert cache.lookup("https://example.com/b") is None
+    assert cache.lookup("https://example.com/a") is not None
+    assert cache.lookup("https://example.com/c") is not None
+    assert cache.total_bytes() <= cache.max_bytes * cache.EVICT_TO
+
+
+def test_missing_body_file_drops_entry(cache):
+    url = "https://example.com/gone"
+    cache.store(url, b"body")
+    cache._path(url).unlink()
+
+    assert cache.lookup(url) is None
+    assert cache.total_bytes() == 0
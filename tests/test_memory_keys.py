@@ -0,0 +1,40 @@
+"""Tests for memory key normalisation in MemoryDetector."""
+
+import pytest
+
+pytest.importorskip("PyQt6")
+pytest.importorskip("anthropic")
+
+from api.memory_detector import MemoryDetector  # noqa: E402
+from database import db  # noqa: E402
+
+
+@pytest.mark.parametrize("key, expected", [
+    ("lâm_phong", "lam_phong"),
+    ("Đông Hoa Tông", "dong_hoa_tong"),
+    ("  Cảnh giới: Trúc Cơ  ", "canh_gioi_truc_co"),
+    ("ASCII_key", "ascii_key"),
+    ("林峰", ""),
+])
+def test_normalize_key(key, expected):
+    assert MemoryDetector.normalize_key(key) == expected
+
+
+def test_validate_items_folds_keys():
+    items = MemoryDetector.validate_items({'items': [
+        {'key': 'Lâm Phong', 'value': 'nhân vật chính', 'category': 'character'},
+        {'key': '林峰', 'value': 'bị loại vì key rỗng', 'category': 'character'},
+    ]})
+    assert items == [('character', 'lam_phong', 'nhân vật chính', 'add')]
+
+
+def test_keys_round_trip_through_stored_keys():
+    project_id = db.create_project("Memory key", "")
+    db.set_memory_bulk(project_id, [('lâm_phong', 'nhân vật chính', 'character')])
+
+    resolved = MemoryDetector.resolve_keys(
+        [('character', 'lam_phong', 'đã đột phá', 'update'),
+         ('location', 'dong_hoa_tong', 'tông môn', 'add')],
+        db.get_memory_keys(project_id)
+    )
+    assert [item[1] for item in resolved] == ['lâm_phong', 'dong_hoa_tong']
@@ -0,0 +1,21 @@
+"""Tests for PiaotiaParser against the regex passes it replaced."""
+
+import pytest
+
+from utils.bench_piaotia import EDGE_CASES, legacy_parse_content, piaotia_parser
+from utils.piaotia_corpus import generate
+
+
+@pytest.mark.parametrize("name, page, expected", EDGE_CASES, ids=[case[0] for case in EDGE_CASES])
+def test_edge_cases(name, page, expected):
+    assert piaotia_parser.parse_content(page) == expected
+
+
+def test_matches_legacy_regexes_on_sample_pages():
+    for name, page in generate(count=50):
+        assert piaotia_parser.parse_content(page) == legacy_parse_content(page), name
+
+
+def test_missing_content_raises():
+    with pytest.raises(ValueError):
+        piaotia_parser.parse_content("<html><body>Không có nội dung</body></html>")
@@ -0,0 +1,57 @@
+"""Tests for DatabaseManager.flush_usage (batch usage counted once)."""
+
+import pytest
+
+from database.db_manager import DatabaseManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return DatabaseManager(tmp_path / "test.db")
+
+
+def counters(input_tokens=0, output_tokens=0, cost=0.0, requests=1):
+    values = dict.fromkeys(DatabaseManager.USAGE_FIELDS, 0)
+    values.update(input_tokens=input_tokens, output_tokens=output_tokens,
+                  request_count=requests, cost=cost)
+    return values
+
+
+def daily_input_tokens(manager, date):
+    with manager.get_connection() as conn:
+        row = conn.execute("SELECT input_tokens FROM usage_stats WHERE date = ?", (date,)).fetchone()
+    return row['input_tokens'] if row else 0
+
+
+def test_batch_counted_once(manager):
+    manager.create_batch_job('batch_1', None, 'ended', [{'custom_id': 'a'}])
+    key = ('2026-01-05', 0, 'claude-test', 1, 'batch')
+    batches = {'batch_1': {key: counters(input_tokens=100, cost=0.5)}}
+
+    manager.flush_usage({}, {}, batches=batches)
+    manager.flush_usage({}, {}, batches=batches)  # results fetched again
+
+    assert daily_input_tokens(manager, '2026-01-05') == 100
+    assert manager.is_batch_usage_recorded('batch_1')
+
+
+def test_batch_merged_with_buffered_entries(manager):
+    manager.create_batch_job('batch_2', None, 'ended', [{'custom_id': 'a'}])
+    key = ('2026-01-06', 0, 'claude-test', 1, 'chat')
+    entries = {key: counters(input_tokens=10)}
+    batches = {'batch_2': {key: counters(input_tokens=5)}}
+
+    manager.flush_usage(entries, {}, batches=batches)
+
+    assert daily_input_tokens(manager, '2026-01-06') == 15
+    assert entries[key]['input_tokens'] == 10  # the caller's buffer is not modified
+    rollup = {row['dim_value']: row for row in manager.get_usage_rollup('task', '2026-01')}
+    assert rollup['chat']['input_tokens'] == 15
+
+
+def test_unknown_batch_still_counted(manager):
+    # A batch without a batch_jobs row (e.g. deleted history) is not deduplicated
+    key = ('2026-01-07', 0, 'claude-test', 1, 'batch')
+    manager.flush_usage({}, {}, batches={'missing': {key: counters(input_tokens=7)}})
+
+    assert daily_input_tokens(manager, '2026-01-07') == 7
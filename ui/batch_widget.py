@@ -3,7 +3,6 @@ AnhMin Audio - Batch Widget
 Batch processing with Anthropic Batch API
 """
 
-import json
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, List, Dict
@@ -17,7 +16,7 @@ from PyQt6.QtCore import Qt, pyqtSignal, QTimer, QThread
 from PyQt6.QtGui import QCursor, QColor
 
 from database import db
-from api import claude_client, file_handler
+from api import claude_client, file_handler, glossary_matcher
 from ui.styles import COLORS
 
 
@@ -45,7 +44,9 @@ class BatchWorker(QThread):
                 self.status_updated.emit(result)
             
             elif self.operation == 'results':
-                results = claude_client.get_batch_results(self.kwargs['batch_id'])
+                results = claude_client.get_batch_results(
+                    self.kwargs['batch_id'], project_id=self.kwargs.get('project_id')
+                )
                 self.results_ready.emit(results)
                 
         except Exception as e:
@@ -535,10 +536,10 @@ class BatchWidget(QWidget):
         
         return frame
     
-    def set_project(self, project_id: int):
+    def set_project(self, project_id: int, snapshot=None):
         """Set current project."""
         self.project_id = project_id
-        self.load_batch_history()
+        self.load_batch_history(snapshot.batch_jobs if snapshot else None)
     
     def add_files(self):
         """Add files to batch list."""
@@ -637,17 +638,22 @@ class BatchWidget(QWidget):
             QMessageBox.warning(self, "Lỗi", "Vui lòng chọn project")
             return
         
-        # Build system prompt from project
+        # Build batch requests (memory and glossary filtered to what each file mentions)
         project = db.get_project(self.project_id)
+        instructions = project.get('instructions', '')
         memory = db.get_memory(self.project_id)
-        system_prompt = claude_client.build_system_prompt(
-            project.get('instructions', ''),
-            memory
-        )
-        
-        # Build batch requests
         requests = []
         for filepath, file_info in self.files.items():
+            # A glossary embedded from a {{GLOSSARY}} template is narrowed in place
+            file_instructions, glossary = glossary_matcher.localize(
+                self.project_id, instructions, file_info['content'])
+            system_prompt = claude_client.build_system_prompt(
+                file_instructions,
+                memory,
+                context=file_info['content']
+            )
+            if glossary:
+                system_prompt += f"\n\n## Thuật ngữ cần tuân thủ:\n{glossary}"
             request = claude_client.build_batch_request(
                 custom_id=file_info['stem'],
                 content=file_info['content'],
@@ -751,9 +757,9 @@ class BatchWidget(QWidget):
                 self.status_label.setStyleSheet(f"color: {COLORS['error']}; font-size: 16px; font-weight: 600;")
             self.cancel_btn.setEnabled(False)
         
-        # Update history
-        self.update_batch_in_history(self.current_batch_id, status)
-        self.load_batch_history()
+        # Update history (only touches the table when something changed)
+        if self.update_batch_in_history(self.current_batch_id, status):
+            self.load_batch_history()
     
     def download_results(self):
         """Download batch results."""
@@ -768,7 +774,8 @@ class BatchWidget(QWidget):
         self.download_btn.setEnabled(False)
         self.download_btn.setText("⏳ Đang tải...")
         
-        self.worker = BatchWorker('results', batch_id=self.current_batch_id)
+        self.worker = BatchWorker('results', batch_id=self.current_batch_id,
+                                  project_id=self.project_id)
         self.worker.results_ready.connect(self.on_results_ready)
         self.worker.error_occurred.connect(self.on_error)
         self.worker.start()
@@ -777,36 +784,68 @@ class BatchWidget(QWidget):
         """Handle results ready."""
         success_count = 0
         error_count = 0
+        request_updates = []
+        glossary_fixes = []  # per-file glossary report lines
         
         project = db.get_project(self.project_id) if self.project_id else {}
         project_name = project.get('name', '')
         
         for result in results:
             if result['type'] == 'succeeded':
+                content = result['content']
+                
+                # Fix non-standard glossary spellings
+                if self.project_id:
+                    content, report = glossary_matcher.enforce(self.project_id, content)
+                    if report['replacements']:
+                        glossary_fixes.append(f"{result['custom_id']}: {report['replacements']} chỗ")
+                
                 # Export to DOCX
                 output_path = self.output_dir / f"{result['custom_id']}.docx"
                 _, error = file_handler.export_to_docx(
-                    result['content'],
+                    content,
                     project_name=project_name,
                     output_path=str(output_path)
                 )
                 
                 if error:
                     error_count += 1
+                    request_updates.append({
+                        'custom_id': result['custom_id'], 'status': 'export_failed', 'error': error
+                    })
                 else:
                     success_count += 1
+                    request_updates.append({
+                        'custom_id': result['custom_id'], 'status': 'succeeded',
+                        'output_path': str(output_path)
+                    })
             else:
                 error_count += 1
+                request_updates.append({
+                    'custom_id': result['custom_id'], 'status': result['type'],
+                    'error': result.get('error')
+                })
+        
+        if self.current_batch_id and request_updates:
+            db.update_batch_requests(self.current_batch_id, request_updates)
         
         self.download_btn.setText("📥 Tải kết quả")
         self.download_btn.setEnabled(True)
         
+        glossary_text = ""
+        if glossary_fixes:
+            glossary_text = f"\n\nĐã chuẩn hóa thuật ngữ ở {len(glossary_fixes)} file:\n"
+            glossary_text += "\n".join(glossary_fixes[:10])
+            if len(glossary_fixes) > 10:
+                glossary_text += f"\n... và {len(glossary_fixes) - 10} file khác"
+        
         QMessageBox.information(
             self,
             "Hoàn thành",
             f"Đã lưu {success_count} files vào:\n{self.output_dir}\n\n"
             f"Thành công: {success_count}\n"
             f"Lỗi: {error_count}"
+            f"{glossary_text}"
         )
     
     def cancel_batch(self):
@@ -842,55 +881,59 @@ class BatchWidget(QWidget):
     # ============== Batch History ==============
     
     def save_batch_to_history(self, batch: dict):
-        """Save batch to database."""
+        """Save batch and its per-file requests to database."""
         if not self.project_id:
             return
         
-        history = self.get_batch_history()
-        history.append({
-            'id': batch['id'],
-            'status': batch['status'],
-            'file_count': len(self.files),
-            'created_at': datetime.now().isoformat(),
-            'output_dir': str(self.output_dir)
-        })
-        
-        # Keep only last 20
-        history = history[-20:]
-        
-        db.set_setting(f'batch_history_{self.project_id}', json.dumps(history))
+        db.create_batch_job(
+            batch['id'],
+            self.project_id,
+            batch['status'],
+            requests=[
+                {'custom_id': info['stem'], 'source_path': filepath}
+                for filepath, info in self.files.items()
+            ],
+            output_dir=str(self.output_dir) if self.output_dir else None,
+            source='batch',
+            key_id=batch.get('key_id')
+        )
     
-    def update_batch_in_history(self, batch_id: str, status: dict):
-        """Update batch status in history."""
-        if not self.project_id:
-            return
-        
-        history = self.get_batch_history()
-        for item in history:
-            if item['id'] == batch_id:
-                item['status'] = status['status']
-                break
-        
-        db.set_setting(f'batch_history_{self.project_id}', json.dumps(history))
+    def update_batch_in_history(self, batch_id: str, status: dict) -> bool:
+        """Update batch status in history. Returns True if anything changed."""
+        job = db.get_batch_job(batch_id)
+        if not job:
+            return False
+        
+        counts = status.get('request_counts', {})
+        updates = {
+            'status': status['status'],
+            'processing': counts.get('processing', 0),
+            'succeeded': counts.get('succeeded', 0),
+            'errored': counts.get('errored', 0),
+        }
+        if status.get('ended_at'):
+            updates['ended_at'] = status['ended_at']
+        
+        if all(job.get(k) == v for k, v in updates.items()):
+            return False
+        
+        return db.update_batch_job(batch_id, **updates)
     
     def get_batch_history(self) -> list:
-        """Get batch history from database."""
+        """Get the last 20 batches of the project, newest first."""
         if not self.project_id:
             return []
         
-        history_str = db.get_setting(f'batch_history_{self.project_id}', '[]')
-        try:
-            return json.loads(history_str)
-        except:
-            return []
+        return db.get_batch_jobs(self.project_id, limit=20, source='batch')
     
-    def load_batch_history(self):
+    def load_batch_history(self, history: list = None):
         """Load batch history into table."""
-        history = self.get_batch_history()
+        if history is None:
+            history = self.get_batch_history()
         
         self.history_table.setRowCount(len(history))
         
-        for i, item in enumerate(reversed(history)):
+        for i, item in enumerate(history):
             # ID
             id_item = QTableWidgetItem(item['id'][:16] + "...")
             id_item.setData(Qt.ItemDataRole.UserRole, item['id'])
@@ -925,4 +968,14 @@ class BatchWidget(QWidget):
         if batch_id:
             self.current_batch_id = batch_id
             self.batch_id_label.setText(f"Batch ID: {batch_id[:20]}...")
+            
+            # Restore the output folder the batch was created with
+            job = db.get_batch_job(batch_id)
+            if job and job.get('output_dir') and not self.output_dir:
+                self.output_dir = Path(job['output_dir'])
+                display = str(self.output_dir)
+                if len(display) > 40:
+                    display = "..." + display[-37:]
+                self.output_path_label.setText(display)
+                self.output_path_label.setToolTip(str(self.output_dir))
             self.refresh_status()
@@ -11,9 +11,9 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, pyqtSignal, QTimer
 from PyQt6.QtGui import QFont, QCursor, QTextCursor, QKeyEvent
 
-from database import db
+from database import db, db_executor
 from api import claude_client, StreamWorker, file_handler
-from api.memory_detector import auto_detect_and_add_memory
+from api.memory_detector import memory_queue
 from ui.styles import COLORS
 
 
@@ -387,6 +387,7 @@ class ChatWidget(QWidget):
         super().__init__()
         self.project_id = None
         self.session_id = None
+        self._messages_future = None
         self.stream_worker = None
         self.current_assistant_bubble = None
         self.setup_ui()
@@ -480,13 +481,13 @@ class ChatWidget(QWidget):
         
         layout.addWidget(input_container)
     
-    def set_project(self, project_id: int):
+    def set_project(self, project_id: int, snapshot=None):
         """Set the current project and load chat history."""
         self.project_id = project_id
         self.clear_messages()
         
         # Get or create chat session
-        sessions = db.get_chat_sessions(project_id)
+        sessions = snapshot.chat_sessions if snapshot else db.get_chat_sessions(project_id)
         if sessions:
             self.session_id = sessions[0]['id']
             self.load_messages()
@@ -496,11 +497,28 @@ class ChatWidget(QWidget):
         self.update_visibility()
     
     def load_messages(self):
-        """Load messages from database."""
+        """Load messages from database (off the UI thread)."""
+        if self._messages_future:
+            self._messages_future.cancel()
+            self._messages_future = None
+        
         if not self.session_id:
             return
         
-        messages = db.get_messages(self.session_id)
+        session_id = self.session_id
+        self._messages_future = db_executor.read(
+            db.get_messages, session_id,
+            callback=lambda messages: self.on_messages_loaded(session_id, messages)
+        )
+    
+    def on_messages_loaded(self, session_id: int, messages: list):
+        """Show loaded chat history."""
+        self._messages_future = None
+        if session_id != self.session_id:
+            return
+        
+        # Replace whatever an earlier load of this session left on screen
+        self.clear_messages()
         for msg in messages:
             self.add_message_bubble(msg['role'], msg['content'], msg['attachments'])
         
@@ -578,9 +596,12 @@ class ChatWidget(QWidget):
         # Get project info for system prompt
         project = db.get_project(self.project_id)
         memory = db.get_memory(self.project_id)
+        # Only memory mentioned in the recent turns (plus the pinned core set)
+        recent_text = "\n".join(m['content'] for m in api_messages[-4:])
         system_prompt = claude_client.build_system_prompt(
             project.get('instructions', ''),
-            memory
+            memory,
+            context=recent_text
         )
 
         # Apply project-specific model and thinking settings
@@ -596,7 +617,8 @@ class ChatWidget(QWidget):
         self.scroll_to_bottom()
 
         # Start streaming worker
-        self.stream_worker = StreamWorker(claude_client, api_messages, system_prompt)
+        self.stream_worker = StreamWorker(claude_client, api_messages, system_prompt,
+                                          project_id=self.project_id, task_type="chat")
         self.stream_worker.chunk_received.connect(self.on_stream_chunk)
         self.stream_worker.stream_finished.connect(self.on_stream_finished)
         self.stream_worker.error_occurred.connect(self.on_stream_error)
@@ -617,9 +639,9 @@ class ChatWidget(QWidget):
         # Save to database
         db.add_message(self.session_id, 'assistant', full_response)
 
-        # Auto-detect and add memory from response
+        # Auto-detect memory from response in the background
         if self.project_id:
-            auto_detect_and_add_memory(full_response, self.project_id)
+            memory_queue.enqueue(full_response, self.project_id)
 
         self.chat_input.set_enabled(True)
         self.current_assistant_bubble = None
@@ -263,11 +263,11 @@ class FilesWidget(QWidget):
         scroll.setWidget(self.files_list)
         layout.addWidget(scroll, 1)
     
-    def set_project(self, project_id: int):
+    def set_project(self, project_id: int, snapshot=None):
         """Load project files."""
         self.project_id = project_id
         self.clear_files()
-        self.load_files()
+        self.load_files(snapshot.files if snapshot else None)
     
     def clear_files(self):
         """Clear all file widgets."""
@@ -280,12 +280,13 @@ class FilesWidget(QWidget):
             if item.widget():
                 item.widget().deleteLater()
     
-    def load_files(self):
+    def load_files(self, files: list = None):
         """Load files from database."""
         if not self.project_id:
             return
         
-        files = db.get_project_files(self.project_id)
+        if files is None:
+            files = db.get_project_files(self.project_id)
         for f in files:
             self.add_file_widget(f)
         
@@ -318,6 +319,10 @@ class FilesWidget(QWidget):
                 QMessageBox.warning(self, "Lỗi", f"Không thể thêm file: {error}")
                 continue
             
+            # Identical content is already in the project
+            if any(w.filepath == new_path for w in self.file_widgets.values()):
+                continue
+            
             from pathlib import Path
             path = Path(filepath)
             file_size = file_handler.get_file_size(filepath)
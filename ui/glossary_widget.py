@@ -3,17 +3,19 @@ AnhMin Audio - Glossary Widget
 Manage terminology for consistent translation
 """
 
-import json
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QFrame, QScrollArea, QLineEdit, QTextEdit, QComboBox,
     QDialog, QMessageBox, QFileDialog, QTableWidget, QTableWidgetItem,
-    QHeaderView, QAbstractItemView
+    QTableView, QHeaderView, QAbstractItemView, QMenu
 )
-from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtGui import QCursor
+from PyQt6.QtCore import (
+    Qt, QThread, pyqtSignal, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+)
+from PyQt6.QtGui import QCursor, QFont
 
-from database import db
+from database import db, db_executor
+from api import glossary_io, term_miner
 from ui.styles import COLORS
 
 
@@ -344,6 +346,359 @@ class CategoryEditorDialog(QDialog):
         self.accept()
 
 
+class TermMiningWorker(QThread):
+    """Update a project's term statistics and rank candidates."""
+    
+    progress = pyqtSignal(int, int)  # done, total
+    finished = pyqtSignal(list)  # TermCandidate list
+    error = pyqtSignal(str)
+    
+    def __init__(self, project_id: int):
+        super().__init__()
+        self.project_id = project_id
+    
+    def run(self):
+        try:
+            term_miner.update(self.project_id, progress=self.progress.emit)
+            self.finished.emit(term_miner.candidates(self.project_id))
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class TermCandidatesDialog(QDialog):
+    """Review mined term candidates and add the chosen ones to the glossary."""
+    
+    def __init__(self, candidates: list, categories: list, parent=None):
+        super().__init__(parent)
+        self.candidates = candidates
+        self.category_names = []
+        for cat in categories:
+            if cat['name'] not in self.category_names:
+                self.category_names.append(cat['name'])
+        self.setWindowTitle("Gợi ý thuật ngữ")
+        self.setModal(True)
+        self.setMinimumSize(640, 520)
+        self.setup_ui()
+    
+    def setup_ui(self):
+        self.setStyleSheet(f"QDialog {{ background-color: {COLORS['bg_dark']}; }}")
+        
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(24, 24, 24, 24)
+        layout.setSpacing(16)
+        
+        info = QLabel(
+            f"Tìm thấy {len(self.candidates)} thuật ngữ lặp lại nhiều lần trong các chương "
+            "mà chưa có trong glossary. Chọn các thuật ngữ muốn thêm."
+        )
+        info.setWordWrap(True)
+        info.setStyleSheet(f"color: {COLORS['text_secondary']}; font-size: 13px;")
+        layout.addWidget(info)
+        
+        self.table = QTableWidget()
+        self.table.setColumnCount(4)
+        self.table.setHorizontalHeaderLabels(["Thuật ngữ", "Danh mục", "Số lần", "Số chương"])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Fixed)
+        self.table.setColumnWidth(1, 150)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setStyleSheet(f"""
+            QTableWidget {{
+                background-color: {COLORS['bg_light']};
+                border: 1px solid {COLORS['border']};
+                border-radius: 8px;
+                gridline-color: {COLORS['border']};
+            }}
+            QTableWidget::item {{
+                padding: 6px;
+                color: {COLORS['text_primary']};
+            }}
+            QHeaderView::section {{
+                background-color: {COLORS['bg_lighter']};
+                color: {COLORS['text_secondary']};
+                padding: 8px;
+                border: none;
+                font-weight: 500;
+            }}
+        """)
+        
+        self.table.setRowCount(len(self.candidates))
+        for i, candidate in enumerate(self.candidates):
+            term_item = QTableWidgetItem(candidate.text)
+            term_item.setFlags(term_item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            term_item.setCheckState(Qt.CheckState.Unchecked)
+            self.table.setItem(i, 0, term_item)
+            
+            cat_combo = QComboBox()
+            cat_combo.addItems(self.category_names)
+            if candidate.category not in self.category_names:
+                cat_combo.addItem(candidate.category)
+            cat_combo.setCurrentText(candidate.category)
+            self.table.setCellWidget(i, 1, cat_combo)
+            
+            freq_item = QTableWidgetItem()
+            freq_item.setData(Qt.ItemDataRole.DisplayRole, candidate.frequency)
+            self.table.setItem(i, 2, freq_item)
+            
+            chapters_item = QTableWidgetItem()
+            chapters_item.setData(Qt.ItemDataRole.DisplayRole, candidate.chapters)
+            self.table.setItem(i, 3, chapters_item)
+        
+        layout.addWidget(self.table, 1)
+        
+        # Buttons
+        btn_row = QHBoxLayout()
+        
+        select_all_btn = QPushButton("Chọn tất cả")
+        select_all_btn.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {COLORS['bg_lighter']};
+                color: {COLORS['text_primary']};
+                border: none;
+                border-radius: 6px;
+                padding: 10px 20px;
+            }}
+            QPushButton:hover {{
+                background-color: {COLORS['border_light']};
+            }}
+        """)
+        select_all_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        select_all_btn.clicked.connect(self.toggle_all)
+        btn_row.addWidget(select_all_btn)
+        btn_row.addStretch()
+        
+        cancel_btn = QPushButton("Hủy")
+        cancel_btn.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {COLORS['bg_lighter']};
+                color: {COLORS['text_primary']};
+                border: none;
+                border-radius: 6px;
+                padding: 10px 20px;
+            }}
+            QPushButton:hover {{
+                background-color: {COLORS['border_light']};
+            }}
+        """)
+        cancel_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        cancel_btn.clicked.connect(self.reject)
+        btn_row.addWidget(cancel_btn)
+        
+        add_btn = QPushButton("➕ Thêm vào glossary")
+        add_btn.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {COLORS['accent']};
+                color: white;
+                border: none;
+                border-radius: 6px;
+                padding: 10px 20px;
+                font-weight: 500;
+            }}
+            QPushButton:hover {{
+                background-color: {COLORS['accent_hover']};
+            }}
+        """)
+        add_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        add_btn.clicked.connect(self.save)
+        btn_row.addWidget(add_btn)
+        
+        layout.addLayout(btn_row)
+    
+    def toggle_all(self):
+        """Check all rows, or uncheck them if all are checked."""
+        rows = range(self.table.rowCount())
+        all_checked = all(
+            self.table.item(i, 0).checkState() == Qt.CheckState.Checked for i in rows
+        )
+        state = Qt.CheckState.Unchecked if all_checked else Qt.CheckState.Checked
+        for i in rows:
+            self.table.item(i, 0).setCheckState(state)
+    
+    def save(self):
+        """Collect the checked candidates with their chosen categories."""
+        self.result_data = []
+        for i, candidate in enumerate(self.candidates):
+            if self.table.item(i, 0).checkState() == Qt.CheckState.Checked:
+                candidate.category = self.table.cellWidget(i, 1).currentText()
+                self.result_data.append(candidate)
+        
+        if not self.result_data:
+            QMessageBox.warning(self, "Lỗi", "Vui lòng chọn ít nhất một thuật ngữ")
+            return
+        
+        self.accept()
+
+
+class GlossaryTermsModel(QAbstractTableModel):
+    """
+    Terms of one category, loaded page by page.
+
+    The view asks for more rows (canFetchMore/fetchMore) as it scrolls
+    near the end; each page is read on the db executor and appended when
+    it arrives, so opening a category with thousands of terms only
+    costs the first page.
+    """
+    
+    PAGE_SIZE = 500
+    HEADERS = ["Thuật ngữ gốc", "Cách viết chuẩn", "Ghi chú"]
+    FIELDS = ['original', 'standard', 'notes']
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.category_id = None
+        self._terms: list = []
+        self._search_keys: list = []  # lowercased "original standard notes" per row
+        self._exhausted = True
+        self._fetch_all = False
+        self._future = None
+        self._generation = 0  # bumped on every reset; older pages are dropped
+        self._bold = QFont()
+        self._bold.setBold(True)
+    
+    def set_category(self, category_id):
+        """Show a category (its terms are paged from the database)."""
+        if self._future:
+            self._future.cancel()
+            self._future = None
+        
+        self.beginResetModel()
+        self._generation += 1
+        self.category_id = category_id
+        self._terms = []
+        self._search_keys = []
+        self._exhausted = category_id is None
+        self._fetch_all = False
+        self.endResetModel()
+        
+        self.fetchMore(QModelIndex())
+    
+    @staticmethod
+    def _search_key(term: dict) -> str:
+        return ' '.join(term.get(f) or '' for f in GlossaryTermsModel.FIELDS).lower()
+    
+    def term_at(self, row: int) -> dict:
+        return self._terms[row]
+    
+    def search_key(self, row: int) -> str:
+        return self._search_keys[row]
+    
+    def fetch_all(self):
+        """Keep loading pages in the background until the category is complete."""
+        self._fetch_all = True
+        self.fetchMore(QModelIndex())
+    
+    # ============== Model interface ==============
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._terms)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        term = self._terms[index.row()]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return term.get(self.FIELDS[index.column()]) or ''
+        if role == Qt.ItemDataRole.FontRole and index.column() == 1:
+            return self._bold
+        if role == Qt.ItemDataRole.UserRole:
+            return term['id']
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and self._future is None
+    
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        
+        after = None
+        if self._terms:
+            last = self._terms[-1]
+            after = (last['standard'], last['id'])
+        
+        generation = self._generation
+        self._future = db_executor.read(
+            db.get_glossary_terms_page, self.category_id, after, self.PAGE_SIZE,
+            callback=lambda terms: self._on_page_loaded(generation, terms),
+            error_callback=lambda error: self._on_page_failed(generation, error)
+        )
+    
+    def _on_page_loaded(self, generation: int, terms: list):
+        if generation != self._generation:
+            return  # requested before the last reset
+        self._future = None
+        if len(terms) < self.PAGE_SIZE:
+            self._exhausted = True
+        
+        if terms:
+            first = len(self._terms)
+            self.beginInsertRows(QModelIndex(), first, first + len(terms) - 1)
+            self._terms.extend(terms)
+            self._search_keys.extend(self._search_key(t) for t in terms)
+            self.endInsertRows()
+        
+        if self._fetch_all:
+            self.fetchMore(QModelIndex())
+    
+    def _on_page_failed(self, generation: int, error: str):
+        print(f"Error loading glossary terms: {error}")
+        if generation != self._generation:
+            return
+        self._future = None
+        self._exhausted = True
+
+
+class TermFilterProxyModel(QSortFilterProxyModel):
+    """
+    Case-insensitive substring filter over original/standard/notes.
+    
+    Rows are only ever appended to the source between resets, so rows
+    rejected by a filter stay rejected while the user keeps typing: only
+    rows that still matched are tested again. Setting a filter makes the
+    source load its remaining pages in the background.
+    """
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._text = ''
+        self._rejected = set()
+    
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        model.modelReset.connect(lambda: self._rejected.clear())
+    
+    def set_filter_text(self, text: str):
+        text = text.strip().lower()
+        if text == self._text:
+            return
+        if not text.startswith(self._text):
+            self._rejected.clear()
+        self._text = text
+        if text:
+            self.sourceModel().fetch_all()
+        self.invalidateFilter()
+    
+    def filterAcceptsRow(self, source_row, source_parent):
+        if not self._text:
+            return True
+        if source_row in self._rejected:
+            return False
+        if self._text in self.sourceModel().search_key(source_row):
+            return True
+        self._rejected.add(source_row)
+        return False
+
+
 class GlossaryWidget(QWidget):
     """Glossary management widget."""
     
@@ -351,6 +706,8 @@ class GlossaryWidget(QWidget):
         super().__init__()
         self.project_id = None
         self.current_category_id = None
+        self._terms_future = None
+        self.mining_worker = None
         self.setup_ui()
     
     def setup_ui(self):
@@ -379,6 +736,25 @@ class GlossaryWidget(QWidget):
         header.addLayout(title_section)
         header.addStretch()
         
+        self.mine_btn = QPushButton("⛏️ Gợi ý thuật ngữ")
+        self.mine_btn.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {COLORS['bg_lighter']};
+                color: {COLORS['text_primary']};
+                border: none;
+                border-radius: 6px;
+                padding: 8px 16px;
+                font-size: 12px;
+            }}
+            QPushButton:hover {{
+                background-color: {COLORS['border_light']};
+            }}
+        """)
+        self.mine_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        self.mine_btn.setToolTip("Tìm tên riêng lặp lại trong các chương đã lưu")
+        self.mine_btn.clicked.connect(self.mine_terms)
+        header.addWidget(self.mine_btn)
+        
         # Import/Export buttons
         import_btn = QPushButton("📥 Import")
         import_btn.setStyleSheet(f"""
@@ -527,29 +903,36 @@ class GlossaryWidget(QWidget):
         
         right_panel.addLayout(terms_header)
         
-        # Terms table
-        self.terms_table = QTableWidget()
-        self.terms_table.setColumnCount(4)
-        self.terms_table.setHorizontalHeaderLabels(["Thuật ngữ gốc", "Cách viết chuẩn", "Ghi chú", "Thao tác"])
-        self.terms_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
-        self.terms_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
-        self.terms_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
-        self.terms_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.Fixed)
-        self.terms_table.setColumnWidth(3, 120)
+        # Terms table (model/view: rows are painted on demand, pages load as it scrolls)
+        self.terms_model = GlossaryTermsModel(self)
+        self.terms_proxy = TermFilterProxyModel(self)
+        self.terms_proxy.setSourceModel(self.terms_model)
+        
+        self.terms_table = QTableView()
+        self.terms_table.setModel(self.terms_proxy)
+        for column in range(len(GlossaryTermsModel.HEADERS)):
+            self.terms_table.horizontalHeader().setSectionResizeMode(column, QHeaderView.ResizeMode.Stretch)
+        self.terms_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.terms_table.verticalHeader().setDefaultSectionSize(36)
         self.terms_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.terms_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
         self.terms_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.terms_table.setToolTip("Nhấp đúp để sửa, chuột phải để sửa/xóa")
+        self.terms_table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.terms_table.customContextMenuRequested.connect(self.show_term_menu)
+        self.terms_table.doubleClicked.connect(lambda index: self.edit_term(self.term_at(index)))
         self.terms_table.setStyleSheet(f"""
-            QTableWidget {{
+            QTableView {{
                 background-color: {COLORS['bg_light']};
                 border: 1px solid {COLORS['border']};
                 border-radius: 8px;
                 gridline-color: {COLORS['border']};
             }}
-            QTableWidget::item {{
+            QTableView::item {{
                 padding: 8px;
                 color: {COLORS['text_primary']};
             }}
-            QTableWidget::item:selected {{
+            QTableView::item:selected {{
                 background-color: {COLORS['accent_light']};
             }}
             QHeaderView::section {{
@@ -571,28 +954,31 @@ class GlossaryWidget(QWidget):
         self.stats_label.setStyleSheet(f"color: {COLORS['text_muted']}; font-size: 12px;")
         layout.addWidget(self.stats_label)
     
-    def set_project(self, project_id: int):
+    def set_project(self, project_id: int, snapshot=None):
         """Set current project."""
         self.project_id = project_id
-        self.load_categories()
-        self.update_stats()
+        self.load_categories(snapshot)
+        self.update_stats(snapshot)
     
-    def load_categories(self):
-        """Load categories list."""
+    def load_categories(self, snapshot=None):
+        """Load categories list (from the project snapshot when given)."""
         # Clear existing
         while self.cat_list_layout.count() > 1:
             item = self.cat_list_layout.takeAt(0)
             if item.widget():
                 item.widget().deleteLater()
         
-        categories = db.get_glossary_categories(self.project_id)
+        if snapshot:
+            categories = snapshot.glossary_categories
+        else:
+            categories = db.get_glossary_categories(self.project_id)
         
         for cat in categories:
             self.add_category_item(cat)
         
         # Select first if available
         if categories:
-            self.select_category(categories[0]['id'])
+            self.select_category(categories[0]['id'], snapshot)
     
     def add_category_item(self, category: dict):
         """Add category to list."""
@@ -627,10 +1013,8 @@ class GlossaryWidget(QWidget):
         count = self.cat_list_layout.count()
         self.cat_list_layout.insertWidget(count - 1, btn)
     
-    def show_category_menu(self, category: dict, pos):
-        """Show context menu for category."""
-        from PyQt6.QtWidgets import QMenu
-        
+    def create_menu(self) -> QMenu:
+        """Create a context menu in the app style."""
         menu = QMenu(self)
         menu.setStyleSheet(f"""
             QMenu {{
@@ -647,7 +1031,11 @@ class GlossaryWidget(QWidget):
                 background-color: {COLORS['bg_lighter']};
             }}
         """)
-        
+        return menu
+    
+    def show_category_menu(self, category: dict, pos):
+        """Show context menu for category."""
+        menu = self.create_menu()
         edit_action = menu.addAction("✏️ Sửa")
         delete_action = menu.addAction("🗑️ Xóa")
         
@@ -658,7 +1046,7 @@ class GlossaryWidget(QWidget):
         elif action == delete_action:
             self.delete_category(category['id'])
     
-    def select_category(self, category_id: int):
+    def select_category(self, category_id: int, snapshot=None):
         """Select a category and load its terms."""
         self.current_category_id = category_id
         self.add_term_btn.setEnabled(True)
@@ -670,14 +1058,34 @@ class GlossaryWidget(QWidget):
                 btn.setChecked(btn.property('category_id') == category_id)
         
         # Load terms
-        self.load_terms()
+        self.load_terms(snapshot)
     
-    def load_terms(self):
-        """Load terms for current category."""
+    def load_terms(self, snapshot=None):
+        """Load terms for current category (paged off the UI thread)."""
         if not self.current_category_id:
             return
         
-        categories = db.get_glossary_categories(self.project_id)
+        if self._terms_future:
+            self._terms_future.cancel()
+            self._terms_future = None
+        
+        category_id = self.current_category_id
+        self.terms_model.set_category(category_id)
+        if snapshot:
+            self.on_terms_loaded(category_id, snapshot.glossary_categories, snapshot)
+            return
+        
+        self._terms_future = db_executor.read(
+            db.get_glossary_categories, self.project_id,
+            callback=lambda categories: self.on_terms_loaded(category_id, categories)
+        )
+    
+    def on_terms_loaded(self, category_id: int, categories: list, snapshot=None):
+        """Update the terms title for the shown category."""
+        self._terms_future = None
+        if category_id != self.current_category_id:
+            return
+        
         cat_name = "Thuật ngữ"
         for cat in categories:
             if cat['id'] == self.current_category_id:
@@ -686,82 +1094,33 @@ class GlossaryWidget(QWidget):
         
         self.terms_title.setText(cat_name)
         
-        terms = db.get_glossary_terms(self.current_category_id)
+        self.update_stats(snapshot)
+    
+    def term_at(self, index: QModelIndex) -> dict:
+        """Get the term shown at a view index."""
+        return self.terms_model.term_at(self.terms_proxy.mapToSource(index).row())
+    
+    def show_term_menu(self, pos):
+        """Show context menu for the term under the cursor."""
+        index = self.terms_table.indexAt(pos)
+        if not index.isValid():
+            return
+        term = self.term_at(index)
         
-        self.terms_table.setRowCount(len(terms))
+        menu = self.create_menu()
+        edit_action = menu.addAction("✏️ Sửa")
+        delete_action = menu.addAction("🗑️ Xóa")
         
-        for i, term in enumerate(terms):
-            # Original
-            orig_item = QTableWidgetItem(term.get('original', ''))
-            orig_item.setData(Qt.ItemDataRole.UserRole, term['id'])
-            self.terms_table.setItem(i, 0, orig_item)
-            
-            # Standard
-            std_item = QTableWidgetItem(term['standard'])
-            std_item.setData(Qt.ItemDataRole.FontRole, True)
-            self.terms_table.setItem(i, 1, std_item)
-            
-            # Notes
-            notes_item = QTableWidgetItem(term.get('notes', '') or '')
-            self.terms_table.setItem(i, 2, notes_item)
-            
-            # Actions
-            actions_widget = QWidget()
-            actions_layout = QHBoxLayout(actions_widget)
-            actions_layout.setContentsMargins(4, 0, 4, 0)
-            actions_layout.setSpacing(4)
-            
-            edit_btn = QPushButton("✏️ Sửa")
-            edit_btn.setStyleSheet(f"""
-                QPushButton {{
-                    background-color: {COLORS['bg_lighter']};
-                    color: {COLORS['text_primary']};
-                    border: none;
-                    border-radius: 4px;
-                    padding: 4px 8px;
-                    font-size: 11px;
-                }}
-                QPushButton:hover {{
-                    background-color: {COLORS['border_light']};
-                }}
-            """)
-            edit_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
-            edit_btn.clicked.connect(lambda _, t=term: self.edit_term(t))
-            actions_layout.addWidget(edit_btn)
-            
-            delete_btn = QPushButton("🗑️ Xóa")
-            delete_btn.setStyleSheet(f"""
-                QPushButton {{
-                    background-color: rgba(239, 68, 68, 0.1);
-                    color: {COLORS['error']};
-                    border: none;
-                    border-radius: 4px;
-                    padding: 4px 8px;
-                    font-size: 11px;
-                }}
-                QPushButton:hover {{
-                    background-color: rgba(239, 68, 68, 0.2);
-                }}
-            """)
-            delete_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
-            delete_btn.clicked.connect(lambda _, tid=term['id']: self.delete_term(tid))
-            actions_layout.addWidget(delete_btn)
-            
-            self.terms_table.setCellWidget(i, 3, actions_widget)
+        action = menu.exec(self.terms_table.viewport().mapToGlobal(pos))
         
-        self.update_stats()
+        if action == edit_action:
+            self.edit_term(term)
+        elif action == delete_action:
+            self.delete_term(term['id'])
     
     def filter_terms(self, text: str):
         """Filter terms by search text."""
-        text = text.lower()
-        for i in range(self.terms_table.rowCount()):
-            match = False
-            for j in range(3):  # Check first 3 columns
-                item = self.terms_table.item(i, j)
-                if item and text in item.text().lower():
-                    match = True
-                    break
-            self.terms_table.setRowHidden(i, not match)
+        self.terms_proxy.set_filter_text(text)
     
     def add_category(self):
         """Add new category."""
@@ -801,7 +1160,7 @@ class GlossaryWidget(QWidget):
             db.delete_glossary_category(category_id)
             if self.current_category_id == category_id:
                 self.current_category_id = None
-                self.terms_table.setRowCount(0)
+                self.terms_model.set_category(None)
                 self.terms_title.setText("Chọn danh mục để xem thuật ngữ")
                 self.add_term_btn.setEnabled(False)
             self.load_categories()
@@ -858,106 +1217,132 @@ class GlossaryWidget(QWidget):
             db.delete_glossary_term(term_id)
             self.load_terms()
     
-    def update_stats(self):
-        """Update statistics."""
-        categories = db.get_glossary_categories(self.project_id)
-        terms = db.get_all_glossary_terms(self.project_id)
+    def update_stats(self, snapshot=None):
+        """Update statistics (counted off the UI thread)."""
+        if snapshot:
+            self.stats_label.setText(
+                f"Tổng: {len(snapshot.glossary_categories)} danh mục, "
+                f"{snapshot.glossary_term_count} thuật ngữ"
+            )
+            return
         
-        self.stats_label.setText(f"Tổng: {len(categories)} danh mục, {len(terms)} thuật ngữ")
+        project_id = self.project_id
+        db_executor.read(
+            lambda: (len(db.get_glossary_categories(project_id)),
+                     db.count_glossary_terms(project_id)),
+            callback=lambda counts: self.stats_label.setText(
+                f"Tổng: {counts[0]} danh mục, {counts[1]} thuật ngữ"
+            )
+        )
     
     def import_glossary(self):
-        """Import glossary from JSON file."""
+        """Import glossary from a JSON Lines, CSV/TSV or JSON file (in the background)."""
         filepath, _ = QFileDialog.getOpenFileName(
             self,
             "Import Glossary",
             "",
-            "JSON Files (*.json)"
+            glossary_io.IMPORT_FILTER
         )
         
         if not filepath:
             return
         
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Import categories and terms
-            imported_cats = 0
-            imported_terms = 0
-            
-            for cat_data in data.get('categories', []):
-                cat_id = db.add_glossary_category(
-                    name=cat_data['name'],
-                    icon=cat_data.get('icon', '📂'),
-                    project_id=self.project_id,
-                    is_global=False
-                )
-                imported_cats += 1
-                
-                for term_data in cat_data.get('terms', []):
-                    db.add_glossary_term(
-                        category_id=cat_id,
-                        original=term_data.get('original', ''),
-                        standard=term_data['standard'],
-                        notes=term_data.get('notes', '')
-                    )
-                    imported_terms += 1
-            
-            self.load_categories()
-            
-            QMessageBox.information(
-                self,
-                "Thành công",
-                f"Đã import {imported_cats} danh mục và {imported_terms} thuật ngữ"
+        db_executor.write(
+            glossary_io.import_file, filepath, self.project_id,
+            callback=self.on_glossary_imported,
+            error_callback=lambda error: QMessageBox.warning(
+                self, "Lỗi", f"Không thể import: {error}"
             )
-        except Exception as e:
-            QMessageBox.warning(self, "Lỗi", f"Không thể import: {str(e)}")
+        )
+    
+    def on_glossary_imported(self, counts: dict):
+        """Handle import finished."""
+        self.load_categories()
+        
+        QMessageBox.information(
+            self,
+            "Thành công",
+            f"Đã import {counts['inserted']} thuật ngữ mới, "
+            f"cập nhật {counts['updated']} thuật ngữ"
+            + (f", bỏ qua {counts['skipped']} dòng" if counts['skipped'] else "")
+        )
     
     def export_glossary(self):
-        """Export glossary to JSON file."""
+        """Export glossary to a JSON Lines, CSV/TSV or JSON file (in the background)."""
         filepath, _ = QFileDialog.getSaveFileName(
             self,
             "Export Glossary",
-            "glossary.json",
-            "JSON Files (*.json)"
+            "glossary.jsonl",
+            glossary_io.EXPORT_FILTER
         )
         
         if not filepath:
             return
         
-        try:
-            categories = db.get_glossary_categories(self.project_id)
-            
-            data = {
-                'project': '',
-                'version': '1.0',
-                'categories': []
-            }
-            
-            if self.project_id:
-                project = db.get_project(self.project_id)
-                data['project'] = project.get('name', '') if project else ''
-            
-            for cat in categories:
-                terms = db.get_glossary_terms(cat['id'])
-                cat_data = {
-                    'name': cat['name'],
-                    'icon': cat['icon'],
-                    'terms': []
-                }
-                
-                for term in terms:
-                    cat_data['terms'].append({
-                        'original': term.get('original', ''),
-                        'standard': term['standard'],
-                        'notes': term.get('notes', '')
-                    })
-                
-                data['categories'].append(cat_data)
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            QMessageBox.information(self, "Thành công", f"Đã export glossary")
-        except Exception as e:
-            QMessageBox.warning(self, "Lỗi", f"Không thể export: {str(e)}")
+        project_name = ''
+        if self.project_id:
+            project = db.get_project(self.project_id)
+            project_name = project.get('name', '') if project else ''
+        
+        db_executor.read(
+            glossary_io.export_file, filepath, self.project_id, project_name,
+            callback=lambda count: QMessageBox.information(
+                self, "Thành công", f"Đã export {count} thuật ngữ"
+            ),
+            error_callback=lambda error: QMessageBox.warning(
+                self, "Lỗi", f"Không thể export: {error}"
+            )
+        )
+    
+    def mine_terms(self):
+        """Mine term candidates from the project's stored chapters (in the background)."""
+        if not self.project_id or (self.mining_worker and self.mining_worker.isRunning()):
+            return
+        
+        self.mine_btn.setEnabled(False)
+        self.mine_btn.setText("⛏️ Đang phân tích...")
+        
+        self.mining_worker = TermMiningWorker(self.project_id)
+        self.mining_worker.progress.connect(
+            lambda done, total: self.mine_btn.setText(f"⛏️ Đang phân tích {done}/{total}...")
+        )
+        self.mining_worker.finished.connect(self.on_terms_mined)
+        self.mining_worker.error.connect(self.on_mining_error)
+        self.mining_worker.start()
+    
+    def reset_mine_button(self):
+        self.mine_btn.setEnabled(True)
+        self.mine_btn.setText("⛏️ Gợi ý thuật ngữ")
+    
+    def on_terms_mined(self, candidates: list):
+        """Show the candidates and add the chosen ones."""
+        self.reset_mine_button()
+        
+        if not candidates:
+            QMessageBox.information(
+                self, "Gợi ý thuật ngữ",
+                "Không tìm thấy thuật ngữ mới. Hãy lưu thêm chương rồi thử lại."
+            )
+            return
+        
+        categories = db.get_glossary_categories(self.project_id)
+        dialog = TermCandidatesDialog(candidates, categories, parent=self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        
+        db_executor.write(
+            term_miner.accept, self.project_id, dialog.result_data,
+            callback=lambda counts: (
+                self.load_categories(),
+                QMessageBox.information(
+                    self, "Thành công", f"Đã thêm {counts['inserted']} thuật ngữ"
+                )
+            ),
+            error_callback=lambda error: QMessageBox.warning(
+                self, "Lỗi", f"Không thể thêm thuật ngữ: {error}"
+            )
+        )
+    
+    def on_mining_error(self, error: str):
+        self.reset_mine_button()
+        QMessageBox.warning(self, "Lỗi", f"Không thể phân tích chương: {error}")
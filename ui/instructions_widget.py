@@ -689,13 +689,13 @@ class InstructionsWidget(QWidget):
 
         layout.addLayout(footer)
     
-    def set_project(self, project_id: int):
+    def set_project(self, project_id: int, snapshot=None):
         """Load project instructions."""
         self.project_id = project_id
-        self.load_templates()
+        self.load_templates(snapshot.templates if snapshot else None)
         self.load_models()
 
-        project = db.get_project(project_id)
+        project = snapshot.project if snapshot else db.get_project(project_id)
         if project:
             instructions = project.get('instructions', '')
             self.editor.setPlainText(instructions)
@@ -720,12 +720,13 @@ class InstructionsWidget(QWidget):
             extended_thinking = project.get('extended_thinking', 1)
             self.thinking_checkbox.setChecked(bool(extended_thinking))
     
-    def load_templates(self):
+    def load_templates(self, templates: list = None):
         """Load templates into combo box."""
         self.template_combo.clear()
         self.template_combo.addItem("-- Chọn template --", None)
         
-        templates = db.get_templates(self.project_id)
+        if templates is None:
+            templates = db.get_templates(self.project_id)
         
         for tmpl in templates:
             icon = tmpl.get('icon', '📝')
@@ -6,7 +6,7 @@ Lấy nội dung truyện từ các website và biên tập bằng Claude
 import os
 import re
 import time
-import requests
+import asyncio
 from pathlib import Path
 from datetime import datetime
 from urllib.parse import urlparse
@@ -20,9 +20,13 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QCursor
 
-from database import db
-from api import claude_client
-from api.memory_detector import auto_detect_and_add_memory
+from database import db, settings_cache
+from api import (
+    claude_client, blob_store, memory_index, glossary_matcher,
+    web_fetcher, http_cache, piaotia_parser
+)
+from api.memory_detector import memory_queue
+from api.async_fetcher import AsyncFetcher, AIOHTTP_AVAILABLE
 from api.file_handler import FileHandler
 from ui.styles import COLORS
 
@@ -154,6 +158,10 @@ SUPPORTED_WEBSITES = {
         "title_selector": "h1",
         "encoding": "gbk",
         "special_parser": "piaotia",  # Use custom parser
+        "max_concurrency": 4,  # parallel requests to the site
+        "min_interval": 0.25,  # seconds between request starts
+        "cache_ttl": 7 * 24 * 3600,  # chapter pages: serve from HTTP cache for a week
+        "index_cache_ttl": 600,  # story index: revalidate after 10 minutes
     },
 }
 
@@ -224,9 +232,8 @@ class StoryInfoWorker(QThread):
                 driver = None
                 try:
                     # Get login credentials from settings
-                    from database import db
-                    username = db.get_setting('truyenphuongdong_username', '')
-                    password = db.get_setting('truyenphuongdong_password', '')
+                    username = settings_cache.get('truyenphuongdong_username', '')
+                    password = settings_cache.get('truyenphuongdong_password', '')
 
                     if not username or not password:
                         result = {
@@ -479,21 +486,14 @@ class StoryInfoWorker(QThread):
                             pass
 
             from bs4 import BeautifulSoup
-            import requests
 
             # Get encoding
             encoding = self.config.get('encoding', 'utf-8')
+            ttl = self.config.get('index_cache_ttl', 0)
 
-            # Fetch main page
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-
-            response = requests.get(self.url, headers=headers, timeout=10)
-
-            # Handle encoding
-            if encoding != 'utf-8':
-                response.encoding = encoding
+            # Fetch main page (through the HTTP cache)
+            response = web_fetcher.get(self.url, encoding=encoding if encoding != 'utf-8' else None,
+                                       timeout=10, ttl=ttl)
 
             soup = BeautifulSoup(response.text, 'html.parser')
 
@@ -511,8 +511,7 @@ class StoryInfoWorker(QThread):
                 if match:
                     story_index_url = match.group(1)
                     # Fetch story index page
-                    response2 = requests.get(story_index_url, headers=headers, timeout=10)
-                    response2.encoding = 'gbk'
+                    response2 = web_fetcher.get(story_index_url, encoding='gbk', timeout=10, ttl=ttl)
                     soup = BeautifulSoup(response2.text, 'html.parser')
 
                 # Story name from h1
@@ -619,8 +618,8 @@ class SPAScraperWorker(QThread):
                 self.progress.emit("Đang đăng nhập...", 0, self.to_chapter - self.from_chapter + 1)
 
                 # Get credentials
-                username = db.get_setting('truyenphuongdong_username', '')
-                password = db.get_setting('truyenphuongdong_password', '')
+                username = settings_cache.get('truyenphuongdong_username', '')
+                password = settings_cache.get('truyenphuongdong_password', '')
 
                 if not username or not password:
                     self.error.emit("Cần cấu hình tài khoản đăng nhập trong Settings")
@@ -1104,8 +1103,55 @@ class SPAScraperWorker(QThread):
                     pass
 
 
+def parse_static_chapter(html_text: str, config: dict, chapter_num: int) -> tuple:
+    """
+    Extract (title, content) from a static chapter page.
+
+    Raises:
+        Exception if no content is found or it is too short
+    """
+    if config.get("special_parser") == "piaotia":
+        # Piaotia.com: content is the text between </table> and <div id="Commenddiv">,
+        # parsed without BeautifulSoup, which has issues with this site's structure
+        title, content = piaotia_parser.parse(html_text)
+        title = title or f"Chương {chapter_num}"
+    else:
+        # Parse HTML
+        soup = BeautifulSoup(html_text, 'html.parser')
+
+        # Get title
+        try:
+            title_elem = soup.select_one(config.get("title_selector", "h1"))
+            title = title_elem.get_text(strip=True) if title_elem else f"Chương {chapter_num}"
+        except:
+            title = f"Chương {chapter_num}"
+
+        # Normal content extraction
+        content_elem = soup.select_one(config.get("content_selector", "#content"))
+        if content_elem:
+            # Remove ads, scripts, etc.
+            for tag in content_elem.find_all(['script', 'style', 'ins', 'iframe']):
+                tag.decompose()
+
+            content = content_elem.get_text(separator='\n', strip=True)
+        else:
+            raise Exception("Không tìm thấy nội dung")
+
+    # Validate content
+    if not content or len(content) <= 100:
+        raise Exception(f"Nội dung quá ngắn ({len(content)} chars)")
+
+    return title, content
+
+
 class StaticScraperWorker(QThread):
-    """Worker thread for scraping static HTML websites."""
+    """
+    Worker thread for scraping static HTML websites.
+
+    Chapters are fetched concurrently through the shared web_fetcher
+    (pooled session, per-site concurrency and rate limit) and emitted in
+    chapter order.
+    """
     progress = pyqtSignal(str, int, int)  # message, current, total
     chapter_done = pyqtSignal(int, str, str)  # chapter_num, title, content
     finished = pyqtSignal(list)  # list of (chapter_num, title, content)
@@ -1121,118 +1167,133 @@ class StaticScraperWorker(QThread):
         self.is_cancelled = True
     
     def run(self):
-        if not BS4_AVAILABLE:
+        if not BS4_AVAILABLE and self.config.get("special_parser") != "piaotia":
             self.error.emit("BeautifulSoup chưa được cài đặt. Vui lòng chạy: pip install beautifulsoup4")
             return
         
         results = []
-        total = len(self.urls)
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+        if self.config.get("domain"):
+            web_fetcher.configure_host(self.config["domain"],
+                                       self.config.get("max_concurrency"),
+                                       self.config.get("min_interval"))
+        
+        fetched = web_fetcher.fetch_ordered(
+            [url for _, url in self.urls],
+            lambda index, response: self.parse(index, response.text),
+            encoding=self.config.get("encoding", "utf-8"),
+            ttl=self.config.get("cache_ttl", http_cache.DEFAULT_TTL),
+            is_cancelled=lambda: self.is_cancelled,
+            on_retry=self.on_retry
+        )
         
-        for i, (chapter_num, url) in enumerate(self.urls):
-            if self.is_cancelled:
+        self.progress.emit(f"Đang lấy chương {self.urls[0][0]}...", 0, len(self.urls))
+        for index, parsed, error in fetched:
+            if not self.handle_result(index, parsed, error, results):
                 break
-            
-            retry_count = 0
-            max_retries = 3
-            success = False
-            
-            while retry_count < max_retries and not success:
-                try:
-                    self.progress.emit(f"Đang lấy chương {chapter_num}...", i + 1, total)
-                    
-                    # Get encoding
-                    encoding = self.config.get("encoding", "utf-8")
-                    
-                    # Fetch page
-                    response = requests.get(url, headers=headers, timeout=15)
-                    response.encoding = encoding
-                    
-                    # Parse HTML
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    
-                    # Get title
-                    try:
-                        title_elem = soup.select_one(self.config.get("title_selector", "h1"))
-                        title = title_elem.get_text(strip=True) if title_elem else f"Chương {chapter_num}"
-                    except:
-                        title = f"Chương {chapter_num}"
-                    
-                    # Get content - handle special parsers
-                    special_parser = self.config.get("special_parser", None)
-
-                    if special_parser == "piaotia":
-                        # Piaotia.com: Content is text between last </table> and <div id="Commenddiv">
-                        # Use regex because BeautifulSoup has issues with this site's structure
-                        import re
-                        import html as html_module
-                        html_text = response.text
+        
+        self.finished.emit(results)
+    
+    def parse(self, index: int, html_text: str) -> tuple:
+        """Parse one fetched page (runs on a fetch/parser thread)."""
+        return parse_static_chapter(html_text, self.config, self.urls[index][0])
+    
+    def on_retry(self, index: int, attempt: int, error: Exception):
+        self.progress.emit(
+            f"Lỗi chương {self.urls[index][0]}, thử lại ({attempt}/{web_fetcher.MAX_RETRIES})...",
+            index + 1, len(self.urls)
+        )
+    
+    def handle_result(self, index: int, parsed, error, results: list) -> bool:
+        """Emit one chapter's result in order. Returns False once cancelled."""
+        chapter_num = self.urls[index][0]
+        total = len(self.urls)
+        if error is not None:
+            self.progress.emit(f"Bỏ qua chương {chapter_num} (lỗi: {str(error)[:50]})",
+                               index + 1, total)
+            return True
+        if parsed is None:  # cancelled
+            return False
+        
+        title, content = parsed
+        results.append((chapter_num, title, content))
+        self.chapter_done.emit(chapter_num, title, content)
+        self.progress.emit(f"Đã lấy chương {chapter_num}", index + 1, total)
+        return True
 
-                        # Extract content between markers
-                        pattern = r'</table>(.*?)<div id="Commenddiv"'
-                        content_match = re.search(pattern, html_text, re.DOTALL)
 
-                        if content_match:
-                            content_html = content_match.group(1)
+class AsyncScraperWorker(StaticScraperWorker):
+    """
+    StaticScraperWorker on asyncio/aiohttp (same signals).
 
-                            # Remove unwanted tags
-                            content_html = re.sub(r'<script[^>]*>.*?</script>', '', content_html, flags=re.DOTALL)
-                            content_html = re.sub(r'<div[^>]*>.*?</div>', '', content_html, flags=re.DOTALL)
-                            content_html = re.sub(r'<a[^>]*>.*?</a>', '', content_html, flags=re.DOTALL)
-                            content_html = re.sub(r'<center[^>]*>.*?</center>', '', content_html, flags=re.DOTALL)
+    One event loop on this thread fetches every chapter, so thousands of
+    chapters need only this thread and the small parser pool.
+    """
+    
+    def run(self):
+        if not BS4_AVAILABLE and self.config.get("special_parser") != "piaotia":
+            self.error.emit("BeautifulSoup chưa được cài đặt. Vui lòng chạy: pip install beautifulsoup4")
+            return
+        if not AIOHTTP_AVAILABLE:
+            self.error.emit("aiohttp chưa được cài đặt. Vui lòng chạy: pip install aiohttp")
+            return
+        
+        try:
+            results = asyncio.run(self.scrape())
+        except Exception as e:
+            self.error.emit(f"Lỗi khi lấy chương: {e}")
+            return
+        
+        self.finished.emit(results)
+    
+    async def scrape(self) -> list:
+        results = []
+        fetcher = AsyncFetcher(self.config.get("max_concurrency"), self.config.get("min_interval"))
+        
+        self.progress.emit(f"Đang lấy chương {self.urls[0][0]}...", 0, len(self.urls))
+        async for index, parsed, error in fetcher.fetch_ordered(
+            [url for _, url in self.urls], self.parse,
+            encoding=self.config.get("encoding", "utf-8"),
+            ttl=self.config.get("cache_ttl", http_cache.DEFAULT_TTL),
+            is_cancelled=lambda: self.is_cancelled,
+            on_retry=self.on_retry
+        ):
+            if not self.handle_result(index, parsed, error, results):
+                break
+        
+        return results
 
-                            # Replace br with newline
-                            content_html = re.sub(r'<br\s*/?>', '\n', content_html)
 
-                            # Remove all remaining tags
-                            content = re.sub(r'<[^>]+>', '', content_html)
+def build_chapter_system_prompt(instructions: str, memory_items: list, project_id: int,
+                                title: str, content: str) -> str:
+    """
+    Build a chapter's system prompt with only the glossary terms and
+    memory entries that the chapter mentions.
+    """
+    system_parts = []
+    context = f"{title}\n{content}"
 
-                            # Decode HTML entities (&nbsp; &amp; etc.)
-                            content = html_module.unescape(content)
+    # A glossary embedded from a {{GLOSSARY}} template is narrowed in place
+    instructions, glossary = glossary_matcher.localize(project_id, instructions, context)
+    if instructions:
+        system_parts.append(instructions)
 
-                            # Remove non-breaking spaces
-                            content = content.replace('\xa0', '')  # Unicode non-breaking space
+    if glossary:
+        system_parts.append(f"\n## Thuật ngữ cần tuân thủ:\n{glossary}")
 
-                            # Clean whitespace
-                            lines = [line.strip() for line in content.split('\n') if line.strip() and len(line.strip()) > 2]
-                            content = '\n'.join(lines)
-                        else:
-                            raise Exception("Không tìm thấy content pattern")
-                    else:
-                        # Normal content extraction
-                        content_elem = soup.select_one(self.config.get("content_selector", "#content"))
-                        if content_elem:
-                            # Remove ads, scripts, etc.
-                            for tag in content_elem.find_all(['script', 'style', 'ins', 'iframe']):
-                                tag.decompose()
-
-                            content = content_elem.get_text(separator='\n', strip=True)
-                        else:
-                            raise Exception("Không tìm thấy nội dung")
+    items = memory_index.filter(memory_items, context) if memory_items else []
+    if items:
+        memory = "\n".join(
+            f"**{item['category']}** - {item['key']}: {item['value']}" for item in items
+        )
+        system_parts.append(f"\n## Thông tin bổ sung:\n{memory}")
 
-                    # Validate content
-                    if content and len(content) > 100:
-                        results.append((chapter_num, title, content))
-                        self.chapter_done.emit(chapter_num, title, content)
-                        success = True
-                    else:
-                        raise Exception(f"Nội dung quá ngắn ({len(content)} chars)")
-                    
-                except Exception as e:
-                    retry_count += 1
-                    if retry_count < max_retries:
-                        self.progress.emit(f"Lỗi chương {chapter_num}, thử lại ({retry_count}/{max_retries})...", i + 1, total)
-                        time.sleep(1)
-                    else:
-                        self.progress.emit(f"Bỏ qua chương {chapter_num} (lỗi: {str(e)[:50]})", i + 1, total)
-            
-            # Small delay to avoid rate limiting
-            time.sleep(0.5)
-        
-        self.finished.emit(results)
+    return "\n\n".join(system_parts)
+
+
+def chapter_prompt_hash(system_prompt: str, model: str) -> str:
+    """Hash a chapter's system prompt and model (what a stored output was made with)."""
+    return blob_store.hash_bytes(f"{model}\n{system_prompt}".encode('utf-8'))
 
 
 class ClaudeProcessWorker(QThread):
@@ -1242,15 +1303,16 @@ class ClaudeProcessWorker(QThread):
     finished = pyqtSignal(list)
     error = pyqtSignal(str)
 
-    def __init__(self, chapters: list, instructions: str, memory: str, glossary: str,
-                 model: str = None, extended_thinking: bool = True):
+    def __init__(self, chapters: list, instructions: str, memory: list,
+                 model: str = None, extended_thinking: bool = True, project_id: int = None):
         super().__init__()
         self.chapters = chapters  # List of (chapter_num, title, content)
         self.instructions = instructions
-        self.memory = memory
-        self.glossary = glossary
+        self.memory = memory  # memory items, filtered per chapter
         self.model = model
         self.extended_thinking = extended_thinking
+        self.project_id = project_id
+        self.prompt_hashes = {}  # chapter_num -> chapter_prompt_hash of its request
         self.is_cancelled = False
     
     def cancel(self):
@@ -1265,20 +1327,6 @@ class ClaudeProcessWorker(QThread):
             claude_client.set_model(self.model)
         claude_client.set_extended_thinking(self.extended_thinking, claude_client.thinking_budget)
 
-        # Build system prompt
-        system_parts = []
-        
-        if self.instructions:
-            system_parts.append(self.instructions)
-        
-        if self.glossary:
-            system_parts.append(f"\n## Thuật ngữ cần tuân thủ:\n{self.glossary}")
-        
-        if self.memory:
-            system_parts.append(f"\n## Thông tin bổ sung:\n{self.memory}")
-        
-        system_prompt = "\n\n".join(system_parts) if system_parts else ""
-        
         for i, (chapter_num, title, content) in enumerate(self.chapters):
             if self.is_cancelled:
                 break
@@ -1286,6 +1334,11 @@ class ClaudeProcessWorker(QThread):
             try:
                 self.progress.emit(f"Claude đang xử lý: {title}...", i + 1, total)
                 
+                system_prompt = build_chapter_system_prompt(
+                    self.instructions, self.memory, self.project_id, title, content
+                )
+                self.prompt_hashes[chapter_num] = chapter_prompt_hash(system_prompt, claude_client.model)
+                
                 # Build message
                 messages = [
                     {
@@ -1296,7 +1349,8 @@ class ClaudeProcessWorker(QThread):
                 
                 # Get response
                 full_response = ""
-                for chunk in claude_client.stream_message(messages, system_prompt):
+                for chunk in claude_client.stream_message(messages, system_prompt,
+                                                          self.project_id, "link_to_text"):
                     full_response += chunk
                     if self.is_cancelled:
                         break
@@ -1319,15 +1373,16 @@ class BatchProcessWorker(QThread):
     finished = pyqtSignal(list)
     error = pyqtSignal(str)
 
-    def __init__(self, chapters: list, instructions: str, memory: str, glossary: str,
-                 model: str = None, extended_thinking: bool = True):
+    def __init__(self, chapters: list, instructions: str, memory: list,
+                 model: str = None, extended_thinking: bool = True, project_id: int = None):
         super().__init__()
         self.chapters = chapters  # List of (chapter_num, title, content)
         self.instructions = instructions
-        self.memory = memory
-        self.glossary = glossary
+        self.memory = memory  # memory items, filtered per chapter
         self.model = model
         self.extended_thinking = extended_thinking
+        self.project_id = project_id
+        self.prompt_hashes = {}  # chapter_num -> chapter_prompt_hash of its request
         self.is_cancelled = False
         self.batch_id = None
 
@@ -1349,20 +1404,6 @@ class BatchProcessWorker(QThread):
                 claude_client.set_model(self.model)
             claude_client.set_extended_thinking(self.extended_thinking, claude_client.thinking_budget)
 
-            # Build system prompt
-            system_parts = []
-
-            if self.instructions:
-                system_parts.append(self.instructions)
-
-            if self.glossary:
-                system_parts.append(f"\n## Thuật ngữ cần tuân thủ:\n{self.glossary}")
-
-            if self.memory:
-                system_parts.append(f"\n## Thông tin bổ sung:\n{self.memory}")
-
-            system_prompt = "\n\n".join(system_parts) if system_parts else ""
-
             # Build batch requests
             self.progress.emit("Đang chuẩn bị batch requests...", 0, len(self.chapters))
 
@@ -1371,6 +1412,11 @@ class BatchProcessWorker(QThread):
                 custom_id = f"chapter_{chapter_num}"
                 user_content = f"Hãy biên tập nội dung chương truyện sau theo hướng dẫn:\n\n**{title}**\n\n{content}"
 
+                system_prompt = build_chapter_system_prompt(
+                    self.instructions, self.memory, self.project_id, title, content
+                )
+                self.prompt_hashes[chapter_num] = chapter_prompt_hash(system_prompt, claude_client.model)
+
                 request = claude_client.build_batch_request(
                     custom_id=custom_id,
                     content=user_content,
@@ -1385,10 +1431,19 @@ class BatchProcessWorker(QThread):
             self.progress.emit("Đang gửi batch lên server...", 0, len(self.chapters))
             batch_info = claude_client.create_batch(batch_requests)
             self.batch_id = batch_info['id']
+            db.create_batch_job(
+                self.batch_id,
+                self.project_id,
+                batch_info['status'],
+                requests=[{'custom_id': r['custom_id']} for r in batch_requests],
+                source='link_to_text',
+                key_id=batch_info['key_id']
+            )
 
             self.progress.emit(f"Batch đã tạo (ID: {self.batch_id[:8]}...). Đang xử lý...", 0, len(self.chapters))
 
             # Poll for completion
+            last_state = None
             while not self.is_cancelled:
                 time.sleep(10)  # Poll every 10 seconds
 
@@ -1400,6 +1455,12 @@ class BatchProcessWorker(QThread):
                 errored = counts.get('errored', 0)
                 processing = counts.get('processing', 0)
 
+                if (status, processing, succeeded, errored) != last_state:
+                    last_state = (status, processing, succeeded, errored)
+                    db.update_batch_job(self.batch_id, status=status, processing=processing,
+                                        succeeded=succeeded, errored=errored,
+                                        ended_at=status_info.get('ended_at'))
+
                 self.progress.emit(
                     f"Batch đang xử lý... (Hoàn thành: {succeeded}/{len(self.chapters)}, Lỗi: {errored})",
                     succeeded,
@@ -1414,10 +1475,15 @@ class BatchProcessWorker(QThread):
 
             # Get results
             self.progress.emit("Đang lấy kết quả...", len(self.chapters), len(self.chapters))
-            batch_results = claude_client.get_batch_results(self.batch_id)
+            batch_results = claude_client.get_batch_results(self.batch_id, self.project_id,
+                                                            "link_to_text_batch")
 
             # Map results back to chapters
             results_map = {r['custom_id']: r for r in batch_results}
+            db.update_batch_requests(self.batch_id, [
+                {'custom_id': r['custom_id'], 'status': r['type'], 'error': r.get('error')}
+                for r in batch_results
+            ])
             final_results = []
 
             for chapter_num, title, original_content in self.chapters:
@@ -1450,10 +1516,14 @@ class LinkToTextWidget(QWidget):
         self.batch_worker = None
         self.scraped_chapters = []
         self.processed_chapters = []
+        self.resumed_chapters = []  # scraped chapters reused from the blob store
+        self.resumed_outputs = []  # Claude outputs reused from the blob store
+        self.chapter_urls = {}  # chapter_num -> source url of the current run
         self.detected_config = None
 
         self.setup_ui()
         self.check_dependencies()
+        memory_queue.memory_added.connect(self.on_memory_added)
     
     def setup_ui(self):
         # Main layout
@@ -1864,6 +1934,24 @@ class LinkToTextWidget(QWidget):
         batch_desc.setStyleSheet(f"color: {COLORS['text_secondary']}; font-size: 12px; margin-left: 28px;")
         level_layout.addWidget(batch_desc)
 
+        self.resume_check = QCheckBox("♻️ Dùng lại chương đã lưu (tiếp tục lần chạy trước)")
+        self.resume_check.setStyleSheet(f"color: {COLORS['text_primary']}; font-size: 12px;")
+        self.resume_check.setChecked(True)
+        level_layout.addWidget(self.resume_check)
+
+        self.async_scraper_check = QCheckBox("⚡ Lấy web tĩnh bằng asyncio (aiohttp)")
+        self.async_scraper_check.setStyleSheet(f"color: {COLORS['text_primary']}; font-size: 12px;")
+        if AIOHTTP_AVAILABLE:
+            self.async_scraper_check.setChecked(settings_cache.get_bool('async_scraper', False))
+            self.async_scraper_check.setToolTip("Phù hợp khi lấy hàng nghìn chương cùng lúc")
+        else:
+            self.async_scraper_check.setEnabled(False)
+            self.async_scraper_check.setToolTip("Cần cài đặt: pip install aiohttp")
+        self.async_scraper_check.toggled.connect(
+            lambda checked: settings_cache.set('async_scraper', checked)
+        )
+        level_layout.addWidget(self.async_scraper_check)
+
         settings_row.addWidget(level_group, 1)
         
         # Output options
@@ -2206,6 +2294,8 @@ class LinkToTextWidget(QWidget):
         # Reset
         self.scraped_chapters = []
         self.processed_chapters = []
+        self.resumed_chapters = []
+        self.resumed_outputs = []
         self.results_list.clear()
         self.save_btn.setEnabled(False)
         
@@ -2227,6 +2317,16 @@ class LinkToTextWidget(QWidget):
 
             # Use first URL for SPA
             first_url = url.split('\n')[0].strip()
+            self.chapter_urls = {n: first_url for n in range(from_chapter, to_chapter + 1)}
+            stored = self.load_stored_chapters()
+
+            # Selenium scrapes the whole range, so only skip it when every chapter is stored
+            if len(stored) == len(self.chapter_urls):
+                self.resumed_chapters = list(stored.values())
+                self.results_list.append(f"♻️ Dùng lại {len(stored)} chương đã lưu")
+                self.on_scrape_finished([])
+                return
+
             self.scraper_worker = SPAScraperWorker(first_url, from_chapter, to_chapter, self.detected_config)
         else:
             # Use BeautifulSoup for static websites
@@ -2246,7 +2346,21 @@ class LinkToTextWidget(QWidget):
                 self.start_btn.setEnabled(True)
                 return
 
-            self.scraper_worker = StaticScraperWorker(links, self.detected_config)
+            # Skip chapters already scraped from the same URL
+            self.chapter_urls = dict(links)
+            stored = self.load_stored_chapters()
+            if stored:
+                self.resumed_chapters = list(stored.values())
+                self.results_list.append(f"♻️ Dùng lại {len(stored)} chương đã lưu")
+                links = [(n, link) for n, link in links if n not in stored]
+                if not links:
+                    self.on_scrape_finished([])
+                    return
+
+            if AIOHTTP_AVAILABLE and self.async_scraper_check.isChecked():
+                self.scraper_worker = AsyncScraperWorker(links, self.detected_config)
+            else:
+                self.scraper_worker = StaticScraperWorker(links, self.detected_config)
         
         self.scraper_worker.progress.connect(self.on_scrape_progress)
         self.scraper_worker.chapter_done.connect(self.on_chapter_done)
@@ -2274,9 +2388,88 @@ class LinkToTextWidget(QWidget):
         """Handle chapter scraping done."""
         self.scraped_chapters.append((chapter_num, title, content))
         self.results_list.append(f"✅ {title} ({len(content)} ký tự)")
+
+        # Persist so a crashed run can resume from here
+        if self.project_id:
+            try:
+                db.upsert_chapter(self.project_id, chapter_num, title,
+                                  blob_store.put_text(content),
+                                  self.chapter_urls.get(chapter_num))
+            except Exception as e:
+                print(f"Error storing chapter {chapter_num}: {e}")
+
+    def load_stored_chapters(self) -> dict:
+        """
+        Load chapters of the current run that were already scraped.
+
+        Returns:
+            Dict of chapter_num -> (chapter_num, title, content) for chapters
+            stored from the same source URL
+        """
+        if not self.project_id or not self.chapter_urls or not self.resume_check.isChecked():
+            return {}
+
+        stored = {}
+        rows = db.get_chapters(self.project_id, min(self.chapter_urls), max(self.chapter_urls))
+        for row in rows:
+            chapter_num = row['chapter_num']
+            if row['source_url'] != self.chapter_urls.get(chapter_num):
+                continue
+            content = blob_store.get_text(row['raw_blob'])
+            if content is not None:
+                stored[chapter_num] = (chapter_num, row['title'], content)
+        return stored
+
+    def take_stored_outputs(self, instructions: str, memory: list, model: str = None) -> list:
+        """
+        Reuse stored Claude outputs for scraped chapters.
+
+        An output is reused only if it was made with the same system
+        prompt (instructions, glossary and memory for the chapter) and
+        model as this run would use. Fills self.resumed_outputs and
+        returns the chapters that still need processing.
+        """
+        self.resumed_outputs = []
+        if not self.project_id or not self.resume_check.isChecked():
+            return self.scraped_chapters
+
+        rows = {
+            row['chapter_num']: row
+            for row in db.get_chapters(self.project_id,
+                                       min(c[0] for c in self.scraped_chapters),
+                                       max(c[0] for c in self.scraped_chapters))
+        }
+        model = model or claude_client.model
+        pending = []
+        for chapter_num, title, content in self.scraped_chapters:
+            row = rows.get(chapter_num)
+            output = None
+            if row and row['processed_blob'] and row['prompt_hash']:
+                system_prompt = build_chapter_system_prompt(
+                    instructions, memory, self.project_id, title, content
+                )
+                if row['prompt_hash'] == chapter_prompt_hash(system_prompt, model):
+                    output = blob_store.get_text(row['processed_blob'])
+            if output is not None:
+                self.resumed_outputs.append((chapter_num, title, output))
+            else:
+                pending.append((chapter_num, title, content))
+
+        if self.resumed_outputs:
+            self.results_list.append(f"♻️ Dùng lại {len(self.resumed_outputs)} chương đã biên tập")
+        return pending
+
+    def store_output(self, chapter_num: int, content: str, prompt_hash: str = None):
+        """Persist a Claude output for a chapter with the hash of the prompt that made it."""
+        try:
+            db.set_chapter_processed(self.project_id, chapter_num,
+                                     blob_store.put_text(content), prompt_hash)
+        except Exception as e:
+            print(f"Error storing output for chapter {chapter_num}: {e}")
     
     def on_scrape_finished(self, results: list):
         """Handle scraping finished."""
+        results = sorted(self.resumed_chapters + results, key=lambda c: c[0])
         self.scraped_chapters = results
         
         if not results:
@@ -2305,15 +2498,8 @@ class LinkToTextWidget(QWidget):
         project = db.get_project(self.project_id)
         instructions = project['instructions'] if project else ""
 
-        # Get memory items and format them
-        memory_items = db.get_memory(self.project_id) or []
-        memory = "\n".join([
-            f"**{item['category']}** - {item['key']}: {item['value']}"
-            for item in memory_items
-        ]) if memory_items else ""
-
-        # Get glossary formatted for prompt
-        glossary = db.get_glossary_for_prompt(self.project_id)
+        # Memory items (glossary and memory are filtered per chapter by the workers)
+        memory = db.get_memory(self.project_id) or []
 
         # Get project-specific model and thinking settings
         project = db.get_project(self.project_id)
@@ -2322,8 +2508,13 @@ class LinkToTextWidget(QWidget):
 
         self.results_list.append("\n--- Bắt đầu xử lý với Claude ---\n")
 
-        self.claude_worker = ClaudeProcessWorker(self.scraped_chapters, instructions, memory, glossary,
-                                                  project_model, extended_thinking)
+        pending = self.take_stored_outputs(instructions, memory, project_model)
+        if not pending:
+            self.on_claude_finished([])
+            return
+
+        self.claude_worker = ClaudeProcessWorker(pending, instructions, memory,
+                                                  project_model, extended_thinking, self.project_id)
         self.claude_worker.progress.connect(self.on_scrape_progress)
         self.claude_worker.chapter_done.connect(self.on_claude_chapter_done)
         self.claude_worker.finished.connect(self.on_claude_finished)
@@ -2334,13 +2525,19 @@ class LinkToTextWidget(QWidget):
         """Handle Claude processing done for a chapter."""
         self.results_list.append(f"✨ Claude: {title} ({len(content)} ký tự)")
 
-        # Auto-detect and add memory from processed chapter
+        # Auto-detect memory from processed chapter in the background
         if self.project_id:
-            auto_detect_and_add_memory(content, self.project_id)
+            self.store_output(chapter_num, content, self.claude_worker.prompt_hashes.get(chapter_num))
+            memory_queue.enqueue(content, self.project_id)
     
+    def on_memory_added(self, project_id: int, items_added: int):
+        """Report memory found by the background detector."""
+        if project_id == self.project_id and items_added:
+            self.results_list.append(f"🧠 Đã thêm {items_added} memory mới")
+
     def on_claude_finished(self, results: list):
         """Handle Claude processing finished."""
-        self.processed_chapters = results
+        self.processed_chapters = sorted(self.resumed_outputs + results, key=lambda c: c[0])
         self.on_all_finished()
 
     def start_batch_processing(self):
@@ -2354,15 +2551,8 @@ class LinkToTextWidget(QWidget):
         project = db.get_project(self.project_id)
         instructions = project['instructions'] if project else ""
 
-        # Get memory items and format them
-        memory_items = db.get_memory(self.project_id) or []
-        memory = "\n".join([
-            f"**{item['category']}** - {item['key']}: {item['value']}"
-            for item in memory_items
-        ]) if memory_items else ""
-
-        # Get glossary formatted for prompt
-        glossary = db.get_glossary_for_prompt(self.project_id)
+        # Memory items (glossary and memory are filtered per chapter by the workers)
+        memory = db.get_memory(self.project_id) or []
 
         # Get project-specific model and thinking settings
         project = db.get_project(self.project_id)
@@ -2372,8 +2562,13 @@ class LinkToTextWidget(QWidget):
         self.results_list.append("\n--- Bắt đầu xử lý với Batch API ---\n")
         self.results_list.append("⏳ Batch processing có thể mất vài phút...\n")
 
-        self.batch_worker = BatchProcessWorker(self.scraped_chapters, instructions, memory, glossary,
-                                               project_model, extended_thinking)
+        pending = self.take_stored_outputs(instructions, memory, project_model)
+        if not pending:
+            self.on_batch_finished([])
+            return
+
+        self.batch_worker = BatchProcessWorker(pending, instructions, memory,
+                                               project_model, extended_thinking, self.project_id)
         self.batch_worker.progress.connect(self.on_scrape_progress)
         self.batch_worker.finished.connect(self.on_batch_finished)
         self.batch_worker.error.connect(self.on_error)
@@ -2381,14 +2576,19 @@ class LinkToTextWidget(QWidget):
 
     def on_batch_finished(self, results: list):
         """Handle Batch processing finished."""
-        self.processed_chapters = results
+        self.processed_chapters = sorted(self.resumed_outputs + results, key=lambda c: c[0])
         self.results_list.append("\n✅ Batch processing hoàn thành!")
 
-        # Auto-detect and add memory from all processed chapters
+        # Queue memory detection for all processed chapters (coalesced)
         if self.project_id:
+            originals = {c[0]: c[2] for c in self.scraped_chapters}
             for chapter_num, title, content in results:
                 self.results_list.append(f"✨ {title} ({len(content)} ký tự)")
-                auto_detect_and_add_memory(content, self.project_id)
+                # Failed requests come back with the original text
+                if content != originals.get(chapter_num):
+                    self.store_output(chapter_num, content,
+                                      self.batch_worker.prompt_hashes.get(chapter_num))
+            memory_queue.enqueue_many((c[2] for c in results), self.project_id)
         else:
             for chapter_num, title, content in results:
                 self.results_list.append(f"✨ {title} ({len(content)} ký tự)")
@@ -2418,12 +2618,38 @@ class LinkToTextWidget(QWidget):
         self.start_btn.setEnabled(True)
         QMessageBox.critical(self, "Lỗi", error)
     
+    def enforce_glossary(self) -> int:
+        """
+        Replace glossary variants with the standard names in processed chapters.
+
+        Returns:
+            Total number of replacements
+        """
+        total = 0
+        enforced = []
+        for chapter_num, title, content in self.processed_chapters:
+            content, report = glossary_matcher.enforce(self.project_id, content)
+            enforced.append((chapter_num, title, content))
+            if report['replacements']:
+                total += report['replacements']
+                changes = ", ".join(f"{change} ×{count}" for change, count in report['changes'].items())
+                self.results_list.append(f"📖 {title}: {changes}")
+        
+        self.processed_chapters = enforced
+        if total:
+            self.results_list.append(f"📖 Đã chuẩn hóa {total} thuật ngữ theo glossary")
+        return total
+
     def save_results(self):
         """Save results to files."""
         if not self.processed_chapters:
             QMessageBox.warning(self, "Lỗi", "Không có nội dung để lưu")
             return
         
+        # Fix non-standard glossary spellings before writing
+        if self.project_id:
+            self.enforce_glossary()
+        
         # Ask for save location
         if self.output_separate.isChecked():
             # Save as separate files
@@ -10,8 +10,9 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QSize
 from PyQt6.QtGui import QIcon, QAction, QKeySequence, QShortcut
 
-from database import db
-from api import claude_client
+from database import db, settings_cache, db_maintenance, db_executor, project_snapshots
+from api import claude_client, usage_tracker
+from api.memory_detector import memory_queue
 from ui.styles import MAIN_STYLESHEET, COLORS
 from ui.sidebar import SidebarWidget
 from ui.chat_widget import ChatWidget
@@ -34,6 +35,7 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.current_project_id = None
+        self._snapshot_future = None  # pending project snapshot load
         self.update_info = None  # Store update info
         self.setup_window()
         self.setup_ui()
@@ -65,6 +67,7 @@ class MainWindow(QMainWindow):
         # Sidebar
         self.sidebar = SidebarWidget()
         self.sidebar.project_selected.connect(self.on_project_selected)
+        self.sidebar.projects_loaded.connect(self.prefetch_neighbours)
         self.sidebar.settings_clicked.connect(self.show_settings)
         self.sidebar.update_clicked.connect(self.check_for_updates_manual)
         main_layout.addWidget(self.sidebar)
@@ -198,17 +201,38 @@ class MainWindow(QMainWindow):
         db.init_default_templates()
         
         # Set default model
-        saved_model = db.get_setting('default_model', DEFAULT_MODEL)
+        saved_model = settings_cache.get('default_model', DEFAULT_MODEL)
         claude_client.set_model(saved_model)
         
         # Load extended thinking settings
-        thinking_enabled = db.get_setting('extended_thinking', 'true') == 'true'
-        thinking_budget = int(db.get_setting('thinking_budget', '10000'))
-        claude_client.set_extended_thinking(thinking_enabled, thinking_budget)
+        self.apply_thinking_settings()
+        
+        # Keep the client in sync when settings change
+        settings_cache.setting_changed.connect(self.on_setting_changed)
+        
+        # Start periodic write-behind of usage accounting
+        usage_tracker.start()
+        
+        # Vacuum/analyze the database while the app is idle
+        db_maintenance.start(is_busy=self.has_active_workers)
         
         # Fetch available models from API (in background)
         self.fetch_models_async()
     
+    def apply_thinking_settings(self):
+        """Apply extended thinking settings to the client."""
+        claude_client.set_extended_thinking(
+            settings_cache.get_bool('extended_thinking', True),
+            settings_cache.get_int('thinking_budget', 10000)
+        )
+    
+    def on_setting_changed(self, key: str, value: str):
+        """Apply changed settings to the client."""
+        if key == 'default_model' and value:
+            claude_client.set_model(value)
+        elif key in ('extended_thinking', 'thinking_budget'):
+            self.apply_thinking_settings()
+    
     def fetch_models_async(self):
         """Fetch models from API without blocking UI."""
         from PyQt6.QtCore import QThread, pyqtSignal
@@ -250,20 +274,45 @@ class MainWindow(QMainWindow):
     def on_project_selected(self, project_id: int):
         """Handle project selection."""
         self.current_project_id = project_id
-        project = db.get_project(project_id)
         
-        if project:
-            self.project_name_label.setText(f"📁 {project['name']}")
+        if self._snapshot_future:
+            self._snapshot_future.cancel()
+            self._snapshot_future = None
+        
+        # Everything the tabs need, read in one transaction off the UI thread
+        snapshot = project_snapshots.peek(project_id)
+        if snapshot:
+            self.apply_snapshot(project_id, snapshot)
+        else:
+            self._snapshot_future = project_snapshots.request(
+                project_id, lambda snapshot: self.apply_snapshot(project_id, snapshot)
+            )
+    
+    def apply_snapshot(self, project_id: int, snapshot):
+        """Show a project's snapshot in every tab (ignored if another project was selected)."""
+        self._snapshot_future = None
+        if project_id != self.current_project_id:
+            return
+        
+        if snapshot:
+            self.project_name_label.setText(f"📁 {snapshot.project['name']}")
             
             # Update all widgets
-            self.chat_widget.set_project(project_id)
-            self.instructions_widget.set_project(project_id)
-            self.files_widget.set_project(project_id)
-            self.memory_widget.set_project(project_id)
-            self.batch_widget.set_project(project_id)
-            self.glossary_widget.set_project(project_id)
+            self.chat_widget.set_project(project_id, snapshot)
+            self.instructions_widget.set_project(project_id, snapshot)
+            self.files_widget.set_project(project_id, snapshot)
+            self.memory_widget.set_project(project_id, snapshot)
+            self.batch_widget.set_project(project_id, snapshot)
+            self.glossary_widget.set_project(project_id, snapshot)
             self.video_to_text_widget.set_project(project_id)
             self.link_to_text_widget.set_project(project_id)
+            
+            self.prefetch_neighbours()
+    
+    def prefetch_neighbours(self):
+        """Warm the snapshot cache for the projects next to the current one in the sidebar."""
+        if self.current_project_id:
+            project_snapshots.prefetch(self.sidebar.get_neighbour_ids(self.current_project_id))
     
     def on_instructions_saved(self):
         """Handle instructions saved."""
@@ -297,6 +346,9 @@ class MainWindow(QMainWindow):
         """Show settings dialog."""
         dialog = SettingsDialog(self)
         dialog.exec()
+        
+        # Keys may have been added, removed or reset
+        self.sidebar.update_api_status()
 
     def check_for_updates_background(self):
         """Check for updates in background thread."""
@@ -368,7 +420,39 @@ class MainWindow(QMainWindow):
         # Clear badge if user dismissed dialog
         self.sidebar.show_update_badge(False)
 
+    def has_active_workers(self) -> bool:
+        """Check if a chat, scraping, Claude, batch or memory job is running."""
+        if memory_queue.pending_count():
+            return True
+        workers = (
+            (self.chat_widget, 'stream_worker'),
+            (self.batch_widget, 'worker'),
+            (self.memory_widget, 'bulk_worker'),
+            (self.glossary_widget, 'mining_worker'),
+            (self.link_to_text_widget, 'scraper_worker'),
+            (self.link_to_text_widget, 'claude_worker'),
+            (self.link_to_text_widget, 'batch_worker'),
+            (self.video_to_text_widget, 'whisper_worker'),
+            (self.video_to_text_widget, 'claude_worker'),
+        )
+        for widget, name in workers:
+            worker = getattr(widget, name, None)
+            if worker is not None and worker.isRunning():
+                return True
+        return False
+
     def closeEvent(self, event):
         """Handle window close."""
-        # Could save state, cleanup, etc.
+        # Flush buffered usage accounting before exit
+        usage_tracker.stop()
+        
+        # Drop queued memory detection; bulk batches resume next session
+        memory_queue.stop()
+        self.memory_widget.stop_bulk_worker()
+        
+        # Release free pages and checkpoint the WAL
+        db_maintenance.stop()
+        
+        # Let queued writes finish before exit
+        db_executor.shutdown()
         event.accept()
@@ -5,12 +5,14 @@ Project memory management
 
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QFrame, QScrollArea, QLineEdit, QMessageBox, QComboBox, QTextEdit, QDialog
+    QFrame, QScrollArea, QLineEdit, QMessageBox, QComboBox, QTextEdit, QDialog,
+    QInputDialog
 )
 from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QCursor
 
-from database import db
+from database import db, db_executor
+from api.memory_detector import memory_queue, MemoryDetector, BulkMemoryWorker
 from ui.styles import COLORS
 
 
@@ -86,7 +88,11 @@ class MemoryWidget(QWidget):
         super().__init__()
         self.project_id = None
         self.memory_widgets = {}
+        self._memory_future = None
+        self.bulk_worker = None
+        self.failed_bulk_jobs = set()  # batch ids whose poll/merge failed this session
         self.setup_ui()
+        memory_queue.memory_added.connect(self.on_memory_detected)
     
     def setup_ui(self):
         layout = QVBoxLayout(self)
@@ -114,6 +120,25 @@ class MemoryWidget(QWidget):
         header.addLayout(header_text)
         header.addStretch()
 
+        # Bulk extraction from stored chapters (Batch API)
+        self.bulk_btn = QPushButton("📚 Quét memory từ chương (Batch)")
+        self.bulk_btn.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {COLORS['bg_lighter']};
+                color: {COLORS['text_secondary']};
+                font-size: 12px;
+                padding: 6px 12px;
+                border-radius: 6px;
+            }}
+            QPushButton:hover {{
+                background-color: {COLORS['accent']};
+                color: white;
+            }}
+        """)
+        self.bulk_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        self.bulk_btn.clicked.connect(self.start_bulk_detection)
+        header.addWidget(self.bulk_btn)
+
         # Clear all button
         clear_btn = QPushButton("🗑️ Xóa tất cả Memory")
         clear_btn.setStyleSheet(f"""
@@ -168,13 +193,26 @@ class MemoryWidget(QWidget):
         
         stats_layout.addStretch()
         
+        self.bulk_label = QLabel("")
+        self.bulk_label.setStyleSheet(f"color: {COLORS['text_secondary']}; font-size: 12px;")
+        stats_layout.addWidget(self.bulk_label)
+        
         layout.addWidget(self.stats)
     
-    def set_project(self, project_id: int):
+    def set_project(self, project_id: int, snapshot=None):
         """Load project memory."""
         self.project_id = project_id
         self.clear_widgets()
-        self.load_memory()
+        
+        if snapshot:
+            if self._memory_future:
+                self._memory_future.cancel()
+                self._memory_future = None
+            self.on_memory_loaded(project_id, snapshot.memory)
+        else:
+            self.load_memory()
+        
+        self.resume_bulk_detection()
     
     def clear_widgets(self):
         """Clear all memory widgets."""
@@ -188,11 +226,32 @@ class MemoryWidget(QWidget):
                 item.widget().deleteLater()
     
     def load_memory(self):
-        """Load memory from database."""
+        """Load memory from database (off the UI thread)."""
+        if self._memory_future:
+            self._memory_future.cancel()
+            self._memory_future = None
+        
         if not self.project_id:
             return
         
-        memories = db.get_memory(self.project_id)
+        project_id = self.project_id
+        self._memory_future = db_executor.read(
+            db.get_memory, project_id,
+            callback=lambda memories: self.on_memory_loaded(project_id, memories)
+        )
+    
+    def on_memory_detected(self, project_id: int, items_added: int):
+        """Reload when background detection added items to this project."""
+        if project_id == self.project_id and items_added:
+            self.load_memory()
+    
+    def on_memory_loaded(self, project_id: int, memories: list):
+        """Show loaded memory items."""
+        self._memory_future = None
+        if project_id != self.project_id:
+            return
+        
+        self.clear_widgets()
         for mem in memories:
             self.add_memory_widget(mem)
         
@@ -232,6 +291,75 @@ class MemoryWidget(QWidget):
             self.memory_layout.addStretch()
             self.update_stats()
 
+    def start_bulk_detection(self):
+        """Ask for a chapter range and extract its memory with the Batch API."""
+        if not self.project_id:
+            return
+        if self.bulk_worker and self.bulk_worker.isRunning():
+            QMessageBox.information(self, "Đang xử lý", "Đang có một batch memory chạy.")
+            return
+
+        chapters = db.get_chapters(self.project_id)
+        if not chapters:
+            QMessageBox.information(
+                self, "Chưa có chương",
+                "Dự án chưa có chương nào được lưu. Hãy lấy chương từ tab Link to Text trước."
+            )
+            return
+
+        first, last = chapters[0]['chapter_num'], chapters[-1]['chapter_num']
+        from_chapter, ok = QInputDialog.getInt(self, "Quét memory", "Từ chương:",
+                                               first, first, last)
+        if not ok:
+            return
+        to_chapter, ok = QInputDialog.getInt(self, "Quét memory", "Đến chương:",
+                                             last, from_chapter, last)
+        if not ok:
+            return
+
+        self.run_bulk_worker(BulkMemoryWorker(self.project_id, from_chapter, to_chapter))
+
+    def resume_bulk_detection(self):
+        """Resume polling a bulk job left running by an earlier session."""
+        if not self.project_id or (self.bulk_worker and self.bulk_worker.isRunning()):
+            return
+
+        # Jobs that failed this session wait for a restart instead of retrying on every switch
+        jobs = [job for job in MemoryDetector.get_pending_bulk_jobs(self.project_id)
+                if job['id'] not in self.failed_bulk_jobs]
+        if jobs:
+            self.run_bulk_worker(BulkMemoryWorker(self.project_id, batch_id=jobs[0]['id']))
+
+    def run_bulk_worker(self, worker: BulkMemoryWorker):
+        """Start a bulk worker and wire its signals."""
+        self.bulk_worker = worker
+        self.bulk_btn.setEnabled(False)
+        worker.progress.connect(lambda message, *_: self.bulk_label.setText(message))
+        worker.finished.connect(lambda items, pid=worker.project_id: self.on_bulk_finished(pid, items))
+        worker.error.connect(lambda error, w=worker: self.on_bulk_error(w.batch_id, error))
+        worker.start()
+
+    def stop_bulk_worker(self):
+        """Stop polling without canceling the batch (resumed next time)."""
+        if self.bulk_worker and self.bulk_worker.isRunning():
+            self.bulk_worker.stop()
+            self.bulk_worker.wait()
+
+    def on_bulk_finished(self, project_id: int, items_added: int):
+        """Handle bulk extraction finished."""
+        self.bulk_btn.setEnabled(True)
+        self.bulk_label.setText(f"✅ Batch memory: {items_added} mục mới/cập nhật")
+        if project_id == self.project_id:
+            self.load_memory()
+
+    def on_bulk_error(self, batch_id: str, error: str):
+        """Handle bulk extraction error."""
+        if batch_id:
+            self.failed_bulk_jobs.add(batch_id)
+        self.bulk_btn.setEnabled(True)
+        self.bulk_label.setText("")
+        QMessageBox.warning(self, "Lỗi", error)
+
     def update_stats(self):
         """Update memory statistics."""
         count = len(self.memory_widgets)
@@ -11,8 +11,8 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QCursor
 
-from database import db
-from api import claude_client
+from database import db, settings_cache
+from api import claude_client, usage_tracker
 from ui.styles import COLORS
 from config import FALLBACK_MODELS, DEFAULT_MODEL
 
@@ -362,7 +362,7 @@ class SettingsDialog(QDialog):
         self.model_combo = QComboBox()
         self.load_models()
         
-        current_model = db.get_setting('default_model', DEFAULT_MODEL)
+        current_model = settings_cache.get('default_model', DEFAULT_MODEL)
         for i in range(self.model_combo.count()):
             if self.model_combo.itemData(i) == current_model:
                 self.model_combo.setCurrentIndex(i)
@@ -403,7 +403,7 @@ class SettingsDialog(QDialog):
         
         self.thinking_checkbox = QCheckBox("🧠 Extended Thinking")
         self.thinking_checkbox.setStyleSheet(f"color: {COLORS['text_primary']}; font-size: 13px;")
-        thinking_enabled = db.get_setting('extended_thinking', 'true') == 'true'
+        thinking_enabled = settings_cache.get_bool('extended_thinking', True)
         self.thinking_checkbox.setChecked(thinking_enabled)
         self.thinking_checkbox.stateChanged.connect(self.save_thinking_setting)
         thinking_layout.addWidget(self.thinking_checkbox)
@@ -411,7 +411,7 @@ class SettingsDialog(QDialog):
         self.budget_spin = QSpinBox()
         self.budget_spin.setRange(1000, 50000)
         self.budget_spin.setSingleStep(1000)
-        self.budget_spin.setValue(int(db.get_setting('thinking_budget', '10000')))
+        self.budget_spin.setValue(settings_cache.get_int('thinking_budget', 10000))
         self.budget_spin.setSuffix(" tokens")
         self.budget_spin.setMaximumWidth(110)
         self.budget_spin.valueChanged.connect(self.save_thinking_setting)
@@ -449,7 +449,7 @@ class SettingsDialog(QDialog):
 
         self.tpd_username_input = QLineEdit()
         self.tpd_username_input.setPlaceholderText("Nhập username...")
-        self.tpd_username_input.setText(db.get_setting('truyenphuongdong_username', ''))
+        self.tpd_username_input.setText(settings_cache.get('truyenphuongdong_username', ''))
         self.tpd_username_input.setStyleSheet(f"""
             QLineEdit {{
                 background-color: {COLORS['bg_dark']};
@@ -472,7 +472,7 @@ class SettingsDialog(QDialog):
 
         self.tpd_password_input = QLineEdit()
         self.tpd_password_input.setPlaceholderText("Nhập password...")
-        self.tpd_password_input.setText(db.get_setting('truyenphuongdong_password', ''))
+        self.tpd_password_input.setText(settings_cache.get('truyenphuongdong_password', ''))
         self.tpd_password_input.setEchoMode(QLineEdit.EchoMode.Password)
         self.tpd_password_input.setStyleSheet(f"""
             QLineEdit {{
@@ -600,6 +600,18 @@ class SettingsDialog(QDialog):
         
         layout.addWidget(usage_frame)
         
+        # Monthly cost breakdown by project and pipeline (from usage rollups)
+        self.usage_breakdown = QLabel("")
+        self.usage_breakdown.setWordWrap(True)
+        self.usage_breakdown.setStyleSheet(f"""
+            color: {COLORS['text_secondary']};
+            font-size: 11px;
+            padding: 10px;
+            background-color: {COLORS['bg_light']};
+            border-radius: 6px;
+        """)
+        layout.addWidget(self.usage_breakdown)
+        
         # ============== Tips Section ==============
         tips = QLabel(
             "💡 Tips: Key có priority cao được ưu tiên • "
@@ -723,6 +735,24 @@ class SettingsDialog(QDialog):
         
         layout.addLayout(output_row)
         
+        # Estimated cost
+        cost_row = QHBoxLayout()
+        cost_icon = QLabel("💵")
+        cost_icon.setStyleSheet("font-size: 11px;")
+        cost_row.addWidget(cost_icon)
+        
+        cost_label = QLabel("Chi phí:")
+        cost_label.setStyleSheet(f"color: {COLORS['text_muted']}; font-size: 11px;")
+        cost_row.addWidget(cost_label)
+        
+        cost_value = QLabel("$0.00")
+        cost_value.setObjectName("cost_value")
+        cost_value.setStyleSheet(f"color: {COLORS['text_primary']}; font-size: 12px; font-weight: 600;")
+        cost_row.addWidget(cost_value)
+        cost_row.addStretch()
+        
+        layout.addLayout(cost_row)
+        
         return frame
     
     def format_tokens(self, tokens: int) -> str:
@@ -735,20 +765,40 @@ class SettingsDialog(QDialog):
     
     def refresh_usage_stats(self):
         """Refresh usage statistics."""
+        # Write buffered usage so the totals below are complete
+        usage_tracker.flush(wait=True)
+        
         # Today
         today = db.get_usage_today()
         self.usage_today.findChild(QLabel, "input_value").setText(self.format_tokens(today['input_tokens']))
         self.usage_today.findChild(QLabel, "output_value").setText(self.format_tokens(today['output_tokens']))
+        self.usage_today.findChild(QLabel, "cost_value").setText(f"${today.get('cost') or 0:.2f}")
         
         # Week
         week = db.get_usage_week()
         self.usage_week.findChild(QLabel, "input_value").setText(self.format_tokens(week['input_tokens']))
         self.usage_week.findChild(QLabel, "output_value").setText(self.format_tokens(week['output_tokens']))
+        self.usage_week.findChild(QLabel, "cost_value").setText(f"${week.get('cost') or 0:.2f}")
         
         # Month
         month = db.get_usage_month()
         self.usage_month.findChild(QLabel, "input_value").setText(self.format_tokens(month['input_tokens']))
         self.usage_month.findChild(QLabel, "output_value").setText(self.format_tokens(month['output_tokens']))
+        self.usage_month.findChild(QLabel, "cost_value").setText(f"${month.get('cost') or 0:.2f}")
+        
+        # Monthly breakdown (top 5 per dimension)
+        lines = []
+        for dimension, title in (('project', "📁 Theo dự án"), ('task', "⚙️ Theo tác vụ"),
+                                 ('model', "🤖 Theo model")):
+            rows = db.get_usage_rollup(dimension)[:5]
+            if rows:
+                items = [
+                    f"{row['label'] or '--'}: ${row['cost']:.2f} "
+                    f"({self.format_tokens(row['input_tokens'] + row['output_tokens'])})"
+                    for row in rows
+                ]
+                lines.append(f"{title}: " + " • ".join(items))
+        self.usage_breakdown.setText("\n".join(lines) or "📊 Chưa có dữ liệu chi phí tháng này")
         
         # Overview stats
         status = db.get_api_status()
@@ -872,26 +922,23 @@ class SettingsDialog(QDialog):
     def save_model(self):
         """Save selected model."""
         model = self.model_combo.currentData()
-        db.set_setting('default_model', model)
-        claude_client.set_model(model)
+        settings_cache.set('default_model', model)
     
     def save_thinking_setting(self):
         """Save extended thinking settings."""
         enabled = self.thinking_checkbox.isChecked()
         budget = self.budget_spin.value()
 
-        db.set_setting('extended_thinking', 'true' if enabled else 'false')
-        db.set_setting('thinking_budget', str(budget))
-
-        claude_client.set_extended_thinking(enabled, budget)
+        settings_cache.set('extended_thinking', enabled)
+        settings_cache.set('thinking_budget', budget)
 
     def save_tpd_credentials(self):
         """Save truyenphuongdong.com credentials to database."""
         username = self.tpd_username_input.text()
         password = self.tpd_password_input.text()
 
-        db.set_setting('truyenphuongdong_username', username)
-        db.set_setting('truyenphuongdong_password', password)
+        settings_cache.set('truyenphuongdong_username', username)
+        settings_cache.set('truyenphuongdong_password', password)
 
     def load_models(self):
         """Load models from API or fallback."""
@@ -8,10 +8,11 @@ from PyQt6.QtWidgets import (
     QScrollArea, QFrame, QLineEdit, QDialog, QMessageBox,
     QMenu
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QTimer
+from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QFont, QCursor
 
-from database import db
+from database import db, db_executor
+from api import usage_tracker
 from ui.styles import COLORS
 
 
@@ -159,6 +160,7 @@ class SidebarWidget(QWidget):
     """Sidebar widget with project list."""
 
     project_selected = pyqtSignal(int)
+    projects_loaded = pyqtSignal()
     settings_clicked = pyqtSignal()
     update_clicked = pyqtSignal()
     
@@ -166,6 +168,7 @@ class SidebarWidget(QWidget):
         super().__init__()
         self.project_widgets = {}
         self.current_project_id = None
+        self._projects_future = None
         self.setup_ui()
         self.load_projects()
     
@@ -315,16 +318,15 @@ class SidebarWidget(QWidget):
 
         layout.addWidget(settings_container)
         
-        # Start status update timer
-        self.status_timer = QTimer()
-        self.status_timer.timeout.connect(self.update_api_status)
-        self.status_timer.start(5000)  # Update every 5 seconds
+        # Live updates pushed by the usage tracker instead of polling
+        usage_tracker.usage_updated.connect(self.update_usage)
+        usage_tracker.api_status_changed.connect(self.update_api_status)
         self.update_api_status()
+        self.update_usage(usage_tracker.get_usage_today())
     
     def update_api_status(self):
         """Update API status display."""
         status = db.get_api_status()
-        usage = db.get_usage_today()
         
         # Update status icon and text
         if status['status'] == 'ok':
@@ -339,8 +341,9 @@ class SidebarWidget(QWidget):
         else:
             self.api_status_icon.setText("🔴")
             self.api_status_text.setText("API: Lỗi")
-        
-        # Update usage
+    
+    def update_usage(self, usage: dict):
+        """Update today's usage display."""
         total_tokens = usage['input_tokens'] + usage['output_tokens']
         if total_tokens > 0:
             self.api_usage_label.setText(f"📊 Hôm nay: {self.format_tokens(total_tokens)}")
@@ -355,8 +358,24 @@ class SidebarWidget(QWidget):
             return f"{tokens/1000:.1f}K"
         return str(tokens)
     
-    def load_projects(self):
-        """Load projects from database."""
+    def load_projects(self, select: int = None):
+        """
+        Load projects from database (off the UI thread).
+        
+        Args:
+            select: Project to emit project_selected for once the list is rebuilt
+        """
+        if self._projects_future:
+            self._projects_future.cancel()
+        self._projects_future = db_executor.read(
+            db.get_all_projects,
+            callback=lambda projects: self.on_projects_loaded(projects, select)
+        )
+    
+    def on_projects_loaded(self, projects: list, select: int = None):
+        """Rebuild the project list from loaded projects."""
+        self._projects_future = None
+        
         # Clear existing
         for widget in self.project_widgets.values():
             widget.deleteLater()
@@ -368,12 +387,14 @@ class SidebarWidget(QWidget):
             if item.widget():
                 item.widget().deleteLater()
         
-        # Load from database
-        projects = db.get_all_projects()
         for project in projects:
             self.add_project_widget(project)
         
         self.project_list_layout.addStretch()
+        self.projects_loaded.emit()
+        
+        if select in self.project_widgets:
+            self.project_selected.emit(select)
     
     def add_project_widget(self, project: dict):
         """Add a project widget to the list."""
@@ -394,6 +415,17 @@ class SidebarWidget(QWidget):
         if project['is_active']:
             self.current_project_id = project['id']
     
+    def get_neighbour_ids(self, project_id: int, radius: int = 1) -> list:
+        """Get the IDs of the projects listed around a project."""
+        ids = list(self.project_widgets.keys())
+        if project_id not in ids:
+            return []
+        index = ids.index(project_id)
+        return [
+            ids[i] for i in range(index - radius, index + radius + 1)
+            if i != index and 0 <= i < len(ids)
+        ]
+    
     def create_new_project(self):
         """Show dialog to create new project."""
         dialog = NewProjectDialog(self)
@@ -415,7 +447,7 @@ class SidebarWidget(QWidget):
         if project_id in self.project_widgets:
             self.project_widgets[project_id].set_active(True)
         
-        db.set_active_project(project_id)
+        db_executor.write(db.set_active_project, project_id)
         self.project_selected.emit(project_id)
     
     def delete_project(self, project_id: int):
@@ -433,14 +465,21 @@ class SidebarWidget(QWidget):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
-            db.delete_project(project_id)
-            self.load_projects()
+            # The project listed below (or above) takes over if the current one goes
+            neighbours = self.get_neighbour_ids(project_id)
+            db_executor.write(db.delete_project, project_id)
             
-            # Select first project if current was deleted
-            if self.current_project_id == project_id:
-                projects = db.get_all_projects()
-                if projects:
-                    self.on_project_clicked(projects[0]['id'])
+            if self.current_project_id != project_id:
+                self.load_projects()
+            elif neighbours:
+                self.current_project_id = None
+                next_id = neighbours[-1]
+                # Reload once the new active project is written, so the list shows it
+                db_executor.write(db.set_active_project, next_id,
+                                  callback=lambda _: self.load_projects(select=next_id))
+            else:
+                self.current_project_id = None
+                self.load_projects()
     
     def rename_project(self, project_id: int):
         """Rename a project."""
@@ -485,12 +485,14 @@ class ClaudeProcessWorker(QThread):
     finished = pyqtSignal(str)
     error = pyqtSignal(str)
     
-    def __init__(self, text: str, instructions: str, memory: str, glossary: str):
+    def __init__(self, text: str, instructions: str, memory: str, glossary: str,
+                 project_id: int = None):
         super().__init__()
         self.text = text
         self.instructions = instructions
         self.memory = memory
         self.glossary = glossary
+        self.project_id = project_id
     
     def run(self):
         try:
@@ -520,7 +522,8 @@ class ClaudeProcessWorker(QThread):
             
             # Stream response
             full_response = ""
-            for chunk in claude_client.stream_message(messages, system_prompt):
+            for chunk in claude_client.stream_message(messages, system_prompt,
+                                                      self.project_id, "video_to_text"):
                 full_response += chunk
                 self.chunk_received.emit(chunk)
             
@@ -1507,7 +1510,8 @@ class VideoToTextWidget(QWidget):
             self.raw_text,
             instructions,
             memory,
-            glossary
+            glossary,
+            self.project_id
         )
         self.claude_worker.progress.connect(self.on_claude_progress)
         self.claude_worker.chunk_received.connect(self.on_claude_chunk)
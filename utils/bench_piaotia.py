@@ -0,0 +1,199 @@
+"""
+AnhMin Audio - Piaotia Parser Benchmark
+Compare the single-pass parser with the old regex passes on saved pages
+
+Usage:
+    python -m utils.bench_piaotia                               # benchmark generated sample pages
+    python -m utils.bench_piaotia --from-cache --save corpus/   # save cached piaotia pages
+    python -m utils.bench_piaotia corpus/                       # benchmark a corpus
+
+Modules are loaded by path, so api/__init__ (PyQt6, anthropic,
+requests) is not imported and only the standard library is needed.
+"""
+
+import argparse
+import html
+import importlib.util
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))  # for config (used by the HTTP cache)
+
+ENCODING = 'gbk'
+
+
+def load_module(name: str, relative_path: str):
+    """Import one module from the source tree without running its package __init__."""
+    spec = importlib.util.spec_from_file_location(name, ROOT / relative_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+piaotia_parser = load_module('piaotia_parser', 'api/piaotia_parser.py').piaotia_parser
+piaotia_corpus = load_module('piaotia_corpus', 'utils/piaotia_corpus.py')
+
+
+def edge_page(body: str) -> str:
+    return f'<h1>Chương 1</h1><table><tr><td></td></tr></table>{body}<div id="Commenddiv"></div>'
+
+
+# (name, page, content expected from the parser); where it differs from
+# the old regex passes the difference is intended
+EDGE_CASES = [
+    ("script chứa </div>",
+     edge_page('<div>quảng cáo<script>w("</div>")</script>vẫn quảng cáo</div>'
+               'Dòng nội dung thứ nhất<br />Dòng nội dung thứ hai'),
+     "Dòng nội dung thứ nhất\nDòng nội dung thứ hai"),
+    ("<BR> viết hoa",
+     edge_page('Dòng nội dung thứ nhất<BR>Dòng nội dung thứ hai'),
+     "Dòng nội dung thứ nhất\nDòng nội dung thứ hai"),
+    ("<div> không đóng",
+     edge_page('<div class="x">Dòng nội dung thứ nhất<br>Dòng nội dung thứ hai'),
+     "Dòng nội dung thứ nhất\nDòng nội dung thứ hai"),
+    ("thực thể HTML",
+     edge_page('&nbsp;&nbsp;Trương Tam &amp; Lý Tứ<br/>&lt;Hệ thống&gt;'),
+     "Trương Tam & Lý Tứ\n<Hệ thống>"),
+]
+
+
+def legacy_parse_content(html_text: str) -> str:
+    """The regex passes the scraper used before api.piaotia_parser."""
+    content_match = re.search(r'</table>(.*?)<div id="Commenddiv"', html_text, re.DOTALL)
+    if not content_match:
+        raise ValueError("Không tìm thấy content pattern")
+
+    content_html = content_match.group(1)
+    content_html = re.sub(r'<script[^>]*>.*?</script>', '', content_html, flags=re.DOTALL)
+    content_html = re.sub(r'<div[^>]*>.*?</div>', '', content_html, flags=re.DOTALL)
+    content_html = re.sub(r'<a[^>]*>.*?</a>', '', content_html, flags=re.DOTALL)
+    content_html = re.sub(r'<center[^>]*>.*?</center>', '', content_html, flags=re.DOTALL)
+    content_html = re.sub(r'<br\s*/?>', '\n', content_html)
+    content = re.sub(r'<[^>]+>', '', content_html)
+    content = html.unescape(content).replace('\xa0', '')
+    lines = [line.strip() for line in content.split('\n') if line.strip() and len(line.strip()) > 2]
+    return '\n'.join(lines)
+
+
+def load_corpus(directory: Path) -> List[Tuple[str, str]]:
+    """Load (name, decoded page) for every *.html file in directory."""
+    return [(path.name, path.read_bytes().decode(ENCODING, errors='replace'))
+            for path in sorted(directory.glob('*.html'))]
+
+
+def load_from_cache() -> List[Tuple[str, str]]:
+    """Load the piaotia pages stored in the HTTP cache."""
+    http_cache = load_module('http_cache', 'api/http_cache.py').http_cache
+
+    with http_cache._connect() as conn:
+        urls = [row['url'] for row in conn.execute(
+            "SELECT url FROM entries WHERE url LIKE '%piaotia.com%' ORDER BY url")]
+
+    pages = []
+    for url in urls:
+        entry = http_cache.lookup(url)
+        if entry:
+            pages.append((url.rstrip('/').rsplit('/', 1)[-1] or 'index.html',
+                          entry['content'].decode(ENCODING, errors='replace')))
+    return pages
+
+
+def check_edge_cases() -> int:
+    """Run EDGE_CASES through both parsers. Returns how many the parser gets wrong."""
+    failures = 0
+    for name, page, expected in EDGE_CASES:
+        new = piaotia_parser.parse_content(page)
+        try:
+            old = legacy_parse_content(page)
+        except ValueError:
+            old = None
+        if new != expected:
+            failures += 1
+            status = f"SAI: {new!r}"
+        elif old != new:
+            status = f"đúng (regex cũ cho {old!r})"
+        else:
+            status = "đúng (giống regex cũ)"
+        print(f"  {name:<22} {status}")
+    return failures
+
+
+def bench(name: str, fn, pages: List[Tuple[str, str]], rounds: int) -> float:
+    """Run fn over all pages rounds times and print the throughput."""
+    total_chars = sum(len(page) for _, page in pages) * rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for _, page in pages:
+            try:
+                fn(page)
+            except ValueError:
+                pass
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10} {len(pages) * rounds / elapsed:>10.0f} trang/s "
+          f"{total_chars / elapsed / 1e6:>8.1f} M ký tự/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('corpus', nargs='?', type=Path,
+                        help="Thư mục chứa các trang *.html (gbk); mặc định dùng trang mẫu tự sinh")
+    parser.add_argument('--from-cache', action='store_true', help="Dùng các trang piaotia trong HTTP cache")
+    parser.add_argument('--save', type=Path, help="Lưu corpus vào thư mục này")
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.from_cache:
+        pages = load_from_cache()
+    elif args.corpus:
+        pages = load_corpus(args.corpus)
+    else:
+        pages = piaotia_corpus.generate()
+
+    if not pages:
+        print("Không có trang nào")
+        return 1
+
+    if args.save:
+        args.save.mkdir(parents=True, exist_ok=True)
+        for name, page in pages:
+            target = args.save / (name if name.endswith('.html') else f"{name}.html")
+            target.write_bytes(page.encode(ENCODING, errors='replace'))
+        print(f"Đã lưu {len(pages)} trang vào {args.save}")
+
+    print("Trường hợp đặc biệt:")
+    if check_edge_cases():
+        return 1
+
+    # Outputs should match the old parser (see EDGE_CASES for intended differences)
+    mismatches = []
+    for name, page in pages:
+        try:
+            old = legacy_parse_content(page)
+        except ValueError:
+            old = None
+        try:
+            new = piaotia_parser.parse_content(page)
+        except ValueError:
+            new = None
+        if old != new:
+            mismatches.append(name)
+
+    print(f"{len(pages)} trang, {sum(len(p) for _, p in pages) / 1e6:.1f} M ký tự, "
+          f"{len(mismatches)} trang khác kết quả cũ")
+    for name in mismatches[:10]:
+        print(f"  ≠ {name}")
+
+    old_time = bench("regex cũ", legacy_parse_content, pages, args.rounds)
+    new_time = bench("parser", piaotia_parser.parse_content, pages, args.rounds)
+    print(f"Nhanh hơn {old_time / new_time:.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
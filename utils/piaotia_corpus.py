@@ -0,0 +1,58 @@
+"""
+AnhMin Audio - Piaotia Sample Corpus
+Generate synthetic piaotia chapter pages for the parser benchmark
+
+The pages copy the layout of a real chapter (title table, ad block with a
+script, indented paragraphs split by <br />, the Commenddiv footer) with
+random Chinese text, so the benchmark runs on a clean checkout without
+network access or a filled HTTP cache.
+"""
+
+import random
+from typing import List, Tuple
+
+# Common characters (all encodable as gbk)
+HAN_CHARS = ("的一是不了人我在有他这中大来上个国到说们为子和你地出道也时年得就那要下以生会"
+             "自着去之过家学对可她里后小么心多天而能好都然没日于起还发成事只作当想看文无开手"
+             "十用主行方又如前所本见经头面公同三已老从动两长知民样现分将外但身些与高意进把法")
+PUNCTUATION = "，，，。。！？；"
+
+SAMPLE_SIZE = 200
+
+
+def paragraph(rng: random.Random) -> str:
+    """A paragraph of a few clauses, sometimes with an HTML entity."""
+    clauses = []
+    for _ in range(rng.randint(2, 6)):
+        clause = ''.join(rng.choice(HAN_CHARS) for _ in range(rng.randint(6, 30)))
+        clauses.append(clause + rng.choice(PUNCTUATION))
+    text = ''.join(clauses)
+    roll = rng.random()
+    if roll < 0.1:
+        text += "&lt;系统&gt;"
+    elif roll < 0.15:
+        text += "&amp;"
+    return "&nbsp;&nbsp;&nbsp;&nbsp;" + text
+
+
+def chapter_page(rng: random.Random, chapter_num: int) -> str:
+    """One chapter page in the piaotia layout."""
+    title = f"第{chapter_num + 1}章 " + ''.join(rng.choice(HAN_CHARS) for _ in range(rng.randint(2, 6)))
+    body = "<br /><br />".join(paragraph(rng) for _ in range(rng.randint(20, 60)))
+    return (
+        f'<html><head><title>{title}</title></head><body>'
+        f'<table><tr><td><H1>{title}</H1></td></tr></table>\n'
+        f'<table align="center"><tr><td><a href="/">目录</a></td></tr></table>\n'
+        f'<div class="ad"><a href="x">广告</a>推荐</div>'
+        f'<script type="text/javascript">var a="<b>";</script>'
+        f'<center>飘天文学</center><a href="/next">下一章</a>'
+        f'{body}<br /><br />'
+        f'<div id="Commenddiv"><a href="/vote">投票</a></div>'
+        f'<div class="bottom">飘天文学网</div></body></html>'
+    )
+
+
+def generate(count: int = SAMPLE_SIZE, seed: int = 0) -> List[Tuple[str, str]]:
+    """Generate (name, page) pairs; the same seed always gives the same corpus."""
+    rng = random.Random(seed)
+    return [(f"{i:04d}.html", chapter_page(rng, i)) for i in range(count)]